@@ -7,6 +7,7 @@ from __future__ import annotations
 from functools import lru_cache
 import collections
 import enum
+import itertools
 import os
 import re
 import typing as T
@@ -108,6 +109,11 @@ class CompilerArgs(T.MutableSequence[str]):
         self.pre: T.Deque[str] = collections.deque()
         self.post: T.List[str] = []
         self.needs_override_check: bool = False
+        # Set of the Dedup.UNIQUE args present in _container, pre and post,
+        # so that __iadd__ does not have to scan all three for every new
+        # argument. Built lazily and dropped whenever _container is modified
+        # in a way that could remove an argument.
+        self._unique_args: T.Optional[T.Set[str]] = None
 
     # Flush the saved pre and post list into the _container list
     #
@@ -182,10 +188,12 @@ class CompilerArgs(T.MutableSequence[str]):
     def __setitem__(self, index: T.Union[int, slice], value: T.Union[str, T.Iterable[str]]) -> None:  # noqa: F811
         self.flush_pre_post()
         self._container[index] = value  # type: ignore  # TODO: fix 'Invalid index type' and 'Incompatible types in assignment' errors
+        self._unique_args = None
 
     def __delitem__(self, index: T.Union[int, slice]) -> None:
         self.flush_pre_post()
         del self._container[index]
+        self._unique_args = None
 
     def __len__(self) -> int:
         return len(self._container) + len(self.pre) + len(self.post)
@@ -193,6 +201,8 @@ class CompilerArgs(T.MutableSequence[str]):
     def insert(self, index: int, value: str) -> None:
         self.flush_pre_post()
         self._container.insert(index, value)
+        if self._unique_args is not None and self._can_dedup(value) is Dedup.UNIQUE:
+            self._unique_args.add(value)
 
     def copy(self) -> 'CompilerArgs':
         self.flush_pre_post()
@@ -259,6 +269,8 @@ class CompilerArgs(T.MutableSequence[str]):
             self.append(arg)
         else:
             self._container.append(arg)
+            if self._unique_args is not None and self._can_dedup(arg) is Dedup.UNIQUE:
+                self._unique_args.add(arg)
 
     def extend_direct(self, iterable: T.Iterable[str]) -> None:
         '''
@@ -295,6 +307,7 @@ class CompilerArgs(T.MutableSequence[str]):
         tmp_pre: T.Deque[str] = collections.deque()
         if not isinstance(args, collections.abc.Iterable):
             raise TypeError(f'can only concatenate Iterable[str] (not "{args}") to CompilerArgs')
+        unique_args = self._get_unique_args()
         for arg in args:
             # If the argument can be de-duped, do it either by removing the
             # previous occurrence of it and adding a new one, or not adding the
@@ -302,8 +315,9 @@ class CompilerArgs(T.MutableSequence[str]):
             dedup = self._can_dedup(arg)
             if dedup is Dedup.UNIQUE:
                 # Argument already exists and adding a new instance is useless
-                if arg in self._container or arg in self.pre or arg in self.post:
+                if arg in unique_args:
                     continue
+                unique_args.add(arg)
             elif dedup is Dedup.OVERRIDDEN:
                 self.needs_override_check = True
             if self._should_prepend(arg):
@@ -314,6 +328,14 @@ class CompilerArgs(T.MutableSequence[str]):
         #pre and post is going to be merged later before a iter call
         return self
 
+    def _get_unique_args(self) -> T.Set[str]:
+        if self._unique_args is None:
+            # Flushing never drops a UNIQUE argument, so the set stays valid
+            # across flush_pre_post().
+            self._unique_args = {a for a in itertools.chain(self._container, self.pre, self.post)
+                                 if self._can_dedup(a) is Dedup.UNIQUE}
+        return self._unique_args
+
     def __radd__(self, args: T.Iterable[str]) -> 'CompilerArgs':
         self.flush_pre_post()
         new = type(self)(self.compiler, args)
@@ -5,12 +5,13 @@ from __future__ import annotations
 
 from collections import OrderedDict
 from dataclasses import dataclass, InitVar
-from functools import lru_cache
+from functools import lru_cache, wraps
 from itertools import chain
 from pathlib import Path
 import copy
 import enum
 import json
+import marshal
 import os
 import pickle
 import re
@@ -31,7 +32,9 @@ from ..mesonlib import (
     classify_unity_sources, get_compiler_for_source,
     is_parent_path, get_rsp_threshold,
 )
+from ..ninjadeps import NinjaLog
 from ..options import OptionKey
+from ..scripts import exelauncher
 
 
 if T.TYPE_CHECKING:
@@ -42,6 +45,7 @@ if T.TYPE_CHECKING:
     from ..interpreter import Interpreter, Test
     from ..linkers.linkers import StaticLinker
     from ..mesonlib import FileMode, FileOrString
+    from ..ninjadeps import NinjaLogEntry
     from ..options import ElementaryOptionValues
 
     from typing_extensions import TypedDict, NotRequired
@@ -63,6 +67,70 @@ if T.TYPE_CHECKING:
 # Assembly files cannot be unitified and neither can LLVM IR files
 LANGS_CANT_UNITY = ('d', 'fortran', 'vala')
 
+# With unity_batching=adaptive, unity files are only regrouped if that makes
+# the costliest one at least this much cheaper. Changing the grouping causes
+# a rebuild of every unity file involved.
+UNITY_REGROUP_GAIN = 0.1
+
+def balance_unity_batches(costs: T.Sequence[float], count: int,
+                          previous: T.Optional[T.Sequence[int]] = None) -> T.List[T.List[int]]:
+    '''Split items into count batches with similar total costs.
+
+    Returns the indices of the items in each batch, in their original order.
+    previous optionally gives the batch each item was in before, or -1 for
+    new items. That grouping is kept, with the new items added to the
+    cheapest batches, unless it is substantially worse than a fresh one.
+    '''
+    def fill(batches: T.List[T.List[int]], loads: T.List[float], items: T.List[int]) -> None:
+        for i in items:
+            b = min(range(count), key=lambda b: (loads[b], len(batches[b])))
+            batches[b].append(i)
+            loads[b] += costs[i]
+
+    # Costliest first, each to the cheapest batch so far
+    order = sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+    batches: T.List[T.List[int]] = [[] for _ in range(count)]
+    loads = [0.0] * count
+    fill(batches, loads, order)
+
+    if previous is not None:
+        kept: T.List[T.List[int]] = [[] for _ in range(count)]
+        kept_loads = [0.0] * count
+        added: T.List[int] = []
+        for i in order:
+            if 0 <= previous[i] < count:
+                kept[previous[i]].append(i)
+                kept_loads[previous[i]] += costs[i]
+            else:
+                added.append(i)
+        fill(kept, kept_loads, added)
+        if all(kept) and max(loads) >= max(kept_loads) * (1 - UNITY_REGROUP_GAIN):
+            batches = kept
+
+    return [sorted(b) for b in batches]
+
+_F = T.TypeVar('_F', bound=T.Callable[..., T.Any])
+
+def backend_cached(func: _F) -> _F:
+    '''Memoize a Backend method in the cache of the backend instance.
+
+    Unlike with lru_cache, the results do not keep the backend and its targets
+    alive, and they are dropped by Backend.clear_cache() when the targets or
+    options change.
+    '''
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self: Backend, *args: T.Any, **kwargs: T.Any) -> T.Any:
+        key = (name, args, tuple(kwargs.items()))
+        try:
+            return self.target_cache[key]
+        except KeyError:
+            pass
+        value = self.target_cache[key] = func(self, *args, **kwargs)
+        return value
+    return T.cast('_F', wrapper)
+
 @dataclass(eq=False)
 class RegenInfo:
     source_dir: str
@@ -269,6 +337,8 @@ class Backend:
     name = '<UNKNOWN>'
 
     def __init__(self, build: T.Optional[build.Build], interpreter: T.Optional['Interpreter']):
+        # Results of the per-target helpers, see backend_cached()
+        self.target_cache: T.Dict[T.Tuple[T.Any, ...], T.Any] = {}
         # Make it possible to construct a dummy backend
         # This is used for introspection without a build directory
         if build is None:
@@ -285,6 +355,11 @@ class Backend:
         self.src_to_build = mesonlib.relpath(self.environment.get_build_dir(),
                                              self.environment.get_source_dir())
 
+    def clear_cache(self) -> None:
+        '''Forget the memoized results of the per-target helpers, which is
+        needed whenever targets or options change.'''
+        self.target_cache.clear()
+
     # If requested via 'capture = True', returns captured compile args per
     # target (e.g. captured_args[target]) that can be used later, for example,
     # to populate things like intellisense fields in generated visual studio
@@ -301,8 +376,11 @@ class Backend:
             if warn_multi_output and len(t.get_outputs()) != 1:
                 mlog.warning(f'custom_target {t.name!r} has more than one output! '
                              f'Using the first one. Consider using `{t.name}[0]`.')
-            filename = t.get_outputs()[0]
-        elif isinstance(t, build.CustomTargetIndex):
+        return self._get_target_filename(t)
+
+    @backend_cached
+    def _get_target_filename(self, t: T.Union[build.Target, build.CustomTargetIndex]) -> str:
+        if isinstance(t, (build.CustomTarget, build.CustomTargetIndex)):
             filename = t.get_outputs()[0]
         else:
             assert isinstance(t, build.BuildTarget), t
@@ -344,6 +422,7 @@ class Backend:
                 curdir = '.'
         return compiler.get_include_args(curdir, False)
 
+    @backend_cached
     def get_target_filename_for_linking(self, target: T.Union[build.Target, build.CustomTargetIndex]) -> T.Optional[str]:
         # On some platforms (msvc for instance), the file that is used for
         # dynamic linking is not the same as the dynamic library itself. This
@@ -368,7 +447,7 @@ class Backend:
                 return None
         raise AssertionError(f'BUG: Tried to link to {target!r} which is not linkable')
 
-    @lru_cache(maxsize=None)
+    @backend_cached
     def get_target_dir(self, target: T.Union[build.Target, build.CustomTargetIndex]) -> str:
         if isinstance(target, build.RunTarget):
             # this produces no output, only a dummy top-level name
@@ -392,6 +471,7 @@ class Backend:
             return os.path.join(self.build_to_src, target_dir)
         return self.build_to_src
 
+    @backend_cached
     def get_target_private_dir(self, target: T.Union[build.BuildTarget, build.CustomTarget, build.CustomTargetIndex]) -> str:
         return os.path.join(self.get_target_filename(target, warn_multi_output=False) + '.p')
 
@@ -428,6 +508,7 @@ class Backend:
         compsrcs = classify_unity_sources(target.compilers.values(), unity_src)
         unity_size = self.get_target_option(target, 'unity_size')
         assert isinstance(unity_size, int), 'for mypy'
+        unity_batching = self.get_target_option(target, 'unity_batching')
 
         def init_language_file(suffix: str, unity_file_number: int) -> T.TextIO:
             unity_src = self.get_unity_source_file(target, suffix, unity_file_number)
@@ -443,27 +524,86 @@ class Backend:
 
         # For each language, generate unity source files and return the list
         for comp, srcs in compsrcs.items():
-            files_in_current = unity_size + 1
-            unity_file_number = 0
-            # TODO: this could be simplified with an algorithm that pre-sorts
-            # the sources into the size of chunks we want
-            ofile = None
-            for src in srcs:
-                if files_in_current >= unity_size:
-                    if ofile:
-                        ofile.close()
-                    ofile = init_language_file(comp.get_default_suffix(), unity_file_number)
-                    unity_file_number += 1
-                    files_in_current = 0
-                ofile.write(f'#include<{src}>\n')
-                files_in_current += 1
-            if ofile:
-                ofile.close()
+            # The number of unity files only depends on unity_size, see
+            # _determine_ext_objs()
+            if unity_batching == 'adaptive':
+                batches = self.get_adaptive_unity_batches(target, comp, srcs, unity_size)
+            else:
+                batches = [srcs[i:i + unity_size] for i in range(0, len(srcs), unity_size)]
+            for unity_file_number, batch in enumerate(batches):
+                with init_language_file(comp.get_default_suffix(), unity_file_number) as ofile:
+                    for src in batch:
+                        ofile.write(f'#include<{src}>\n')
 
         for x in abs_files:
             mesonlib.replace_if_different(x, x + '.tmp')
         return result
 
+    @backend_cached
+    def get_build_history(self) -> T.Dict[str, NinjaLogEntry]:
+        '''The last build of every output recorded in .ninja_log, if any.'''
+        return NinjaLog.from_builddir(self.environment.get_build_dir()).entries
+
+    def get_adaptive_unity_batches(self, target: build.BuildTarget, comp: Compiler,
+                                   srcs: T.List[FileOrString], unity_size: int) -> T.List[T.List[FileOrString]]:
+        '''Group sources into unity files of similar compile times.
+
+        The compile time of a source is estimated from how long the unity
+        file it was in took to build last time, split between the files in it
+        by their size. Sources that have not been built yet are estimated from
+        their size alone.
+        '''
+        source_dir = self.environment.get_source_dir()
+        build_dir = self.environment.get_build_dir()
+        suffix = comp.get_default_suffix()
+        # Sources as written in the unity files
+        names = [str(s) for s in srcs]
+        sizes: T.Dict[str, int] = {}
+        for name, s in zip(names, srcs):
+            path = s.absolute_path(source_dir, build_dir) if isinstance(s, File) else os.path.join(build_dir, s)
+            try:
+                sizes[name] = os.path.getsize(path)
+            except OSError:
+                # Generated sources that have not been generated yet
+                pass
+        default_size = sum(sizes.values()) // len(sizes) if sizes else 1
+
+        def size(name: str) -> int:
+            return sizes.get(name, default_size)
+
+        # The current unity files tell which sources were compiled together
+        history = self.get_build_history()
+        previous: T.Dict[str, int] = {}
+        times: T.Dict[str, float] = {}
+        number = 0
+        while True:
+            unity_file = self.get_unity_source_file(target, suffix, number)
+            try:
+                with open(unity_file.absolute_path(source_dir, build_dir), encoding='utf-8') as f:
+                    members = [line[len('#include<'):-len('>\n')] for line in f]
+            except FileNotFoundError:
+                break
+            for m in members:
+                # A file left over from an earlier configuration may still
+                # list the source, the first one was written last
+                previous.setdefault(m, number)
+            obj = os.path.join(self.get_target_private_dir(target),
+                               self.object_filename_from_source(target, comp, unity_file))
+            entry = history.get(obj)
+            if entry is not None and members:
+                total = sum(size(m) for m in members) or 1
+                for m in members:
+                    times.setdefault(m, (entry.end - entry.start) * size(m) / total)
+            number += 1
+
+        # Time per byte, to bring the size of new sources to the same scale
+        timed = [n for n in names if n in times]
+        scale = sum(times[n] for n in timed) / (sum(size(n) for n in timed) or 1) if timed else 1.0
+        costs = [times[n] if n in times else size(n) * scale for n in names]
+        count = (len(srcs) + unity_size - 1) // unity_size
+        batches = balance_unity_batches(costs, count, [previous.get(n, -1) for n in names])
+        return [[srcs[i] for i in b] for b in batches]
+
     @staticmethod
     def relpath(todir: str, fromdir: str) -> str:
         return os.path.relpath(os.path.join('dummyprefixdir', todir),
@@ -654,37 +794,30 @@ class Backend:
         # It's also overridden for a few conditions that can't be handled
         # inside a command line
 
-        can_use_env = env.can_use_env and not force_serialize
-        force_serialize = force_serialize or bool(reasons)
+        # Setting variables and redirecting input and output are done by env
+        # and the shell where possible, which is much quicker than starting
+        # a Python interpreter.
+        prefix: T.List[str] = []
+        if reasons == ['to set env'] and env.can_use_env and not force_serialize and shutil.which('env'):
+            prefix = ['env'] + [f'{k}={v}' for k, v in env.get_env({}).items()]
+        else:
+            force_serialize = force_serialize or bool(reasons)
 
         if capture:
             reasons.append('to capture output')
         if feed:
             reasons.append('to feed input')
 
-        if can_use_env and reasons == ['to set env'] and shutil.which('env'):
-            envlist = []
-            for k, v in env.get_env({}).items():
-                envlist.append(f'{k}={v}')
-            return ['env'] + envlist + es.cmd_args, ', '.join(reasons)
+        if not force_serialize:
+            if not capture and not feed:
+                return prefix + es.cmd_args, ', '.join(reasons)
+            redirect = self.get_redirect_cmdline(capture, feed, verbose)
+            if redirect is not None:
+                return prefix + redirect + es.cmd_args, ', '.join(reasons)
 
         if any(a.startswith('@') for a in es.cmd_args):
             reasons.append('because command is too long')
 
-        if not force_serialize:
-            if not capture and not feed:
-                return es.cmd_args, ''
-            args: T.List[str] = []
-            if capture:
-                args += ['--capture', capture]
-            if feed:
-                args += ['--feed', feed]
-
-            return (
-                self.environment.get_build_command() + ['--internal', 'exe'] + args + ['--'] + es.cmd_args,
-                ', '.join(reasons)
-            )
-
         if isinstance(exe, (programs.ExternalProgram,
                             build.BuildTarget, build.CustomTarget)):
             basename = os.path.basename(exe.name)
@@ -706,13 +839,82 @@ class Backend:
         hasher.update(bytes(str(capture), encoding='utf-8'))
         hasher.update(bytes(str(feed), encoding='utf-8'))
         digest = hasher.hexdigest()
-        scratch_file = f'meson_exe_{basename}_{digest}.dat'
+        scratch_file = f'meson_exe_{basename}_{digest}'
         exe_data = os.path.join(self.environment.get_scratch_dir(), scratch_file)
-        with open(exe_data, 'wb') as f:
+
+        launcher = self.get_exe_launcher_cmdline(es, exe_data + '.marshal')
+        if launcher is not None:
+            return launcher, ', '.join(reasons)
+        with open(exe_data + '.dat', 'wb') as f:
             pickle.dump(es, f)
-        return (self.environment.get_build_command() + ['--internal', 'exe', '--unpickle', exe_data],
+        return (self.environment.get_build_command() + ['--internal', 'exe', '--unpickle', exe_data + '.dat'],
                 ', '.join(reasons))
 
+    def get_redirect_cmdline(self, capture: T.Optional[str], feed: T.Optional[str],
+                             verbose: bool = False) -> T.Optional[T.List[str]]:
+        '''A shell command that runs the command after it with its input and
+        output redirected like meson_exe.py does, or None without a shell.
+
+        Like meson_exe.py, the captured output is only written if it changed,
+        so that restat can skip rebuilding what depends on it, and unless
+        verbose the output of the command is only printed if it fails.
+        '''
+        if mesonlib.is_windows() or (capture and not shutil.which('cmp')):
+            return None
+        setup: T.List[str] = []
+        args: T.List[str] = []
+        command = '"$@"'
+        if capture:
+            args.append(capture)
+            setup.append(f'o=${len(args)}')
+        if feed:
+            args.append(feed)
+            setup.append(f'f=${len(args)}')
+            command += ' < "$f"'
+        setup.append(f'shift {len(args)}')
+        if capture:
+            if verbose:
+                run = f'{command} > "$o.tmp" || {{ r=$?; rm -f "$o.tmp"; exit $r; }}; '
+            else:
+                run = (f'e=$({command} 2>&1 > "$o.tmp") || '
+                       '{ r=$?; rm -f "$o.tmp"; printf \'%s\\n\' "--- stderr ---" "$e"; exit $r; }; ')
+            run += 'if cmp -s "$o.tmp" "$o"; then rm -f "$o.tmp"; else mv -f "$o.tmp" "$o"; fi'
+        elif verbose:
+            run = f'exec {command}'
+        else:
+            run = f'e=$({command} 2>&1) || {{ r=$?; printf \'%s\\n\' "$e"; exit $r; }}'
+        return ['/bin/sh', '-c', '; '.join(setup + [run]), 'sh'] + args
+
+    def get_exe_launcher_cmdline(self, es: ExecutableSerialisation, exe_data: str) -> T.Optional[T.List[str]]:
+        '''The command to run es with exelauncher.py, which does not import
+        Meson, or None if it needs meson_exe.py.'''
+        # Starting all of Meson would take longer than many commands
+        if len(mesonlib.python_command) != 1 or not os.path.isfile(exelauncher.__file__):
+            return None
+        cmd_args = es.cmd_args
+        if es.exe_wrapper:
+            if not es.exe_wrapper.found():
+                return None
+            wrapper = es.exe_wrapper.get_command()
+            # Wine paths are computed when running the command
+            if es.extra_paths and any('wine' in i for i in wrapper):
+                return None
+            cmd_args = wrapper + cmd_args
+        data = {
+            'cmd_args': cmd_args,
+            'env': es.env.get_operations() if es.env else [],
+            'unset': sorted(es.env.unset_vars) if es.env else [],
+            'extra_paths': es.extra_paths or [],
+            'workdir': es.workdir,
+            'capture': es.capture,
+            'feed': es.feed,
+            'verbose': es.verbose,
+        }
+        # Read by the same interpreter, and unlike json needs no import
+        with open(exe_data, 'wb') as f:
+            marshal.dump(data, f)
+        return mesonlib.python_command + ['-S', exelauncher.__file__, exe_data]
+
     def serialize_tests(self) -> T.Tuple[str, str]:
         test_data = os.path.join(self.environment.get_scratch_dir(), 'meson_test_setup.dat')
         with open(test_data, 'wb') as datafile:
@@ -2157,6 +2359,8 @@ class Backend:
             return target.subproject != ''
         raise MesonException(f'Internal error: invalid option type for "unity": {val}')
 
+    # Options are looked up for every source of every target.
+    @backend_cached
     def get_target_option(self, target: build.BuildTarget, name: T.Union[str, OptionKey]) -> ElementaryOptionValues:
         if isinstance(name, str):
             key = OptionKey(name, subproject=target.subproject)
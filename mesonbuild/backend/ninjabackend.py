@@ -10,12 +10,19 @@ from enum import Enum, unique
 from functools import lru_cache
 from pathlib import PurePath, Path
 from textwrap import dedent
+import hashlib
+import io
 import itertools
 import json
+import multiprocessing
 import os
 import pickle
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
+import threading
 import typing as T
 
 from . import backends
@@ -24,6 +31,8 @@ from .. import environment, mesonlib
 from .. import build
 from .. import mlog
 from .. import compilers
+from .. import coredata
+from .. import dependencies
 from ..arglist import CompilerArgs
 from ..compilers import Compiler
 from ..linkers import ArLikeLinker, RSPFileSyntax
@@ -31,8 +40,9 @@ from ..mesonlib import (
     File, LibType, MachineChoice, MesonBugException, MesonException, OrderedSet, PerMachine,
     ProgressBar, quote_arg
 )
-from ..mesonlib import get_compiler_for_source, has_path_sep, is_parent_path
+from ..mesonlib import determine_worker_count, get_compiler_for_source, has_path_sep, is_parent_path
 from ..options import OptionKey
+from ..scripts import linkmem
 from .backends import CleanTrees
 from ..build import GeneratedList, InvalidArguments
 
@@ -95,15 +105,51 @@ def gcc_rsp_quote(s: str) -> str:
 # a conservative estimate of the command-line length limit
 rsp_threshold = mesonlib.get_rsp_threshold()
 
+# With backend_link_pools=auto, the peak memory assumed for links that have
+# not been recorded yet
+LIGHT_LINK_MEMORY = 256 * 1024 * 1024
+HEAVY_LINK_MEMORY = 2 * 1024 * 1024 * 1024
+# Links that were seen using more memory than this go to the heavy link pool
+HEAVY_LINK_THRESHOLD = 1024 * 1024 * 1024
+# Links of more objects than this are assumed to be heavy until recorded
+HEAVY_LINK_OBJECTS = 200
+
+def link_pool_depths(memory: T.Optional[int], cpus: int, light: int, heavy: int) -> T.Tuple[int, int]:
+    '''Depths of the light and heavy link pools, given the peak memory of a link of each.
+
+    Links may use three quarters of the memory, leaving the rest for the
+    compilers and the rest of the machine. Heavy links get at most half of
+    that and light links the remainder.
+    '''
+    if memory is None:
+        return cpus, max(1, cpus // 4)
+    budget = memory * 3 // 4
+    heavy_depth = max(1, min(cpus, budget // 2 // heavy))
+    light_depth = max(1, min(cpus, (budget - heavy_depth * heavy) // light))
+    return light_depth, heavy_depth
+
 # ninja variables whose value should remain unquoted. The value of these ninja
 # variables (or variables we use them in) is interpreted directly by ninja
 # (e.g. the value of the depfile variable is a pathname that ninja will read
 # from, etc.), so it must not be shell quoted.
 raw_names = {'DEPFILE_UNQUOTED', 'DESC', 'pool', 'description', 'targetdep', 'dyndep'}
 
+# Targets using these languages change state of the backend that fragments
+# do not record, so they are always generated by the main process
+NON_FRAGMENT_LANGUAGES = {'cs', 'cython', 'd', 'fortran', 'java', 'rust', 'swift', 'vala'}
+# Starting workers takes longer than generating fewer targets
+MIN_PARALLEL_FRAGMENTS = 64
+# Where the fragments of the last generation are kept, relative to the build dir
+FRAGMENTS_FILE = os.path.join('meson-private', 'ninja_fragments.dat')
+
 NINJA_QUOTE_BUILD_PAT = re.compile(r"[$ :\n]")
 NINJA_QUOTE_VAR_PAT = re.compile(r"[$ \n]")
 
+def probe_link_dependency(path: str) -> str:
+    # What guessing the link dependencies of a target saw of a file: the
+    # file it leads to, or nothing if it is missing
+    return os.path.realpath(path) if os.path.isfile(path) else ''
+
 def ninja_quote(text: str, is_build_line: bool = False) -> str:
     if '\n' in text:
         errmsg = f'''Ninja does not support newlines in rules. The content was:
@@ -119,6 +165,89 @@ Please report this error with a test case to the Meson bug tracker.'''
 
     return text
 
+# The same flags, include directories and libraries show up in many build
+# statements, so keep their quoted forms around. The cache is bounded because
+# per-source values such as depfile names never repeat.
+@lru_cache(maxsize=8192)
+def ninja_quote_arg(arg: str, qf: T.Callable[[str], str]) -> str:
+    return ninja_quote(shell_quote_arg(arg, qf))
+
+@lru_cache(maxsize=8192)
+def shell_quote_arg(arg: str, qf: T.Callable[[str], str]) -> str:
+    return qf(arg)
+
+json_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+NINJA_EVAL_PAT = re.compile(r'\$(?:\{([a-zA-Z0-9_.-]*)\}|([a-zA-Z0-9_-]+)|(.))', re.DOTALL)
+
+def ninja_evaluate(text: str, variables: T.Mapping[str, str]) -> str:
+    """Expand variable references and escapes in a ninja string, like ninja does."""
+    def repl(m: T.Match[str]) -> str:
+        name = m.group(1) if m.group(1) is not None else m.group(2)
+        if name is not None:
+            # undefined ninja variables are empty
+            return variables.get(name, '')
+        # '$$', '$ ' and '$:'; '$' followed by a newline is a line continuation
+        return m.group(3) if m.group(3) != '\n' else ''
+    return NINJA_EVAL_PAT.sub(repl, text)
+
+def ninja_canonicalize_path(path: str) -> str:
+    # see: CanonicalizePath() in ninja. Each component keeps the separator
+    # that followed it: ninja uses '/' for the path of a node, but on Windows it
+    # puts back the backslashes when it expands $in and $out.
+    result: T.List[str] = []
+    components: T.List[int] = []
+    start = 0
+    if path[:1] in NINJA_PATH_SEPARATORS:
+        result.append(path[0])
+        start = 1
+        if mesonlib.is_windows() and path[1:2] in NINJA_PATH_SEPARATORS:
+            # UNC path
+            result.append(path[1])
+            start = 2
+    for m in NINJA_PATH_COMPONENT_PAT.finditer(path, start):
+        name, sep = m.groups()
+        if not name or name == '.':
+            continue
+        if name == '..' and components:
+            del result[components.pop():]
+            continue
+        if name != '..':
+            components.append(len(result))
+        result.append(name + sep)
+    canonical = ''.join(result)
+    if len(canonical) > 1 and canonical[-1] in NINJA_PATH_SEPARATORS:
+        canonical = canonical[:-1]
+    return canonical or '.'
+
+if mesonlib.is_windows():
+    NINJA_PATH_SEPARATORS = '/\\'
+    NINJA_PATH_COMPONENT_PAT = re.compile(r'([^/\\]*)([/\\]?)')
+
+    def ninja_node_path(path: str) -> str:
+        return path.replace('\\', '/')
+
+    def ninja_path_escape(path: str) -> str:
+        # see: GetWin32EscapedString() in ninja
+        if ' ' not in path and '"' not in path:
+            return path
+        trailing = len(path) - len(path.rstrip('\\'))
+        return '"' + re.sub(r'(\\*)"', r'\1\1\\"', path) + '\\' * trailing + '"'
+else:
+    NINJA_PATH_SEPARATORS = '/'
+    NINJA_PATH_COMPONENT_PAT = re.compile(r'([^/]*)(/?)')
+
+    def ninja_node_path(path: str) -> str:
+        return path
+
+    NINJA_SHELL_SAFE_PAT = re.compile(r'[A-Za-z0-9_+./-]*')
+
+    def ninja_path_escape(path: str) -> str:
+        # see: GetShellEscapedString() in ninja
+        if NINJA_SHELL_SAFE_PAT.fullmatch(path):
+            return path
+        return "'" + path.replace("'", "'\\''") + "'"
+
 
 @dataclass
 class TargetDependencyScannerInfo:
@@ -167,6 +296,26 @@ class NinjaComment:
             outfile.write('\n')
         outfile.write('\n')
 
+class NinjaSharedArgs:
+
+    """Compile arguments shared by the sources of a target.
+
+    They are written once as a top-level variable, which the build statements
+    of the sources refer to instead of repeating the whole list. The variable
+    is only written if more than one build statement ends up using it.
+    """
+
+    def __init__(self, name: str, args: T.List[str]) -> None:
+        self.name = name
+        self.args = args
+        self.refcount = 0
+
+    def write(self, outfile: T.TextIO) -> None:
+        if self.refcount < 2:
+            return
+        args = ' '.join([ninja_quote_arg(i, quote_func) for i in self.args])
+        outfile.write(f'{self.name} = {args}\n\n')
+
 class NinjaRule:
     def __init__(self, rule: str, command: CommandArgOrStr, args: CommandArgOrStr,
                  description: str, rspable: bool = False, deps: T.Optional[str] = None,
@@ -225,7 +374,15 @@ class NinjaRule:
             return ninja_quote(x.s)
         return ninja_quote(qf(str(x)))
 
-    def write(self, outfile: T.TextIO) -> None:
+    @mesonlib.lazy_property
+    def rsp_command_str(self) -> str:
+        command = ' '.join([self._quoter(x) for x in self.command])
+        if self.rspfile_quote_style is RSPFileSyntax.TASKING:
+            return f'{command} --option-file=$out.rsp'
+        return f'{command} @$out.rsp'
+
+    @mesonlib.lazy_property
+    def rspfile_content_str(self) -> str:
         rspfile_args = self.args
         rspfile_quote_func: T.Callable[[str], str]
         if self.rspfile_quote_style in {RSPFileSyntax.MSVC, RSPFileSyntax.TASKING}:
@@ -233,7 +390,9 @@ class NinjaRule:
             rspfile_args = [NinjaCommandArg('$in_newline', arg.quoting) if arg.s == '$in' else arg for arg in rspfile_args]
         else:
             rspfile_quote_func = gcc_rsp_quote
+        return ' '.join([self._quoter(x, rspfile_quote_func) for x in rspfile_args])
 
+    def write(self, outfile: T.TextIO) -> None:
         def rule_iter() -> T.Iterable[str]:
             if self.refcount:
                 yield ''
@@ -243,12 +402,9 @@ class NinjaRule:
         for rsp in rule_iter():
             outfile.write(f'rule {self.name}{rsp}\n')
             if rsp == '_RSP':
-                if self.rspfile_quote_style is RSPFileSyntax.TASKING:
-                    outfile.write(' command = {} --option-file=$out.rsp\n'.format(' '.join([self._quoter(x) for x in self.command])))
-                else:
-                    outfile.write(' command = {} @$out.rsp\n'.format(' '.join([self._quoter(x) for x in self.command])))
+                outfile.write(f' command = {self.rsp_command_str}\n')
                 outfile.write(' rspfile = $out.rsp\n')
-                outfile.write(' rspfile_content = {}\n'.format(' '.join([self._quoter(x, rspfile_quote_func) for x in rspfile_args])))
+                outfile.write(f' rspfile_content = {self.rspfile_content_str}\n')
             else:
                 outfile.write(' command = {}\n'.format(self.command_str))
             if self.deps:
@@ -312,6 +468,7 @@ class NinjaBuildElement:
         self.elems = []
         self.all_outputs = all_outputs
         self.output_errors = ''
+        self.shared_args: T.Optional[NinjaSharedArgs] = None
 
     def add_dep(self, dep: T.Union[str, T.List[str]]) -> None:
         if isinstance(dep, list):
@@ -346,25 +503,42 @@ class NinjaBuildElement:
         if not self.rule.rspable:
             return False
 
-        infilenames = ' '.join([ninja_quote(i, True) for i in self.infilenames])
-        outfilenames = ' '.join([ninja_quote(i, True) for i in self.outfilenames])
-
-        return self.rule.length_estimate(infilenames,
-                                         outfilenames,
+        return self.rule.length_estimate(self._quoted_infilenames,
+                                         self._quoted_outfilenames,
                                          self.elems) >= rsp_threshold
 
+    @mesonlib.lazy_property
+    def _quote_func(self) -> T.Callable[[str], str]:
+        if self._should_use_rspfile:
+            if self.rule.rspfile_quote_style in {RSPFileSyntax.MSVC, RSPFileSyntax.TASKING}:
+                return cmd_quote
+            return gcc_rsp_quote
+        return quote_func
+
+    @mesonlib.lazy_property
+    def _quoted_infilenames(self) -> str:
+        return ' '.join([ninja_quote(i, True) for i in self.infilenames])
+
+    @mesonlib.lazy_property
+    def _quoted_outfilenames(self) -> str:
+        return ' '.join([ninja_quote(i, True) for i in self.outfilenames])
+
     def count_rule_references(self) -> None:
         if self.rulename != 'phony':
             if self._should_use_rspfile:
                 self.rule.rsprefcount += 1
+                # Response files are quoted differently
+                self.shared_args = None
             else:
                 self.rule.refcount += 1
+                if self.shared_args is not None:
+                    self.shared_args.refcount += 1
 
     def write(self, outfile: T.TextIO) -> None:
         if self.output_errors:
             raise MesonException(self.output_errors)
-        ins = ' '.join([ninja_quote(i, True) for i in self.infilenames])
-        outs = ' '.join([ninja_quote(i, True) for i in self.outfilenames])
+        ins = self._quoted_infilenames
+        outs = self._quoted_outfilenames
         implicit_outs = ' '.join([ninja_quote(i, True) for i in self.implicit_outfilenames])
         if implicit_outs:
             implicit_outs = ' | ' + implicit_outs
@@ -394,30 +568,55 @@ class NinjaBuildElement:
                 (l.replace('//', '\\\\', 1) if l.startswith('//') else l)
                 for l in line.split(' ')
             )
-        outfile.write(line)
-
-        if use_rspfile:
-            if self.rule.rspfile_quote_style in {RSPFileSyntax.MSVC, RSPFileSyntax.TASKING}:
-                qf = cmd_quote
-            else:
-                qf = gcc_rsp_quote
-        else:
-            qf = quote_func
+        lines = [line]
 
+        qf = self._quote_func
         for e in self.elems:
             (name, elems) = e
             should_quote = name not in raw_names
-            line = f' {name} = '
             newelems = []
+            if name == 'ARGS' and self.shared_args is not None and self.shared_args.refcount > 1:
+                newelems.append(f'${{{self.shared_args.name}}}')
+                elems = elems[len(self.shared_args.args):]
             for i in elems:
                 if not should_quote or i == '&&': # Hackety hack hack
                     newelems.append(ninja_quote(i))
                 else:
-                    newelems.append(ninja_quote(qf(i)))
-            line += ' '.join(newelems)
-            line += '\n'
-            outfile.write(line)
-        outfile.write('\n')
+                    newelems.append(ninja_quote_arg(i, qf))
+            lines.append(f' {name} = {" ".join(newelems)}\n')
+        lines.append('\n')
+        outfile.write(''.join(lines))
+
+    def compdb_entry(self, directory: str) -> str:
+        '''Return the compilation database entry for this build statement.
+
+        This is what `ninja -t compdb -x` would print for it.
+        '''
+        inputs = [ninja_canonicalize_path(i) for i in self.infilenames]
+        outputs = [ninja_canonicalize_path(i) for i in self.outfilenames]
+        qf = self._quote_func
+        variables: T.Dict[str, str] = {}
+        for name, elems in self.elems:
+            if name in raw_names:
+                variables[name] = ' '.join(elems)
+            else:
+                variables[name] = ' '.join([i if i == '&&' else shell_quote_arg(i, qf) for i in elems])
+        variables['in'] = ' '.join([ninja_path_escape(i) for i in inputs])
+        variables['in_newline'] = '\n'.join([ninja_path_escape(i) for i in inputs])
+        variables['out'] = ' '.join([ninja_path_escape(i) for i in outputs])
+        if self._should_use_rspfile:
+            command = ninja_evaluate(self.rule.rsp_command_str, variables)
+            rspfile = ' '.join(outputs) + '.rsp'
+            index = command.find(rspfile)
+            if index > 0 and command[index - 1] == '@':
+                content = ninja_evaluate(self.rule.rspfile_content_str, variables).replace('\n', ' ')
+                command = command[:index - 1] + content + command[index + len(rspfile):]
+        else:
+            command = ninja_evaluate(self.rule.command_str, variables)
+        return (f'\n  {{\n    "directory": {json_encode(directory)},'
+                f'\n    "command": {json_encode(command)},'
+                f'\n    "file": {json_encode(ninja_node_path(inputs[0]))},'
+                f'\n    "output": {json_encode(ninja_node_path(outputs[0]))}\n  }}')
 
     def check_outputs(self) -> None:
         for n in self.outfilenames:
@@ -425,6 +624,130 @@ class NinjaBuildElement:
                 self.output_errors = f'Multiple producers for Ninja target "{n}". Please rename your targets.'
             self.all_outputs.add(n)
 
+class TargetDefinitionPickler(pickle.Pickler):
+
+    """Pickles what the build statements of a target are generated from, to
+    find out if it changed since the last generation.
+
+    Other targets are only referred to by their ids, as what they are
+    generated from is compared separately. Neither are the environment and
+    the compilers pickled, as they are compared once for all targets, by
+    pickling them without a target. Sets are sorted, so that the result does
+    not depend on hash randomization. Sets of other items than strings are
+    sorted by how the items are pickled.
+    """
+
+    def __init__(self, file: T.BinaryIO, target: T.Optional[build.Target], build_dir: str):
+        super().__init__(file, protocol=4)
+        # Without the memo, equal objects are pickled the same whether they
+        # are the same object or not. Cycles raise ValueError instead.
+        self.fast = True
+        self.target = target
+        self.target_seen = False
+        self.build_dir = build_dir
+        # The ids of the other targets referred to, in order
+        self.references: T.Dict[str, None] = {}
+
+    def persistent_id(self, obj: T.Any) -> T.Any:
+        if isinstance(obj, (set, frozenset)):
+            # Done here, as reducer_override() is not called for sets. Not
+            # all items that can be compared are ordered completely.
+            if all(isinstance(i, str) for i in obj):
+                return (type(obj).__name__, sorted(obj))
+            return (type(obj).__name__, sorted(obj, key=self.pickle_item))
+        if self.target is None:
+            return None
+        if obj is self.target:
+            if self.target_seen:
+                return 'self'
+            self.target_seen = True
+            return None
+        if isinstance(obj, build.Target):
+            self.references[obj.get_id()] = None
+            return obj.get_id()
+        if isinstance(obj, (environment.Environment, coredata.CoreData, build.Build)):
+            return type(obj).__name__
+        if isinstance(obj, Compiler):
+            return (obj.for_machine.get_lower_case_name(), obj.language, obj.id, obj.mode)
+        return None
+
+    def pickle_item(self, obj: T.Any) -> bytes:
+        f = io.BytesIO()
+        TargetDefinitionPickler(f, self.target, self.build_dir).dump(obj)
+        return f.getvalue()
+
+    def reducer_override(self, obj: T.Any) -> T.Any:
+        if isinstance(obj, build.IncludeDirs):
+            # Whether the directories exist in the build dir decides if they
+            # are used, see NinjaBackend.generate_inc_dir()
+            dirs = [os.path.normpath(os.path.join(obj.curdir, d)) if d not in {'', '.'} else obj.curdir
+                    for d in obj.incdirs]
+            return type(obj), (), (obj.__dict__, [os.path.isdir(os.path.join(self.build_dir, d)) for d in dirs])
+        if isinstance(obj, File):
+            # Its hash is randomized
+            return type(obj), (obj.is_built, obj.subdir, obj.fname)
+        if isinstance(obj, Compiler):
+            # Its preprocessor is made from it, and refers back to it
+            state = {k: v for k, v in obj.__dict__.items() if k not in {'modes', 'preprocessor'}}
+            return type(obj), (), state
+        if isinstance(obj, dependencies.Dependency):
+            # Their ids are random, and so are the names of those without one,
+            # which copies keep
+            state = {k: v for k, v in obj.__dict__.items() if k != '_id'}
+            if obj.name is not None and re.fullmatch(r'dep[0-9]+', obj.name):
+                state['name'] = None
+            return type(obj), (), state
+        if obj is self.target:
+            # Leave out what is computed and cached when asked for, and the
+            # keyword arguments it was created from, in no particular order
+            cls = type(obj)
+            state = {k: v for k, v in obj.__dict__.items()
+                     if k not in {'link_closures', 'original_kwargs'} and
+                     not isinstance(getattr(cls, k, None), mesonlib.lazy_property)}
+            return cls, (), state
+        return NotImplemented
+
+@dataclass
+class NinjaTargetFragment:
+
+    """The build statements of a single target, already written out, and
+    what generating them added to the rest of the build file.
+
+    Worker processes generate fragments for targets that can be generated on
+    their own, and the fragments of the last generation are kept for the
+    next one. The main process adds them in the place of the target, unless
+    they clash with something that was generated before them.
+    """
+
+    tid: str
+    text: str
+    compdb: T.List[str]
+    # Uses of each rule, without and with a response file
+    rule_counts: T.Dict[str, T.Tuple[int, int]]
+    outputs: T.List[str]
+    shared_arg_names: T.List[str]
+    introspection: T.Dict[T.Tuple[str, T.Tuple[str, ...]], T.Dict[str, T.Any]]
+    light_links: T.List[str]
+    heavy_links: T.List[str]
+    # What guessing its link dependencies saw of the files it looked for, see
+    # probe_link_dependency(). None if that is not known.
+    link_probes: T.Optional[T.Dict[str, str]]
+
+    def write(self, outfile: T.TextIO) -> None:
+        outfile.write(self.text)
+
+# The backend that worker processes generate fragments with, which they get
+# a copy of when they are forked
+_fragment_backend: T.Optional[NinjaBackend] = None
+
+def _prepare_fragment_worker() -> None:
+    assert _fragment_backend is not None, 'for mypy'
+    _fragment_backend.prepare_fragment_worker()
+
+def _generate_worker_fragment(tid: str) -> T.Optional[NinjaTargetFragment]:
+    assert _fragment_backend is not None, 'for mypy'
+    return _fragment_backend.generate_worker_fragment(tid)
+
 @dataclass
 class RustDep:
 
@@ -493,6 +816,20 @@ class NinjaBackend(backends.Backend):
         self.implicit_meson_outs: T.List[str] = []
         self._uses_dyndeps = False
         self._generated_header_cache: T.Dict[str, T.List[FileOrString]] = {}
+        self.shared_compile_args: T.Dict[T.Tuple[str, str], NinjaSharedArgs] = {}
+        self.shared_compile_arg_names: T.Set[str] = set()
+        self.compdb_rules: T.Set[str] = set()
+        self.compdb_directory = ''
+        self.compdb_entries = 0
+        # Fragments generated by worker processes or kept from the last
+        # generation, by target id
+        self.target_fragments: T.Dict[str, NinjaTargetFragment] = {}
+        # The keys of the fragments of this generation, and the fragments
+        self.fragment_keys: T.Dict[str, str] = {}
+        self.generated_fragments: T.Dict[str, NinjaTargetFragment] = {}
+        # The files guess_external_link_dependencies() looked for, None
+        # where they are not known
+        self.link_probes: T.List[T.Optional[T.Tuple[str, ...]]] = []
         # nvcc chokes on thin archives:
         #   nvlink fatal   : Could not open input file 'libfoo.a.p'
         #   nvlink fatal   : elfLink internal error
@@ -622,64 +959,105 @@ class NinjaBackend(backends.Backend):
             outfile.write('# Do not edit by hand.\n\n')
             outfile.write('ninja_required_version = 1.8.2\n\n')
 
-            num_pools = self.environment.coredata.optstore.get_value_for('backend_max_links')
-            if num_pools > 0:
-                outfile.write(f'''pool link_pool
-  depth = {num_pools}
-
-''')
-
-        with self.detect_vs_dep_prefix(tempfilename) as outfile:
-            self.generate_rules()
-
-            self.build_elements = []
-            self.generate_phony()
-            self.add_build_comment(NinjaComment('Build rules for targets'))
-
-            # Optionally capture compile args per target, for later use (i.e. VisStudio project's NMake intellisense include dirs, defines, and compile options).
-            if capture:
-                captured_compile_args_per_target = {}
-                for target in self.build.get_targets().values():
-                    if isinstance(target, build.BuildTarget):
-                        captured_compile_args_per_target[target.get_id()] = self.generate_common_compile_args_per_src_type(target)
-
-            for t in ProgressBar(self.build.get_targets().values(), desc='Generating targets'):
-                self.generate_target(t)
-            mlog.log_timestamp("Targets generated")
-            self.add_build_comment(NinjaComment('Test rules'))
-            self.generate_tests()
-            mlog.log_timestamp("Tests generated")
-            self.add_build_comment(NinjaComment('Install rules'))
-            self.generate_install()
-            mlog.log_timestamp("Install generated")
-            self.generate_dist()
-            mlog.log_timestamp("Dist generated")
-            key = OptionKey('b_coverage')
-            if key in self.environment.coredata.optstore and\
-                    self.environment.coredata.optstore.get_value_for('b_coverage'):
-                gcovr_exe, gcovr_version, lcov_exe, lcov_version, genhtml_exe, llvm_cov_exe = environment.find_coverage_tools(self.environment.coredata)
-                mlog.debug(f'Using {gcovr_exe} ({gcovr_version}), {lcov_exe} and {llvm_cov_exe} for code coverage')
-                if gcovr_exe or (lcov_exe and genhtml_exe):
-                    self.add_build_comment(NinjaComment('Coverage rules'))
-                    self.generate_coverage_rules(gcovr_exe, gcovr_version, llvm_cov_exe)
-                    mlog.log_timestamp("Coverage rules generated")
-                else:
-                    # FIXME: since we explicitly opted in, should this be an error?
-                    # The docs just say these targets will be created "if possible".
-                    mlog.warning('Need gcovr or lcov/genhtml to generate any coverage reports')
-            self.add_build_comment(NinjaComment('Suffix'))
-            self.generate_utils()
-            mlog.log_timestamp("Utils generated")
-            self.generate_ending()
-
-            self.write_rules(outfile)
-            self.write_builds(outfile)
-
-            default = 'default all\n\n'
-            outfile.write(default)
-        # Only overwrite the old build file after the new one has been
-        # fully created.
-        os.replace(tempfilename, outfilename)
+        # Peak memory of the links of earlier builds, by output
+        self.link_memory: T.Optional[T.Dict[str, int]] = None
+        link_memory_file = os.path.join(self.environment.get_build_dir(), linkmem.LINK_MEMORY_FILE)
+        if self.environment.coredata.optstore.get_value_for('backend_link_pools') == 'auto':
+            self.link_memory = linkmem.read_peak_memory(link_memory_file)
+        self.light_links: T.List[str] = []
+        self.heavy_links: T.List[str] = []
+
+        # Build statements are written out as soon as they are complete, so
+        # that they do not all have to be kept in memory. They go to a
+        # separate file first, because only the rules that are used are
+        # written, and those have to come first. The compilation database is
+        # written alongside them.
+        compdbfilename = os.path.join(self.environment.get_build_dir(), 'compile_commands.json')
+        compdbtempname = compdbfilename + '~'
+        try:
+            with self.detect_vs_dep_prefix(tempfilename) as outfile, \
+                    tempfile.TemporaryFile('w+', encoding='utf-8', dir=self.environment.get_build_dir()) as buildsfile, \
+                    open(compdbtempname, 'w', encoding='utf-8') as compdbfile:
+                self.generate_rules()
+                self.compdb_rules = self.get_compdb_rules()
+                self.compdb_directory = os.path.realpath(self.environment.get_build_dir())
+                self.compdb_entries = 0
+                compdbfile.write('[')
+
+                self.build_elements = []
+                self.shared_compile_args = {}
+                self.shared_compile_arg_names = set()
+                self.generate_phony()
+                self.add_build_comment(NinjaComment('Build rules for targets'))
+                fragments_context = self.get_fragments_context()
+                self.fragment_keys = self.get_fragment_keys()
+                self.target_fragments = self.load_fragments(fragments_context)
+                self.target_fragments.update(self.generate_parallel_fragments(
+                    [t for t in self.build.get_targets().values()
+                     if self.can_generate_fragment(t) and t.get_id() not in self.target_fragments]))
+
+                # Optionally capture compile args per target, for later use (i.e. VisStudio project's NMake intellisense include dirs, defines, and compile options).
+                if capture:
+                    captured_compile_args_per_target = {}
+                    for target in self.build.get_targets().values():
+                        if isinstance(target, build.BuildTarget):
+                            captured_compile_args_per_target[target.get_id()] = self.generate_common_compile_args_per_src_type(target)
+
+                for t in ProgressBar(self.build.get_targets().values(), desc='Generating targets'):
+                    self.generate_target(t)
+                    self.write_builds(buildsfile, compdbfile)
+                mlog.log_timestamp("Targets generated")
+                self.add_build_comment(NinjaComment('Test rules'))
+                self.generate_tests()
+                mlog.log_timestamp("Tests generated")
+                self.add_build_comment(NinjaComment('Install rules'))
+                self.generate_install()
+                mlog.log_timestamp("Install generated")
+                self.generate_dist()
+                mlog.log_timestamp("Dist generated")
+                key = OptionKey('b_coverage')
+                if key in self.environment.coredata.optstore and\
+                        self.environment.coredata.optstore.get_value_for('b_coverage'):
+                    gcovr_exe, gcovr_version, lcov_exe, lcov_version, genhtml_exe, llvm_cov_exe = environment.find_coverage_tools(self.environment.coredata)
+                    mlog.debug(f'Using {gcovr_exe} ({gcovr_version}), {lcov_exe} and {llvm_cov_exe} for code coverage')
+                    if gcovr_exe or (lcov_exe and genhtml_exe):
+                        self.add_build_comment(NinjaComment('Coverage rules'))
+                        self.generate_coverage_rules(gcovr_exe, gcovr_version, llvm_cov_exe)
+                        mlog.log_timestamp("Coverage rules generated")
+                    else:
+                        # FIXME: since we explicitly opted in, should this be an error?
+                        # The docs just say these targets will be created "if possible".
+                        mlog.warning('Need gcovr or lcov/genhtml to generate any coverage reports')
+                self.add_build_comment(NinjaComment('Suffix'))
+                self.generate_utils()
+                mlog.log_timestamp("Utils generated")
+                self.generate_ending()
+                self.write_builds(buildsfile, compdbfile)
+                mlog.log_timestamp("build.ninja generated")
+
+                self.write_pools(outfile)
+                self.write_rules(outfile)
+                buildsfile.seek(0)
+                shutil.copyfileobj(buildsfile, outfile)
+
+                default = 'default all\n\n'
+                outfile.write(default)
+                compdbfile.write('\n]\n')
+            # Only overwrite the old build file after the new one has been
+            # fully created.
+            os.replace(tempfilename, outfilename)
+            # Tools such as clangd watch the compilation database, so leave it
+            # alone if nothing changed.
+            mesonlib.replace_if_different(compdbfilename, compdbtempname)
+        finally:
+            # Do not leave a partial database behind if generating failed
+            if os.path.exists(compdbtempname):
+                os.unlink(compdbtempname)
+        self.save_fragments(fragments_context)
+        if self.link_memory:
+            # Forget about links that are gone and older runs of the others
+            linkmem.write_peak_memory(link_memory_file, {o: m for o, m in self.link_memory.items()
+                                                         if o in self.all_outputs})
         mlog.cmd_ci_include(outfilename)  # For CI debugging
         # Refresh Ninja's caches. https://github.com/ninja-build/ninja/pull/1685
         # Cannot use when running with dyndeps: https://github.com/ninja-build/ninja/issues/1952
@@ -688,7 +1066,6 @@ class NinjaBackend(backends.Backend):
                 and os.path.exists(os.path.join(self.environment.build_dir, '.ninja_log'))):
             subprocess.call(self.ninja_command + ['-t', 'restat'], cwd=self.environment.build_dir)
             subprocess.call(self.ninja_command + ['-t', 'cleandead'], cwd=self.environment.build_dir)
-        self.generate_compdb()
         self.generate_rust_project_json()
 
         if capture:
@@ -710,30 +1087,18 @@ class NinjaBackend(backends.Backend):
                 f, indent=4)
 
     # http://clang.llvm.org/docs/JSONCompilationDatabase.html
-    def generate_compdb(self) -> None:
-        rules = []
+    def get_compdb_rules(self) -> T.Set[str]:
+        rules: T.Set[str] = set()
         # TODO: Rather than an explicit list here, rules could be marked in the
         # rule store as being wanted in compdb
         for for_machine in MachineChoice:
             for compiler in self.environment.coredata.compilers[for_machine].values():
-                rules += [f"{rule}{ext}" for rule in [self.compiler_to_rule_name(compiler)]
-                          for ext in ['', '_RSP']]
-                rules += [f"{rule}{ext}" for rule in [self.compiler_to_pch_rule_name(compiler)]
-                          for ext in ['', '_RSP']]
+                rules.add(self.compiler_to_rule_name(compiler))
+                rules.add(self.compiler_to_pch_rule_name(compiler))
                 # Add custom MIL link rules to get the files compiled by the TASKING compiler family to MIL files included in the database
                 if compiler.get_id() == 'tasking':
-                    rule = self.get_compiler_rule_name('tasking_mil_compile', compiler.for_machine)
-                    rules.append(rule)
-                    rules.append(f'{rule}_RSP')
-        compdb_options = ['-x'] if mesonlib.version_compare(self.ninja_version, '>=1.9') else []
-        ninja_compdb = self.ninja_command + ['-t', 'compdb'] + compdb_options + rules
-        builddir = self.environment.get_build_dir()
-        try:
-            jsondb = subprocess.check_output(ninja_compdb, cwd=builddir)
-            with open(os.path.join(builddir, 'compile_commands.json'), 'wb') as f:
-                f.write(jsondb)
-        except Exception:
-            mlog.warning('Could not create compilation database.', fatal=False)
+                    rules.add(self.get_compiler_rule_name('tasking_mil_compile', compiler.for_machine))
+        return rules
 
     # Get all generated headers. Any source file might need them so
     # we need to add an order dependency to them.
@@ -878,8 +1243,6 @@ class NinjaBackend(backends.Backend):
             self.generate_custom_target(target)
         if isinstance(target, build.RunTarget):
             self.generate_run_target(target)
-        compiled_sources: T.List[str] = []
-        source2object: T.Dict[str, str] = {}
         name = target.get_id()
         if name in self.processed_targets:
             return
@@ -891,6 +1254,25 @@ class NinjaBackend(backends.Backend):
 
         self.generate_shlib_aliases(target, self.get_target_dir(target))
 
+        fragment = self.target_fragments.pop(name, None)
+        if fragment is None or not self.add_fragment(fragment):
+            if name not in self.fragment_keys:
+                self.generate_target_builds(target)
+                return
+            fragment = self.generate_fragment(target)
+            if fragment is None:
+                return
+            self.build_elements.append(fragment)
+            if any(n.endswith('_') for n in fragment.shared_arg_names):
+                # The names of its shared arguments avoid those of an earlier
+                # target, which may be gone the next time
+                return
+        self.generated_fragments[name] = fragment
+
+    def generate_target_builds(self, target) -> None:
+        compiled_sources: T.List[str] = []
+        source2object: T.Dict[str, str] = {}
+
         # If target uses a language that cannot link to C objects,
         # just generate for that language and return.
         if isinstance(target, build.Jar):
@@ -1094,6 +1476,262 @@ class NinjaBackend(backends.Backend):
                 elem = NinjaBuildElement(self.all_outputs, linker.get_archive_name(outname), 'AIX_LINKER', [outname])
                 self.add_build(elem)
 
+    def can_generate_fragment(self, target: build.Target) -> bool:
+        '''Whether the build statements of the target can be generated
+        without the other targets, as a fragment.'''
+        if not isinstance(target, build.BuildTarget) or isinstance(target, build.Jar):
+            return False
+        if not NON_FRAGMENT_LANGUAGES.isdisjoint(target.compilers) or target.uses_rust():
+            return False
+        return not (self.is_unity(target) or target.has_pch() or self.should_use_dyndeps_for_target(target))
+
+    def get_fragment_state(self) -> T.Tuple[int, int, int]:
+        # What generating a fragment must not change, as it is not recorded
+        return len(self.rules), len(self.processed_targets), mlog.get_warning_count()
+
+    def generate_fragment(self, target: build.BuildTarget) -> T.Optional[NinjaTargetFragment]:
+        '''Generate the build statements of the target, and write them out as
+        a fragment.
+
+        If generating them changed something else a fragment does not record,
+        the statements are left as they are and None is returned.
+        '''
+        tid = target.get_id()
+        start = len(self.build_elements)
+        probes_start = len(self.link_probes)
+        light_start = len(self.light_links)
+        heavy_start = len(self.heavy_links)
+        state = self.get_fragment_state()
+        self.generate_target_builds(target)
+        elements = self.build_elements[start:]
+        if self.get_fragment_state() != state or \
+                not all(isinstance(e, (NinjaBuildElement, NinjaSharedArgs)) for e in elements):
+            return None
+        del self.build_elements[start:]
+
+        # Like write_builds(), count first, as that decides how to write them
+        for e in elements:
+            if isinstance(e, NinjaBuildElement):
+                e.count_rule_references()
+        text = io.StringIO()
+        compdb: T.List[str] = []
+        rule_counts: T.Dict[str, T.Tuple[int, int]] = {}
+        outputs: T.List[str] = []
+        shared_arg_names: T.List[str] = []
+        for e in elements:
+            e.write(text)
+            if isinstance(e, NinjaSharedArgs):
+                shared_arg_names.append(e.name)
+                continue
+            outputs.extend(e.outfilenames)
+            if e.rulename != 'phony':
+                count, rspcount = rule_counts.get(e.rulename, (0, 0))
+                if e._should_use_rspfile:
+                    rspcount += 1
+                else:
+                    count += 1
+                rule_counts[e.rulename] = (count, rspcount)
+            if e.rulename in self.compdb_rules and e.infilenames:
+                compdb.append(e.compdb_entry(self.compdb_directory))
+        link_probes: T.Optional[T.Dict[str, str]] = {}
+        for paths in self.link_probes[probes_start:]:
+            if paths is None:
+                link_probes = None
+                break
+            link_probes.update((p, probe_link_dependency(p)) for p in paths)
+        return NinjaTargetFragment(tid, text.getvalue(), compdb, rule_counts, outputs, shared_arg_names,
+                                   self.introspection_data[tid], self.light_links[light_start:],
+                                   self.heavy_links[heavy_start:], link_probes)
+
+    def add_fragment(self, fragment: NinjaTargetFragment) -> bool:
+        '''Add the fragment of a target instead of generating it, unless it
+        clashes with what has been generated so far.'''
+        if not self.all_outputs.isdisjoint(fragment.outputs) or \
+                not self.shared_compile_arg_names.isdisjoint(fragment.shared_arg_names) or \
+                any(r not in self.ruledict for r in fragment.rule_counts):
+            # Generating the target reports or avoids the clash
+            return False
+        self.all_outputs.update(fragment.outputs)
+        self.shared_compile_arg_names.update(fragment.shared_arg_names)
+        for r, (count, rspcount) in fragment.rule_counts.items():
+            self.ruledict[r].refcount += count
+            self.ruledict[r].rsprefcount += rspcount
+        self.introspection_data[fragment.tid] = fragment.introspection
+        self.light_links.extend(fragment.light_links)
+        self.heavy_links.extend(fragment.heavy_links)
+        self.build_elements.append(fragment)
+        return True
+
+    def generate_parallel_fragments(self, targets: T.List[build.Target]) -> T.Dict[str, NinjaTargetFragment]:
+        '''Generate the fragments of the targets in worker processes, where
+        that is possible.
+
+        The main process still goes through all targets in order and adds
+        these fragments in their place, so the result is the same as without
+        the workers.
+        '''
+        global _fragment_backend
+        jobs = determine_worker_count()
+        # Only forking gives the workers the state of the backend for free.
+        # Forking is not safe on macOS or with other threads running.
+        if jobs < 2 or len(targets) < MIN_PARALLEL_FRAGMENTS or mesonlib.is_osx() or \
+                'fork' not in multiprocessing.get_all_start_methods() or threading.active_count() > 1:
+            return {}
+        for t in targets:
+            # Generating them in order would have created these before
+            os.makedirs(self.get_target_private_dir_abs(t), exist_ok=True)
+        # The workers would print what is still buffered again
+        sys.stdout.flush()
+        sys.stderr.flush()
+        _fragment_backend = self
+        try:
+            with multiprocessing.get_context('fork').Pool(jobs, _prepare_fragment_worker) as pool:
+                fragments = pool.map(_generate_worker_fragment, [t.get_id() for t in targets],
+                                     max(1, len(targets) // (jobs * 4)))
+        finally:
+            _fragment_backend = None
+        result = {f.tid: f for f in fragments if f is not None}
+        mlog.debug(f'Generated {len(result)} of {len(targets)} targets in {jobs} worker processes')
+        return result
+
+    def prepare_fragment_worker(self) -> None:
+        # The main process generates the targets a target depends on
+        self.processed_targets.update(self.build.get_targets())
+
+    def generate_worker_fragment(self, tid: str) -> T.Optional[NinjaTargetFragment]:
+        '''Generate the fragment of a target in a worker process.
+
+        The fragment is generated as if it were the first target, so that it
+        only depends on the target itself. The main process finds out if
+        other targets make a difference when adding it.
+        '''
+        self.build_elements = []
+        self.all_outputs = set()
+        self.shared_compile_args = {}
+        self.shared_compile_arg_names = set()
+        self.introspection_data[tid] = {}
+        try:
+            with mlog.no_logging():
+                return self.generate_fragment(self.build.get_targets()[tid])
+        except Exception:
+            # The main process generates it again and reports the error
+            return None
+
+    def get_definition_digest(self, target: build.Target) -> T.Optional[T.Tuple[bytes, T.List[str]]]:
+        '''The digest of what the build statements of the target are
+        generated from, and the ids of the other targets it refers to.'''
+        f = io.BytesIO()
+        pickler = TargetDefinitionPickler(f, target, self.environment.get_build_dir())
+        try:
+            pickler.dump(target)
+        except (pickle.PicklingError, TypeError, AttributeError, ValueError):
+            return None
+        return hashlib.sha256(f.getvalue()).digest(), list(pickler.references)
+
+    def get_fragment_keys(self) -> T.Dict[str, str]:
+        '''The keys to keep the fragments of the targets with, by target id.
+
+        A key changes if anything the build statements of the target are
+        generated from changes, including the targets it refers to. Targets
+        that are not generated as fragments have no key.
+        '''
+        if sys.version_info < (3, 8):
+            # TargetDefinitionPickler needs reducer_override()
+            return {}
+        targets = self.build.get_targets()
+        keys: T.Dict[str, T.Optional[bytes]] = {}
+
+        def get_key(tid: str) -> T.Optional[bytes]:
+            if tid in keys:
+                return keys[tid]
+            # Targets that cannot be pickled, refer to a missing target or to
+            # themselves in a cycle get no key
+            keys[tid] = None
+            digest = self.get_definition_digest(targets[tid]) if tid in targets else None
+            if digest is None:
+                return None
+            hasher = hashlib.sha256(digest[0])
+            for ref in digest[1]:
+                ref_key = get_key(ref)
+                if ref_key is None:
+                    return None
+                hasher.update(ref_key)
+            keys[tid] = hasher.digest()
+            return keys[tid]
+
+        result: T.Dict[str, str] = {}
+        for tid, target in targets.items():
+            if not self.can_generate_fragment(target):
+                continue
+            key = get_key(tid)
+            if key is not None:
+                # Whether it goes to the heavy link pool depends on earlier
+                # builds, see add_link_pool()
+                output = self.get_target_filename(target)
+                heavy = None if self.link_memory is None or output not in self.link_memory \
+                    else self.link_memory[output] > HEAVY_LINK_THRESHOLD
+                result[tid] = f'{key.hex()}:{heavy}'
+        return result
+
+    def get_fragments_context(self) -> str:
+        '''The digest of what the build statements of all targets are
+        generated from.'''
+        if sys.version_info < (3, 8):
+            return ''
+        env = self.environment
+        context = (
+            coredata.version, self.ninja_version, mesonlib.python_command, env.get_build_command(),
+            rsp_threshold, env.get_source_dir(), env.get_build_dir(), self.build_to_src,
+            env.machines, env.binaries, env.properties, env.exe_wrapper,
+            env.coredata.optstore, env.coredata.compilers, self.build.global_args, self.build.global_link_args,
+            self.build.projects_args, self.build.projects_link_args, self.build.static_linker,
+            self.build.stdlibs, self.build.subproject_dir, self.allow_thin_archives,
+            self.link_memory is None, self.compdb_rules, self.compdb_directory,
+            [r.name for r in self.rules if isinstance(r, NinjaRule)],
+        )
+        f = io.BytesIO()
+        try:
+            TargetDefinitionPickler(f, None, env.get_build_dir()).dump(context)
+        except (pickle.PicklingError, TypeError, AttributeError, ValueError):
+            return ''
+        return hashlib.sha256(f.getvalue()).hexdigest()
+
+    def load_fragments(self, context: str) -> T.Dict[str, NinjaTargetFragment]:
+        '''The fragments of the last generation of the targets that did not
+        change since, by target id.'''
+        if not context:
+            return {}
+        try:
+            with open(os.path.join(self.environment.get_build_dir(), FRAGMENTS_FILE), 'rb') as f:
+                old_context, fragments = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return {}
+        if old_context != context:
+            return {}
+        # Libraries that appeared or went away since also change a fragment
+        result = {tid: fragment for tid, (key, fragment) in fragments.items()
+                  if self.fragment_keys.get(tid) == key and
+                  all(probe_link_dependency(p) == v for p, v in fragment.link_probes.items())}
+        targets = self.build.get_targets()
+        for tid in result:
+            # Generating them would create these
+            os.makedirs(self.get_target_private_dir_abs(targets[tid]), exist_ok=True)
+        mlog.debug(f'Reusing {len(result)} of {len(self.fragment_keys)} target fragments of the last generation')
+        return result
+
+    def save_fragments(self, context: str) -> None:
+        '''Keep the fragments of this generation for the next one.'''
+        filename = os.path.join(self.environment.get_build_dir(), FRAGMENTS_FILE)
+        if not context:
+            if os.path.exists(filename):
+                os.unlink(filename)
+            return
+        fragments = {tid: (self.fragment_keys[tid], fragment) for tid, fragment in self.generated_fragments.items()
+                     if tid in self.fragment_keys and fragment.link_probes is not None}
+        with open(filename + '~', 'wb') as f:
+            pickle.dump((context, fragments), f)
+        os.replace(filename + '~', filename)
+
     def should_use_dyndeps_for_target(self, target: 'build.BuildTarget') -> bool:
         if not self.ninja_has_dyndeps:
             return False
@@ -1421,18 +2059,89 @@ class NinjaBackend(backends.Backend):
             else:
                 mlog.warning(f"build statement for {build.outfilenames} references nonexistent rule {build.rulename}")
 
-    def write_rules(self, outfile: T.TextIO) -> None:
-        for b in self.build_elements:
-            if isinstance(b, NinjaBuildElement):
-                b.count_rule_references()
+    def write_pools(self, outfile: T.TextIO) -> None:
+        num_pools = self.environment.coredata.optstore.get_value_for('backend_max_links')
+        if self.link_memory is None:
+            if num_pools > 0:
+                outfile.write(f'''pool link_pool
+  depth = {num_pools}
+
+''')
+            return
+        light = max((self.link_memory[o] for o in self.light_links if o in self.link_memory),
+                    default=LIGHT_LINK_MEMORY)
+        heavy = max((self.link_memory[o] for o in self.heavy_links if o in self.link_memory),
+                    default=HEAVY_LINK_MEMORY)
+        light_depth, heavy_depth = link_pool_depths(linkmem.total_memory(), determine_worker_count(), light, heavy)
+        if num_pools > 0:
+            light_depth = min(light_depth, num_pools)
+            heavy_depth = min(heavy_depth, num_pools)
+        outfile.write(f'''pool link_pool
+  depth = {light_depth}
+
+pool heavy_link_pool
+  depth = {heavy_depth}
+
+''')
+
+    def get_link_pool(self) -> T.Optional[str]:
+        '''The pool of the link rules, heavy links are moved to their own pool.'''
+        if self.link_memory is not None or self.environment.coredata.optstore.get_value_for('backend_max_links') > 0:
+            return 'pool = link_pool'
+        return None
+
+    def get_link_memory_wrapper(self) -> T.List[str]:
+        '''The command to record the peak memory of links with, if any.'''
+        if self.link_memory is None or mesonlib.is_windows():
+            return []
+        args = [linkmem.LINK_MEMORY_FILE, '$out']
+        # Starting all of Meson would take longer than some links
+        if len(mesonlib.python_command) == 1 and os.path.isfile(linkmem.__file__):
+            return mesonlib.python_command + ['-S', linkmem.__file__] + args
+        return self.environment.get_build_command() + ['--internal', 'linkmem'] + args
+
+    def add_link_pool(self, elem: NinjaBuildElement, output: str, heavy: bool) -> None:
+        '''Move the link to the heavy link pool if it is or is likely to be heavy.'''
+        if self.link_memory is None:
+            return
+        if output in self.link_memory:
+            heavy = self.link_memory[output] > HEAVY_LINK_THRESHOLD
+        if heavy:
+            elem.add_item('pool', 'heavy_link_pool')
+            self.heavy_links.append(output)
+        else:
+            self.light_links.append(output)
 
+    def write_rules(self, outfile: T.TextIO) -> None:
+        # The rules used by the build statements have been counted while
+        # writing those, so all of them have to be written already.
+        assert not self.build_elements, 'build statements must be written before the rules'
         for r in self.rules:
             r.write(outfile)
 
-    def write_builds(self, outfile: T.TextIO) -> None:
-        for b in ProgressBar(self.build_elements, desc='Writing build.ninja'):
+    def write_builds(self, outfile: T.TextIO, compdbfile: T.TextIO) -> None:
+        '''Write out and forget the build statements added so far.
+
+        Compile commands also go into the compilation database, in the same
+        form as `ninja -t compdb -x` would print them.
+        '''
+        for b in self.build_elements:
+            if isinstance(b, NinjaBuildElement):
+                b.count_rule_references()
+        for b in self.build_elements:
             b.write(outfile)
-        mlog.log_timestamp("build.ninja generated")
+            if isinstance(b, NinjaTargetFragment):
+                entries = b.compdb
+            elif isinstance(b, NinjaBuildElement) and b.rulename in self.compdb_rules and b.infilenames:
+                entries = [b.compdb_entry(self.compdb_directory)]
+            else:
+                continue
+            for entry in entries:
+                if self.compdb_entries:
+                    compdbfile.write(',')
+                compdbfile.write(entry)
+                self.compdb_entries += 1
+        self.build_elements = []
 
     def generate_phony(self) -> None:
         self.add_build_comment(NinjaComment('Phony build target, always out of date'))
@@ -1988,8 +2697,21 @@ class NinjaBackend(backends.Backend):
 
         return orderdeps, main_rust_file
 
+    def has_rust_metadata(self, target: build.BuildTarget) -> bool:
+        '''Whether the metadata of a Rust library is built separately.
+
+        Libraries depending on it are then compiled as soon as the metadata is
+        available, while targets linking it wait for the whole library.
+        '''
+        if not target.uses_rust_abi() or target.rust_crate_type != 'rlib':
+            return False
+        return bool(target.compilers['rust'].get_compileropt_value('pipelining', self.environment, target))
+
+    def get_rust_metadata_filename(self, target: build.BuildTarget) -> str:
+        return os.path.splitext(self.get_target_filename(target))[0] + '.rmeta'
+
     def get_rust_compiler_args(self, target: build.BuildTarget, rustc: Compiler, src_crate_type: str,
-                               depfile: T.Optional[str] = None) -> T.List[str]:
+                               depfile: T.Optional[str] = None, metadata: bool = False) -> T.List[str]:
         # Compiler args for compiling this target
         args = compilers.get_base_compile_args(target, rustc, self.environment)
 
@@ -2005,7 +2727,19 @@ class NinjaBackend(backends.Backend):
         args += ['--crate-name', target.name.replace('-', '_').replace(' ', '_').replace('.', '_')]
         if depfile:
             args += rustc.get_dependency_gen_args(target_name, depfile)
-        args += rustc.get_output_args(target_name)
+        if self.has_rust_metadata(target):
+            # Both compilations have to write the metadata and the library
+            # for them to agree on the crate hash. Each leaves the one it
+            # is not run for in the private directory.
+            private_name = os.path.join(self.get_target_private_dir(target), os.path.basename(target_name))
+            if metadata:
+                args += ['--emit', 'metadata=' + self.get_rust_metadata_filename(target)]
+                args += rustc.get_output_args(private_name)
+            else:
+                args += ['--emit', 'metadata=' + os.path.splitext(private_name)[0] + '.rmeta']
+                args += rustc.get_output_args(target_name)
+        else:
+            args += rustc.get_output_args(target_name)
         args += ['-C', 'metadata=' + target.get_id()]
         args += target.get_extra_args('rust')
         return args
@@ -2053,7 +2787,13 @@ class NinjaBackend(backends.Backend):
         target_deps = target.get_dependencies()
         for d in target_deps:
             linkdirs.add(d.subdir)
-            deps.append(self.get_dependency_filename(d))
+            # Libraries are not linked, so the metadata of other libraries is
+            # enough to compile them
+            use_metadata = target.rust_crate_type == 'rlib' and self.has_rust_metadata(d)
+            if use_metadata:
+                deps.append(self.get_rust_metadata_filename(d))
+            else:
+                deps.append(self.get_dependency_filename(d))
             if isinstance(d, build.StaticLibrary):
                 external_deps.extend(d.external_deps)
             if d.uses_rust_abi():
@@ -2064,7 +2804,8 @@ class NinjaBackend(backends.Backend):
                 # dependency, so that collisions with libraries in rustc's
                 # sysroot don't cause ambiguity
                 d_name = self._get_rust_dependency_name(target, d)
-                args += ['--extern', '{}={}'.format(d_name, self.get_target_filename(d))]
+                d_file = self.get_rust_metadata_filename(d) if use_metadata else self.get_target_filename(d)
+                args += ['--extern', '{}={}'.format(d_name, d_file)]
                 project_deps.append(RustDep(d_name, self.rust_crates[d.name].order))
                 continue
 
@@ -2182,7 +2923,26 @@ class NinjaBackend(backends.Backend):
             element.add_dep(deps)
         element.add_item('ARGS', args)
         element.add_item('targetdep', depfile)
+        self.add_link_pool(element, target_name, True)
         self.add_build(element)
+
+        if self.has_rust_metadata(target):
+            # The same compilation, stopping once the metadata is written
+            rmeta_depfile = os.path.join(self.get_target_private_dir(target), target.name + '.rmeta.d')
+            rmeta_args = rustc.compiler_args()
+            rmeta_args += self.get_rust_compiler_args(target, rustc, target.rust_crate_type, rmeta_depfile, metadata=True)
+            rmeta_args += deps_args
+            rule = self.get_compiler_rule_name('rust', rustc.for_machine, 'METADATA')
+            element = NinjaBuildElement(self.all_outputs, self.get_rust_metadata_filename(target), rule, main_rust_file)
+            if orderdeps:
+                element.add_orderdep(orderdeps)
+            if fortran_order_deps:
+                element.add_orderdep(fortran_order_deps)
+            if deps:
+                element.add_dep(deps)
+            element.add_item('ARGS', rmeta_args)
+            element.add_item('targetdep', rmeta_depfile)
+            self.add_build(element)
         if isinstance(target, build.SharedLibrary):
             self.generate_shsym(target)
         self.create_target_source_introspection(target, rustc, args, [main_rust_file], [])
@@ -2356,7 +3116,6 @@ class NinjaBackend(backends.Backend):
         return options
 
     def generate_static_link_rules(self) -> None:
-        num_pools = self.environment.coredata.optstore.get_value_for('backend_max_links')
         if 'java' in self.environment.coredata.compilers.host:
             self.generate_java_link()
         for for_machine in MachineChoice:
@@ -2395,29 +3154,22 @@ class NinjaBackend(backends.Backend):
                     ranlib = ['ranlib']
                 cmdlist.extend(['&&'] + ranlib + ['-c', '$out'])
             description = 'Linking static target $out'
-            if num_pools > 0:
-                pool = 'pool = link_pool'
-            else:
-                pool = None
+            pool = self.get_link_pool()
 
             options = self._rsp_options(static_linker)
             self.add_rule(NinjaRule(rule, cmdlist, args, description, **options, extra=pool))
 
     def generate_dynamic_link_rules(self) -> None:
-        num_pools = self.environment.coredata.optstore.get_value_for('backend_max_links')
         for for_machine in MachineChoice:
             complist = self.environment.coredata.compilers[for_machine]
             for langname, compiler in complist.items():
                 if langname in {'java', 'vala', 'rust', 'cs', 'cython'}:
                     continue
                 rule = '{}_LINKER{}'.format(langname, self.get_rule_suffix(for_machine))
-                command = compiler.get_linker_exelist()
+                command = self.get_link_memory_wrapper() + compiler.get_linker_exelist()
                 args = ['$ARGS'] + NinjaCommandArg.list(compiler.get_linker_output_args('$out'), Quoting.none) + ['$in', '$LINK_ARGS']
                 description = 'Linking target $out'
-                if num_pools > 0:
-                    pool = 'pool = link_pool'
-                else:
-                    pool = None
+                pool = self.get_link_pool()
 
                 options = self._rsp_options(compiler)
                 self.add_rule(NinjaRule(rule, command, args, description, **options, extra=pool))
@@ -2480,13 +3232,21 @@ class NinjaBackend(backends.Backend):
 
     def generate_rust_compile_rules(self, compiler) -> None:
         rule = self.compiler_to_rule_name(compiler)
-        command = compiler.get_exelist() + ['$ARGS', '$in']
+        # rustc also links, so this is in effect a link rule
+        command = self.get_link_memory_wrapper() + compiler.get_exelist() + ['$ARGS', '$in']
         description = 'Compiling Rust source $in'
         depfile = '$targetdep'
         depstyle = 'gcc'
         self.add_rule(NinjaRule(rule, command, [], description, deps=depstyle,
                                 depfile=depfile))
 
+        # For rust_pipelining, see scripts/rustmeta.py
+        rule = self.get_compiler_rule_name('rust', compiler.for_machine, 'METADATA')
+        command = self.environment.get_build_command() + ['--internal', 'rustmeta', '$out'] + compiler.get_exelist() + ['$ARGS', '$in']
+        description = 'Generating Rust metadata for $in'
+        self.add_rule(NinjaRule(rule, command, [], description, deps=depstyle,
+                                depfile=depfile))
+
     def generate_swift_compile_rules(self, compiler) -> None:
         rule = self.compiler_to_rule_name(compiler)
         wd_args = compiler.get_working_directory_args('$RUNDIR')
@@ -3092,6 +3852,7 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             commands += self.get_pch_include_args(compiler, target)
 
         commands = commands.compiler.compiler_args(commands)
+        shared_args = self.get_shared_compile_args(target, compiler, commands)
 
         # Create introspection information
         if is_generated is False:
@@ -3209,7 +3970,10 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                     result += c
                 return result
             element.add_item('CUDA_ESCAPED_TARGET', quote_make_target(rel_obj))
-        element.add_item('ARGS', commands)
+        args = commands.to_native()
+        element.add_item('ARGS', args)
+        if args[:len(shared_args.args)] == shared_args.args:
+            element.shared_args = shared_args
 
         self.add_dependency_scanner_entries_to_element(target, compiler, element, src)
         self.add_build(element)
@@ -3217,6 +3981,23 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         assert isinstance(rel_src, str)
         return (rel_obj, rel_src.replace('\\', '/'))
 
+    def get_shared_compile_args(self, target: build.BuildTarget, compiler: Compiler,
+                                commands: CompilerArgs) -> NinjaSharedArgs:
+        '''Get the compile arguments shared by all sources of a target that use
+        the given compiler, as passed in for the first of them.'''
+        key = (target.get_id(), compiler.get_language())
+        shared = self.shared_compile_args.get(key)
+        if shared is None:
+            name = re.sub(r'[^A-Za-z0-9_]', '_', f'{target.get_id()}_{compiler.get_language()}_ARGS')
+            while name in self.shared_compile_arg_names:
+                name += '_'
+            self.shared_compile_arg_names.add(name)
+            shared = NinjaSharedArgs(name, commands.to_native(copy=True))
+            self.shared_compile_args[key] = shared
+            # It has to be written before the first build statement using it
+            self.build_elements.append(shared)
+        return shared
+
     def add_dependency_scanner_entries_to_element(self, target: build.BuildTarget, compiler, element, src) -> None:
         if not self.should_use_dyndeps_for_target(target):
             return
@@ -3447,18 +4228,25 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             return linker.get_link_whole_for(target_args) if target_args else []
 
     @lru_cache(maxsize=None)
-    def guess_library_absolute_path(self, linker, libname, search_dirs, patterns) -> Path:
+    def guess_library_absolute_path(self, linker, libname, search_dirs, patterns) -> T.Tuple[T.Optional[Path], T.Optional[T.Tuple[str, ...]]]:
         from ..compilers.c import CCompiler
+        # The files looked for, if a directory listing did not decide that
+        probed: T.Optional[T.List[str]] = []
         for d in search_dirs:
             for p in patterns:
                 trial = CCompiler._get_trials_from_pattern(p, d, libname)
+                if '*' in p:
+                    probed = None
+                elif probed is not None:
+                    probed.extend(trial)
                 if not trial:
                     continue
                 trial = CCompiler._get_file_from_list(self.environment, trial)
                 if not trial:
                     continue
                 # Return the first result
-                return trial
+                return trial, None if probed is None else tuple(probed)
+        return None, None if probed is None else tuple(probed)
 
     def guess_external_link_dependencies(self, linker, target, commands, internal):
         # Ideally the linker would generate dependency information that could be used.
@@ -3500,8 +4288,10 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                         mlog.warning("Generated linker command has '-l' argument without following library name")
                         break
                 libs.add(lib)
-            elif os.path.isabs(item) and self.environment.is_library(item) and os.path.isfile(item):
-                absolute_libs.append(item)
+            elif os.path.isabs(item) and self.environment.is_library(item):
+                self.link_probes.append((item,))
+                if os.path.isfile(item):
+                    absolute_libs.append(item)
 
         guessed_dependencies = []
         # TODO The get_library_naming requirement currently excludes link targets that use d or fortran as their main linker
@@ -3512,10 +4302,11 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             for libname in libs:
                 # be conservative and record most likely shared and static resolution, because we don't know exactly
                 # which one the linker will prefer
-                staticlibs = self.guess_library_absolute_path(linker, libname,
-                                                              search_dirs, static_patterns)
-                sharedlibs = self.guess_library_absolute_path(linker, libname,
-                                                              search_dirs, shared_patterns)
+                staticlibs, static_probes = self.guess_library_absolute_path(linker, libname,
+                                                                             search_dirs, static_patterns)
+                sharedlibs, shared_probes = self.guess_library_absolute_path(linker, libname,
+                                                                             search_dirs, shared_patterns)
+                self.link_probes += [static_probes, shared_probes]
                 if staticlibs:
                     guessed_dependencies.append(staticlibs.resolve().as_posix())
                 if sharedlibs:
@@ -3696,6 +4487,12 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                             for t in target.link_depends])
         elem = NinjaBuildElement(self.all_outputs, outname, linker_rule, obj_list, implicit_outs=implicit_outs)
         elem.add_dep(dep_targets + custom_target_libraries)
+        if not isinstance(target, build.StaticLibrary):
+            try:
+                lto = bool(self.get_target_option(target, 'b_lto'))
+            except KeyError:
+                lto = False
+            self.add_link_pool(elem, outname, lto or len(obj_list) > HEAVY_LINK_OBJECTS)
         if linker.get_id() == 'tasking':
             if len([x for x in dep_targets + custom_target_libraries if x.endswith('.ma')]) > 0 and not self.get_target_option(target, OptionKey('b_lto', target.subproject, target.for_machine)):
                 raise MesonException(f'Tried to link the target named \'{target.name}\' with a MIL archive without LTO enabled! This causes the compiler to ignore the archive.')
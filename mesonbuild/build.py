@@ -4,7 +4,7 @@
 from __future__ import annotations
 from collections import defaultdict, deque, OrderedDict
 from dataclasses import dataclass, field
-from functools import lru_cache
+from functools import lru_cache, wraps
 import abc
 import copy
 import hashlib
@@ -36,7 +36,7 @@ from .compilers import (
 from .interpreterbase import FeatureNew, FeatureDeprecated, UnknownValue
 
 if T.TYPE_CHECKING:
-    from typing_extensions import Literal, TypedDict
+    from typing_extensions import Literal, Self, TypedDict
 
     from . import environment
     from ._typing import ImmutableListProtocol
@@ -670,6 +670,28 @@ class Target(HoldableObject, metaclass=abc.ABCMeta):
     def should_install(self) -> bool:
         return False
 
+_LinkClosure = T.TypeVar('_LinkClosure', bound=T.Callable[..., T.Any])
+
+def link_closure(func: _LinkClosure) -> _LinkClosure:
+    '''Memoize a transitive link closure of a BuildTarget.
+
+    The results are kept by the target itself, so they go away with the
+    Build that owns it, and recursive closures reuse the results of the
+    targets they link to.
+    '''
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self: BuildTarget, *args: T.Any) -> T.Any:
+        key = (name, args)
+        try:
+            return self.link_closures[key]
+        except KeyError:
+            pass
+        value = self.link_closures[key] = func(self, *args)
+        return value
+    return T.cast('_LinkClosure', wrapper)
+
 class BuildTarget(Target):
     known_kwargs = known_build_target_kwargs
 
@@ -706,6 +728,7 @@ class BuildTarget(Target):
         self.link_language = kwargs.get('link_language')
         self.link_targets: T.List[LibTypes] = []
         self.link_whole_targets: T.List[T.Union[StaticLibrary, CustomTarget, CustomTargetIndex]] = []
+        self.link_closures: T.Dict[T.Tuple[str, T.Tuple[T.Any, ...]], T.Any] = {}
         self.depend_files: T.List[File] = []
         self.link_depends = []
         self.added_deps = set()
@@ -1048,7 +1071,7 @@ class BuildTarget(Target):
         return ExtractedObjects(self, self.sources, self.generated, self.objects,
                                 recursive, pch=True)
 
-    @lru_cache(maxsize=None)
+    @link_closure
     def get_all_link_deps(self) -> ImmutableListProtocol[BuildTargetTypes]:
         """ Get all shared libraries dependencies
         This returns all shared libraries in the entire dependency tree. Those
@@ -1072,7 +1095,7 @@ class BuildTarget(Target):
                 stack.extendleft(t.link_whole_targets)
         return list(result)
 
-    @lru_cache(maxsize=None)
+    @link_closure
     def get_all_linked_targets(self) -> ImmutableListProtocol[BuildTargetTypes]:
         """Get all targets that have been linked with this one.
 
@@ -1108,7 +1131,7 @@ class BuildTarget(Target):
     def get_link_deps_mapping(self, prefix: str) -> T.Mapping[str, str]:
         return self.get_transitive_link_deps_mapping(prefix)
 
-    @lru_cache(maxsize=None)
+    @link_closure
     def get_transitive_link_deps_mapping(self, prefix: str) -> T.Mapping[str, str]:
         result: T.Dict[str, str] = {}
         for i in self.link_targets:
@@ -1119,7 +1142,7 @@ class BuildTarget(Target):
             result = result_tmp
         return result
 
-    @lru_cache(maxsize=None)
+    @link_closure
     def get_link_dep_subdirs(self) -> T.AbstractSet[str]:
         result: OrderedSet[str] = OrderedSet()
         for i in self.link_targets:
@@ -1296,7 +1319,7 @@ class BuildTarget(Target):
     def get_extra_args(self, language: str) -> T.List[str]:
         return self.extra_args[language]
 
-    @lru_cache(maxsize=None)
+    @link_closure
     def get_dependencies(self) -> OrderedSet[BuildTargetTypes]:
         # Get all targets needed for linking. This includes all link_with and
         # link_whole targets, and also all dependencies of static libraries
@@ -1369,6 +1392,8 @@ class BuildTarget(Target):
                 self.extra_files.extend(f for f in dep.extra_files if f not in self.extra_files)
                 self.add_include_dirs(dep.include_directories, dep.get_include_type())
                 self.objects.extend(dep.objects)
+                if dep.libraries or dep.whole_libraries:
+                    self._clear_link_closures()
                 self.link_targets.extend(dep.libraries)
                 self.link_whole_targets.extend(dep.whole_libraries)
                 if dep.get_compile_args() or dep.get_link_args():
@@ -1420,7 +1445,22 @@ class BuildTarget(Target):
     def is_internal(self) -> bool:
         return False
 
+    def __copy__(self) -> Self:
+        # Some closures contain the target itself, so they cannot be shared
+        # with a copy of it.
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.link_closures = {}
+        return new
+
+    def _clear_link_closures(self) -> None:
+        # Links are only added while the target is being set up, before any
+        # other target can link to it, so only the closures of this target
+        # can be out of date.
+        self.link_closures.clear()
+
     def link(self, targets: T.List[BuildTargetTypes]) -> None:
+        self._clear_link_closures()
         for t in targets:
             if not isinstance(t, (Target, CustomTargetIndex)):
                 if isinstance(t, dependencies.ExternalLibrary):
@@ -1447,6 +1487,7 @@ class BuildTarget(Target):
             self.link_targets.append(t)
 
     def link_whole(self, targets: T.List[BuildTargetTypes], promoted: bool = False) -> None:
+        self._clear_link_closures()
         for t in targets:
             if isinstance(t, (CustomTarget, CustomTargetIndex)):
                 if not t.is_linkable_target():
@@ -1471,7 +1512,7 @@ class BuildTarget(Target):
                         self._bundle_static_library(lib, True)
             self.link_whole_targets.append(t)
 
-    @lru_cache(maxsize=None)
+    @link_closure
     def get_internal_static_libraries(self) -> OrderedSet[BuildTargetTypes]:
         result: OrderedSet[BuildTargetTypes] = OrderedSet()
         self.get_internal_static_libraries_recurse(result)
@@ -0,0 +1,258 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+"""Analysis of where the time of the last ninja run went."""
+
+from __future__ import annotations
+
+import json
+import os
+import typing as T
+
+from . import mlog
+from .ninjadeps import BuildEdge, DependencyGraph, NinjaLog, load, read_build_edges
+
+if T.TYPE_CHECKING:
+    from . import build
+
+
+class Job(T.NamedTuple):
+
+    """One command run by ninja. Times are in milliseconds."""
+
+    start: int
+    end: int
+    edge: BuildEdge
+    target: T.Optional[str]
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    @property
+    def name(self) -> str:
+        return self.edge.outputs[0]
+
+    @property
+    def source(self) -> T.Optional[str]:
+        '''The source file compiled by the job, if it is a compilation.'''
+        if '_COMPILER' in self.edge.rule and self.edge.inputs:
+            return self.edge.inputs[0]
+        return None
+
+
+class BuildTimes:
+
+    """The commands of the last ninja run, joined with the build graph."""
+
+    def __init__(self, b: build.Build, build_dir: str, log: T.Optional[NinjaLog] = None) -> None:
+        self.targets = b.get_targets()
+        self.deps = load(build_dir)
+        self.edges = read_build_edges(os.path.join(build_dir, 'build.ninja'))
+        graph = DependencyGraph(b, self.deps)
+
+        self.jobs: T.List[Job] = []
+        # Outputs to the job that produced them in this run
+        self.job_of: T.Dict[str, Job] = {}
+        if log is None:
+            log = NinjaLog.from_builddir(build_dir)
+        else:
+            log.update()
+        for entry in log.last_run():
+            edge = self.edges.get(entry.output)
+            if edge is None:
+                # Not built by this build.ninja any more
+                continue
+            # ninja writes one entry for every output of a command
+            job = self.job_of.get(edge.outputs[0])
+            if job is None:
+                job = Job(entry.start, entry.end, edge, graph.target_of(entry.output))
+                self.jobs.append(job)
+            self.job_of[entry.output] = job
+
+        self._phony_inputs: T.Dict[str, T.List[str]] = {}
+
+    @property
+    def wall_time(self) -> int:
+        if not self.jobs:
+            return 0
+        return max(j.end for j in self.jobs) - min(j.start for j in self.jobs)
+
+    @property
+    def cpu_time(self) -> int:
+        return sum(j.duration for j in self.jobs)
+
+    def _expand_phony(self, path: str) -> T.List[str]:
+        edge = self.edges.get(path)
+        if edge is None or edge.rule != 'phony':
+            return [path]
+        if path not in self._phony_inputs:
+            self._phony_inputs[path] = []
+            result: T.List[str] = []
+            for i in edge.inputs + edge.implicit + edge.order_only:
+                result.extend(self._expand_phony(i))
+            self._phony_inputs[path] = result
+        return self._phony_inputs[path]
+
+    def get_dependencies(self, job: Job) -> T.List[Job]:
+        '''The jobs of this run that job had to wait for.'''
+        result: T.Dict[str, Job] = {}
+        paths = job.edge.inputs + job.edge.implicit + job.edge.order_only
+        # Generated headers only show up in the recorded dependencies
+        paths += self.deps.get_deps(job.name)
+        for p in paths:
+            for i in self._expand_phony(p):
+                dep = self.job_of.get(i)
+                if dep is not None and dep is not job:
+                    result[dep.name] = dep
+        return list(result.values())
+
+    def critical_path(self) -> T.List[Job]:
+        '''The longest chain of dependent jobs, weighted by their duration.
+
+        This is how long the build would take with unlimited parallelism, and
+        the jobs on it are the ones worth making faster or splitting up.
+        '''
+        # Job names to the length of the longest chain ending in the job and
+        # the previous job on it
+        longest: T.Dict[str, T.Tuple[int, T.Optional[Job]]] = {}
+        # A job ends before any job depending on it starts
+        for job in sorted(self.jobs, key=lambda j: j.end):
+            length, pred = 0, None
+            for dep in self.get_dependencies(job):
+                if dep.name in longest and longest[dep.name][0] > length:
+                    length, pred = longest[dep.name][0], dep
+            longest[job.name] = (length + job.duration, pred)
+        if not self.jobs:
+            return []
+        last: T.Optional[Job] = max(self.jobs, key=lambda j: longest[j.name][0])
+        path: T.List[Job] = []
+        while last is not None:
+            path.append(last)
+            last = longest[last.name][1]
+        path.reverse()
+        return path
+
+    def target_name(self, tid: T.Optional[str]) -> str:
+        if tid is None:
+            return '(none)'
+        t = self.targets[tid]
+        if t.subproject:
+            return f'{t.subproject}:{t.name}'
+        return t.name
+
+    def time_by_target(self) -> T.List[T.Tuple[str, int, int]]:
+        '''Target names, total command time and number of commands, slowest first.'''
+        times: T.Dict[T.Optional[str], T.List[int]] = {}
+        for j in self.jobs:
+            entry = times.setdefault(j.target, [0, 0])
+            entry[0] += j.duration
+            entry[1] += 1
+        result = [(self.target_name(tid), t, n) for tid, (t, n) in times.items()]
+        return sorted(result, key=lambda x: x[1], reverse=True)
+
+    def time_by_rule(self) -> T.List[T.Tuple[str, int, int]]:
+        '''Rules, total command time and number of commands, slowest first.
+
+        Rule names tell the language and the kind of step, for instance
+        c_COMPILER or cpp_LINKER.
+        '''
+        times: T.Dict[str, T.List[int]] = {}
+        for j in self.jobs:
+            rule = j.edge.rule
+            if rule.endswith('_RSP'):
+                rule = rule[:-len('_RSP')]
+            entry = times.setdefault(rule, [0, 0])
+            entry[0] += j.duration
+            entry[1] += 1
+        return sorted(((r, t, n) for r, (t, n) in times.items()), key=lambda x: x[1], reverse=True)
+
+    def parallelism(self, buckets: int) -> T.List[float]:
+        '''The average number of running commands in equal slices of the build.'''
+        wall = self.wall_time
+        if not wall:
+            return []
+        begin = min(j.start for j in self.jobs)
+        width = wall / buckets
+        busy = [0.0] * buckets
+        for j in self.jobs:
+            start = j.start - begin
+            end = j.end - begin
+            first = min(int(start / width), buckets - 1)
+            last = min(int(end / width), buckets - 1)
+            for i in range(first, last + 1):
+                busy[i] += min(end, (i + 1) * width) - max(start, i * width)
+        return [x / width for x in busy]
+
+    def chrome_trace(self) -> T.Dict[str, T.Any]:
+        '''The jobs in the Trace Event Format read by chrome://tracing and Perfetto.'''
+        events: T.List[T.Dict[str, T.Any]] = []
+        # Each job goes on the first thread that is free when it starts
+        lanes: T.List[int] = []
+        for j in sorted(self.jobs, key=lambda j: (j.start, j.end)):
+            for tid, free in enumerate(lanes):
+                if free <= j.start:
+                    lanes[tid] = j.end
+                    break
+            else:
+                tid = len(lanes)
+                lanes.append(j.end)
+            args = {'target': self.target_name(j.target), 'rule': j.edge.rule}
+            if j.source is not None:
+                args['source'] = j.source
+            events.append({
+                'name': j.name,
+                'cat': j.edge.rule,
+                'ph': 'X',
+                'ts': j.start * 1000,
+                'dur': j.duration * 1000,
+                'pid': 0,
+                'tid': tid,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, filename: str) -> None:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def _seconds(ms: int) -> str:
+    return f'{ms / 1000:.2f}s'
+
+def print_report(times: BuildTimes, count: int = 10) -> None:
+    if not times.jobs:
+        mlog.log('No commands were run by this build.')
+        return
+    wall = times.wall_time
+    cpu = times.cpu_time
+    mlog.log(mlog.bold('Last build:'), len(times.jobs), 'commands in', _seconds(wall),
+             f'({_seconds(cpu)} of command time, {cpu / max(wall, 1):.1f} on average in parallel)')
+
+    path = times.critical_path()
+    mlog.log()
+    mlog.log(mlog.bold('Critical path:'), _seconds(sum(j.duration for j in path)), 'in', len(path), 'commands')
+    for j in path:
+        mlog.log(f'  {_seconds(j.duration):>8}  {j.name}  [{times.target_name(j.target)}]')
+
+    mlog.log()
+    mlog.log(mlog.bold('Slowest targets:'))
+    for name, t, n in times.time_by_target()[:count]:
+        mlog.log(f'  {_seconds(t):>8}  {name} ({n} commands)')
+
+    mlog.log()
+    mlog.log(mlog.bold('Slowest commands:'))
+    for j in sorted(times.jobs, key=lambda j: j.duration, reverse=True)[:count]:
+        mlog.log(f'  {_seconds(j.duration):>8}  {j.source or j.name}  [{times.target_name(j.target)}]')
+
+    mlog.log()
+    mlog.log(mlog.bold('Time by rule:'))
+    for rule, t, n in times.time_by_rule():
+        mlog.log(f'  {_seconds(t):>8}  {rule} ({n} commands)')
+
+    mlog.log()
+    mlog.log(mlog.bold('Parallelism over time:'))
+    buckets = 20
+    for i, p in enumerate(times.parallelism(buckets)):
+        start = wall * i // buckets
+        mlog.log(f'  {_seconds(start):>8}  {p:5.1f} ' + '#' * round(p * 4))
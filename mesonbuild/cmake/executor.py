@@ -152,7 +152,7 @@ class CMakeExecutor:
 
         try:
             # Read stderr line by line and log non trace lines
-            raw_trace = ''
+            raw_trace: T.List[str] = []
             tline_start_reg = re.compile(r'^\s*(.*\.(cmake|txt))\(([0-9]+)\):\s*(\w+)\(.*$')
             inside_multiline_trace = False
             while True:
@@ -161,10 +161,10 @@ class CMakeExecutor:
                     break
                 line = line_raw.decode(errors='ignore')
                 if tline_start_reg.match(line):
-                    raw_trace += line
+                    raw_trace.append(line)
                     inside_multiline_trace = not line.endswith(' )\n')
                 elif inside_multiline_trace:
-                    raw_trace += line
+                    raw_trace.append(line)
                 else:
                     mlog.warning(line.strip('\n'))
 
@@ -173,7 +173,7 @@ class CMakeExecutor:
             t.join()
             proc.wait()
 
-        return proc.returncode, None, raw_trace
+        return proc.returncode, None, ''.join(raw_trace)
 
     def _call_cmout(self, args: T.List[str], build_dir: Path, env: T.Optional[T.Dict[str, str]]) -> TYPE_result:
         cmd = self.cmakebin.get_command() + args
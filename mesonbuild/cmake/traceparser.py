@@ -163,14 +163,26 @@ class CMakeTraceParser:
         return version_compare(self.cmake_version, '<3.16')
 
     def parse(self, trace: T.Optional[str] = None) -> None:
-        # First load the trace (if required)
+        # First load the trace (if required). The trace file is never read into
+        # memory as a whole, since it can easily grow to several hundred MB for
+        # large CMake packages. Instead, it is lexed line by line.
         if not self.requires_stderr():
             if not self.trace_file_path.is_file():
                 raise CMakeException(f'CMake: Trace file "{self.trace_file_path!s}" not found')
-            trace = self.trace_file_path.read_text(errors='ignore', encoding='utf-8')
-        if not trace:
-            raise CMakeException('CMake: The CMake trace was not provided or is empty')
+            if self.trace_file_path.stat().st_size == 0:
+                raise CMakeException('CMake: The CMake trace was not provided or is empty')
+            with self.trace_file_path.open(encoding='utf-8', errors='ignore') as f:
+                self._parse_trace_lines(f)
+        else:
+            if not trace:
+                raise CMakeException('CMake: The CMake trace was not provided or is empty')
+            self._parse_trace_lines(trace.splitlines(keepends=True))
+
+    def _is_relevant_function(self, func: str) -> bool:
+        func = func.lower()
+        return func in self.functions or func in self.delayed_commands
 
+    def _parse_trace_lines(self, trace: T.Iterable[str]) -> None:
         # Second parse the trace
         lexer1 = None
         if self.trace_format == 'human':
@@ -714,37 +726,53 @@ class CMakeTraceParser:
             return
         mlog.warning(f'The CMake function "{args[0]}" was disabled to avoid compatibility issues with Meson.')
 
-    def _lex_trace_human(self, trace: str) -> T.Generator[CMakeTraceLine, None, None]:
+    def _lex_trace_human(self, trace: T.Iterable[str]) -> T.Generator[CMakeTraceLine, None, None]:
         # The trace format is: '<file>(<line>):  <func>(<args -- can contain \n> )\n'
-        reg_tline = re.compile(r'\s*(.*\.(cmake|txt))\(([0-9]+)\):\s*(\w+)\(([\s\S]*?) ?\)\s*\n', re.MULTILINE)
-        reg_other = re.compile(r'[^\n]*\n')
-        loc = 0
-        while loc < len(trace):
-            mo_file_line = reg_tline.match(trace, loc)
-            if not mo_file_line:
-                skip_match = reg_other.match(trace, loc)
-                if not skip_match:
-                    print(trace[loc:])
-                    raise CMakeException('Failed to parse CMake trace')
-
-                loc = skip_match.end()
+        #
+        # The lexer only ever looks at one line at a time. Lines of functions
+        # the parser does not care about are skipped without building their
+        # argument list. Relevance is checked lazily for every function since
+        # the set of delayed commands can change while the trace is parsed.
+        reg_tline = re.compile(r'\s*(.*\.(cmake|txt))\(([0-9]+)\):\s*(\w+)\((.*)$', re.DOTALL)
+        reg_end = re.compile(r' ?\)\s*$')
+
+        current: T.Optional[T.Tuple[str, int, str, bool]] = None
+        args: T.List[str] = []
+        for raw in trace:
+            if current is None:
+                mo_file_line = reg_tline.match(raw)
+                if not mo_file_line:
+                    continue
+                current = (mo_file_line.group(1), int(mo_file_line.group(3)), mo_file_line.group(4),
+                           self._is_relevant_function(mo_file_line.group(4)))
+                raw = mo_file_line.group(5)
+
+            mo_end = reg_end.search(raw)
+            if current[3]:
+                args.append(raw[:mo_end.start()] if mo_end else raw)
+            if not mo_end:
                 continue
 
-            loc = mo_file_line.end()
-
-            file = mo_file_line.group(1)
-            line = mo_file_line.group(3)
-            func = mo_file_line.group(4)
-            args = mo_file_line.group(5)
-            argl = args.split(' ')
-            argl = [a.strip() for a in argl]
-
-            yield CMakeTraceLine(file, int(line), func, argl)
-
-    def _lex_trace_json(self, trace: str) -> T.Generator[CMakeTraceLine, None, None]:
-        lines = trace.splitlines(keepends=False)
-        lines.pop(0)  # The first line is the version
+            file, line, func, relevant = current
+            current = None
+            if relevant:
+                argl = [a.strip() for a in ''.join(args).split(' ')]
+                args = []
+                yield CMakeTraceLine(file, line, func, argl)
+
+    def _lex_trace_json(self, trace: T.Iterable[str]) -> T.Generator[CMakeTraceLine, None, None]:
+        # Peek at the command name before decoding the full line. JSON string
+        # values can not contain an unescaped '"', so this can only ever match
+        # the actual "cmd" key.
+        reg_cmd = re.compile(r'"cmd"\s*:\s*"(\w+)"')
+        lines = iter(trace)
+        next(lines, None)  # The first line is the version
         for i in lines:
+            mo_cmd = reg_cmd.search(i)
+            if mo_cmd and not self._is_relevant_function(mo_cmd.group(1)):
+                continue
+            if not i.strip():
+                continue
             data = json.loads(i)
             assert isinstance(data['file'], str)
             assert isinstance(data['line'], int)
@@ -12,8 +12,8 @@ standalone, they only work through inheritance.
 """
 
 import collections
+import fnmatch
 import functools
-import glob
 import itertools
 import os
 import re
@@ -43,6 +43,43 @@ else:
     # do). This gives up DRYer type checking, with no runtime impact
     Compiler = object
 
+# The ELF e_machine values of the CPU families libraries can be checked against
+# without a link test
+ELF_MACHINES: T.Mapping[str, T.Tuple[int, ...]] = {
+    'aarch64': (183,),
+    'alpha': (0x9026,),
+    'arm': (40,),
+    'csky': (252,),
+    'e2k': (175,),
+    'ia64': (50,),
+    'loongarch64': (258,),
+    'm68k': (4,),
+    'microblaze': (189,),
+    'mips': (8,),
+    'mips64': (8,),
+    'parisc': (15,),
+    'ppc': (20,),
+    'ppc64': (21,),
+    'riscv32': (243,),
+    'riscv64': (243,),
+    's390': (22,),
+    's390x': (22,),
+    'sh4': (42,),
+    'sparc': (2, 18),
+    'sparc64': (43,),
+    'x86': (3,),
+    'x86_64': (62,),
+}
+
+# Arguments that change where or how the linker looks for libraries, or for
+# which ABI, so that only a link test can tell whether -l works
+LIBRARY_SEARCH_ARGS = ('-L', '-B', '--sysroot', '-isysroot', '-nostdlib', '-nodefaultlibs',
+                       '-static', '-fuse-ld', '--target', '-target', '-Wl,', '-Xlinker',
+                       '-z', '-T', '-m32', '-m64', '-mx32', '-mabi')
+
+# Environment variables that change the library search path of the compiler
+LIBRARY_SEARCH_ENV = ('LIBRARY_PATH', 'GCC_EXEC_PREFIX', 'COMPILER_PATH')
+
 GROUP_FLAGS = re.compile(r'''^(?!-Wl,) .*\.so (?:\.[0-9]+)? (?:\.[0-9]+)? (?:\.[0-9]+)?$ |
                              ^(?:-Wl,)?-l |
                              \.a$''', re.X)
@@ -207,13 +244,10 @@ class CLikeCompiler(Compiler):
         # the compiler knows what it's doing, and accept the directory anyway.
         retval: T.List[str] = []
         for d in dirs:
-            files = [f for f in os.listdir(d) if f.endswith('.so') and os.path.isfile(os.path.join(d, f))]
-            # if no files, accept directory and move on
-            if not files:
-                retval.append(d)
-                continue
-
+            files = (f for f in sorted(mesonlib.listdir_cached(d)) if f.endswith('.so') and os.path.isfile(os.path.join(d, f)))
+            has_files = False
             for f in files:
+                has_files = True
                 file_to_check = os.path.join(d, f)
                 try:
                     with open(file_to_check, 'rb') as fd:
@@ -229,6 +263,10 @@ class CLikeCompiler(Compiler):
                 except OSError:
                     # Skip the file if we can't read it
                     pass
+            else:
+                # if no files, accept directory and move on
+                if not has_files:
+                    retval.append(d)
 
         return retval
 
@@ -1081,7 +1119,8 @@ class CLikeCompiler(Compiler):
         if '*' in pattern:
             # NOTE: globbing matches directories and broken symlinks
             # so we have to do an isfile test on it later
-            return cls._sort_shlibs_openbsd(glob.glob(f))
+            matches = fnmatch.filter(mesonlib.listdir_cached(directory), pattern.format(libname))
+            return cls._sort_shlibs_openbsd([os.path.join(directory, m) for m in matches])
         return [f]
 
     @staticmethod
@@ -1093,7 +1132,9 @@ class CLikeCompiler(Compiler):
         architecture.
         '''
         for p in paths:
-            if os.path.isfile(p):
+            # Checking the (cached) directory listing first is much cheaper
+            # than a stat for every naming pattern in every search dir.
+            if mesonlib.is_listed_in_dir(p) and os.path.isfile(p):
 
                 if env.machines.host.is_darwin() and env.machines.build.is_darwin():
                     # Run `lipo` and check if the library supports the arch we want
@@ -1113,6 +1154,53 @@ class CLikeCompiler(Compiler):
         '''
         return self.sizeof('void *', '', env)[0] == 8
 
+    def _get_elf_class(self, env: 'Environment') -> int:
+        # try to detect if we are 64-bit or 32-bit. If we can't
+        # detect, we will just skip path validity checks done in
+        # get_library_dirs() call
+        try:
+            if self.output_is_64bit(env):
+                return 2
+            return 1
+        except (mesonlib.MesonException, KeyError): # TODO evaluate if catching KeyError is wanted here
+            return 0
+
+    def _links_from_library_dirs(self, libname: str, env: 'Environment', args: T.List[str]) -> bool:
+        '''
+        Check whether `-l<libname>` is guaranteed to link without running the
+        linker. This is only considered definitive for native builds with an
+        unmodified library search path and no linker options, where the first
+        candidate the linker would pick in its library dirs is a shared ELF
+        library of the right class, byte order and machine. Any other case
+        must fall back to a real link test.
+        '''
+        machine = env.machines[self.for_machine]
+        if env.is_cross_build() or not machine.is_linux() or machine.cpu_family not in ELF_MACHINES:
+            return False
+        if any(a.startswith(LIBRARY_SEARCH_ARGS) for a in args):
+            return False
+        elf_class = self._get_elf_class(env)
+        if elf_class == 0:
+            return False
+        elf_data = 1 if machine.endian == 'little' else 2
+        for d in self.get_library_dirs(env, elf_class):
+            for name in (f'lib{libname}.so', f'lib{libname}.a'):
+                path = os.path.join(d, name)
+                if not mesonlib.is_listed_in_dir(path) or not os.path.isfile(path):
+                    continue
+                try:
+                    with open(path, 'rb') as fd:
+                        header = fd.read(20)
+                except OSError:
+                    return False
+                # Linker scripts (such as libc.so) and static archives are
+                # left to the linker
+                if len(header) != 20 or header[:4] != b'\x7fELF' or header[4] != elf_class or header[5] != elf_data:
+                    return False
+                e_machine = int.from_bytes(header[18:20], 'little' if elf_data == 1 else 'big')
+                return e_machine in ELF_MACHINES[machine.cpu_family]
+        return False
+
     def _find_library_real(self, libname: str, env: 'Environment', extra_dirs: T.List[str], code: str, libtype: LibType, lib_prefix_warning: bool, ignore_system_dirs: bool) -> T.Optional[T.List[str]]:
         # First try if we can just add the library as -l.
         # Gcc + co seem to prefer builtin lib dirs to -L dirs.
@@ -1122,6 +1210,10 @@ class CLikeCompiler(Compiler):
         if ((not extra_dirs and libtype is LibType.PREFER_SHARED) or
                 libname in self.internal_libs):
             cargs = ['-l' + libname]
+            if libname not in self.internal_libs:
+                basic_cargs, basic_largs = self._get_basic_compiler_args(env, CompileCheckMode.LINK)
+                if self._links_from_library_dirs(libname, env, basic_cargs + basic_largs):
+                    return cargs
             largs = self.get_linker_always_args() + self.get_allow_undefined_link_args()
             extra_args = cargs + self.linker_to_compiler_args(largs)
 
@@ -1133,16 +1225,7 @@ class CLikeCompiler(Compiler):
         # Not found or we want to use a specific libtype? Try to find the
         # library file itself.
         patterns = self.get_library_naming(env, libtype)
-        # try to detect if we are 64-bit or 32-bit. If we can't
-        # detect, we will just skip path validity checks done in
-        # get_library_dirs() call
-        try:
-            if self.output_is_64bit(env):
-                elf_class = 2
-            else:
-                elf_class = 1
-        except (mesonlib.MesonException, KeyError): # TODO evaluate if catching KeyError is wanted here
-            elf_class = 0
+        elf_class = self._get_elf_class(env)
         # Search in the specified dirs, and then in the system libraries
         for d in itertools.chain(extra_dirs, [] if ignore_system_dirs else self.get_library_dirs(env, elf_class)):
             for p in patterns:
@@ -1152,11 +1235,41 @@ class CLikeCompiler(Compiler):
                 trial = self._get_file_from_list(env, trials)
                 if not trial:
                     continue
-                if libname.startswith('lib') and trial.name.startswith(libname) and lib_prefix_warning:
-                    mlog.warning(f'find_library({libname!r}) starting in "lib" only works by accident and is not portable')
+                self._warn_lib_prefix(libname, trial, lib_prefix_warning)
                 return [trial.as_posix()]
         return None
 
+    @staticmethod
+    def _warn_lib_prefix(libname: str, trial: Path, lib_prefix_warning: bool) -> None:
+        if libname.startswith('lib') and trial.name.startswith(libname) and lib_prefix_warning:
+            mlog.warning(f'find_library({libname!r}) starting in "lib" only works by accident and is not portable')
+
+    def _find_library_cached(self, libname: str, env: 'Environment', extra_dirs: T.List[str], code: str, libtype: LibType, lib_prefix_warning: bool, ignore_system_dirs: bool) -> T.Optional[T.List[str]]:
+        # Results are kept in the coredata across reconfigurations. They only
+        # depend on the compiler, the check and linker arguments, the
+        # environment variables setting the library search path and the
+        # contents of the search directories, so they are stamped with the
+        # latter.
+        cargs, largs = self._get_basic_compiler_args(env, CompileCheckMode.LINK)
+        largs += self.get_linker_always_args() + self.get_allow_undefined_link_args()
+        search_env = tuple(os.environ.get(v) for v in LIBRARY_SEARCH_ENV)
+        key = ('find_library', tuple(self.exelist), self.version, libname, tuple(extra_dirs),
+               code, libtype, ignore_system_dirs, tuple(cargs), tuple(largs), search_env)
+        cache = env.coredata.file_stamp_cache
+        cached: T.Optional[T.Tuple[T.Optional[T.List[str]]]] = cache.get(key)
+        if cached is not None:
+            mlog.debug(f'Using cached find_library result for {libname}: {cached[0]}')
+            if cached[0] and not cached[0][0].startswith('-l'):
+                self._warn_lib_prefix(libname, Path(cached[0][0]), lib_prefix_warning)
+            return cached[0]
+
+        value = self._find_library_real(libname, env, extra_dirs, code, libtype, lib_prefix_warning, ignore_system_dirs)
+        search_dirs = list(extra_dirs)
+        if not ignore_system_dirs:
+            search_dirs += self.get_library_dirs(env, self._get_elf_class(env))
+        cache.put(key, search_dirs, (value, ))
+        return value
+
     def _find_library_impl(self, libname: str, env: 'Environment', extra_dirs: T.List[str],
                            code: str, libtype: LibType, lib_prefix_warning: bool, ignore_system_dirs: bool) -> T.Optional[T.List[str]]:
         # These libraries are either built-in or invalid
@@ -1166,7 +1279,7 @@ class CLikeCompiler(Compiler):
             extra_dirs = [extra_dirs]
         key = (tuple(self.exelist), libname, tuple(extra_dirs), code, libtype, ignore_system_dirs)
         if key not in self.find_library_cache:
-            value = self._find_library_real(libname, env, extra_dirs, code, libtype, lib_prefix_warning, ignore_system_dirs)
+            value = self._find_library_cached(libname, env, extra_dirs, code, libtype, lib_prefix_warning, ignore_system_dirs)
             self.find_library_cache[key] = value
         else:
             value = self.find_library_cache[key]
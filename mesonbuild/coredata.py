@@ -7,7 +7,7 @@ from __future__ import annotations
 import copy
 
 from . import mlog, options
-import pickle, os, uuid
+import pickle, os, time, uuid
 import sys
 from functools import lru_cache
 from itertools import chain
@@ -234,6 +234,55 @@ class CMakeStateCache:
         return set(self.__cache.keys())
 
 
+class FileStampCache:
+    """Class that stores results which depend on the state of the file system.
+
+    Every entry remembers the paths it was computed from, together with their
+    modification time and size at that point. An entry is only returned as
+    long as none of these paths changed, appeared or disappeared, so that
+    expensive file system scans and tool invocations can be reused between
+    dependency lookups and across reconfigurations.
+    """
+
+    def __init__(self) -> None:
+        self.__cache: T.Dict[T.Tuple[T.Hashable, ...], T.Tuple[T.Tuple[T.Tuple[str, T.Optional[T.Tuple[int, int]]], ...], T.Any]] = {}
+
+    @staticmethod
+    def stamp(path: str) -> T.Optional[T.Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, key: T.Tuple[T.Hashable, ...]) -> T.Optional[T.Any]:
+        """Get a value from the cache.
+
+        If there is no cache entry, or if any of the files it was computed
+        from changed in the meantime, None will be returned.
+        """
+        try:
+            stamps, value = self.__cache[key]
+        except KeyError:
+            return None
+        if any(self.stamp(p) != s for p, s in stamps):
+            del self.__cache[key]
+            return None
+        return value
+
+    def put(self, key: T.Tuple[T.Hashable, ...], paths: T.Iterable[str], value: T.Any) -> None:
+        stamps = tuple((p, self.stamp(p)) for p in paths)
+        # Changes made right after a file was stamped might not change its
+        # mtime, so results computed from such fresh files are not kept.
+        limit = time.time_ns() - 2_000_000_000
+        if any(s is not None and s[0] > limit for _, s in stamps):
+            return
+        self.__cache[key] = (stamps, value)
+
+    def clear(self) -> None:
+        self.__cache.clear()
+
+
 # Can't bind this near the class method it seems, sadly.
 _V = T.TypeVar('_V')
 
@@ -284,6 +333,9 @@ class CoreData:
         # CMake cache
         self.cmake_cache: PerMachine[CMakeStateCache] = PerMachine(CMakeStateCache(), CMakeStateCache())
 
+        # Results of file system scans, invalidated by changes to the scanned files
+        self.file_stamp_cache = FileStampCache()
+
         # Only to print a warning if it changes between Meson invocations.
         self.config_files = self.__load_config_files(cmd_options, scratch_dir, 'native')
         self.builtin_options_libdir_cross_fixup()
@@ -390,6 +442,11 @@ class CoreData:
                 'limit',
                 0,
                 min_value=0))
+            self.optstore.add_system_option('backend_link_pools', options.UserComboOption(
+                'backend_link_pools',
+                'Size the link pools by the memory used by links',
+                'fixed',
+                choices=['fixed', 'auto']))
         elif backend_name.startswith('vs'):
             self.optstore.add_system_option('backend_startup_project', options.UserStringOption(
                 'backend_startup_project',
@@ -438,6 +495,7 @@ class CoreData:
         self.deps.build.clear()
         self.compiler_check_cache.clear()
         self.run_check_cache.clear()
+        self.file_stamp_cache.clear()
 
     def get_nondefault_buildtype_args(self) -> T.List[T.Union[T.Tuple[str, str, str], T.Tuple[str, bool, bool]]]:
         result: T.List[T.Union[T.Tuple[str, str, str], T.Tuple[str, bool, bool]]] = []
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import os
 import re
 import dataclasses
 import functools
@@ -515,6 +516,15 @@ class BoostDependency(SystemDependency):
         return False
 
     def detect_inc_dirs(self, root: Path) -> T.List[BoostIncludeDir]:
+        # The result only depends on the directory layout below root and the
+        # contents of the version headers, so it can be shared between all
+        # boost lookups as long as none of them changed.
+        cache = self.env.coredata.file_stamp_cache
+        key = ('boost-inc-dirs', root.as_posix())
+        cached: T.Optional[T.List[BoostIncludeDir]] = cache.get(key)
+        if cached is not None:
+            return cached
+
         candidates: T.List[Path] = []
         inc_root = root / 'include'
 
@@ -525,10 +535,15 @@ class BoostDependency(SystemDependency):
                 if not i.is_dir() or not i.name.startswith('boost-'):
                     continue
                 candidates += [i / 'boost']
+        stamped = [root, inc_root] + candidates
         candidates = [x for x in candidates if x.is_dir()]
         candidates = [x / 'version.hpp' for x in candidates]
+        stamped += candidates
         candidates = [x for x in candidates if x.exists()]
-        return [self._include_dir_from_version_header(x) for x in candidates]
+        inc_dirs = [self._include_dir_from_version_header(x) for x in candidates]
+
+        cache.put(key, [x.as_posix() for x in stamped], inc_dirs)
+        return inc_dirs
 
     def detect_lib_dirs(self, root: Path, use_system: bool) -> T.List[Path]:
         # First check the system include paths. Only consider those within the
@@ -546,17 +561,7 @@ class BoostDependency(SystemDependency):
 
         # No system include paths were found --> fall back to manually looking
         # for library dirs in root
-        dirs: T.List[Path] = []
-        subdirs: T.List[Path] = []
-        for i in root.iterdir():
-            if i.is_dir() and i.name.startswith('lib'):
-                dirs += [i]
-
-        # Some distros put libraries not directly inside /usr/lib but in /usr/lib/x86_64-linux-gnu
-        for i in dirs:
-            for j in i.iterdir():
-                if j.is_dir() and j.name.endswith('-linux-gnu'):
-                    subdirs += [j]
+        dirs, subdirs = self._scan_lib_dirs(root)
 
         # Filter out paths that don't match the target arch to avoid finding
         # the wrong libraries. See https://github.com/mesonbuild/meson/issues/7110
@@ -617,24 +622,64 @@ class BoostDependency(SystemDependency):
 
         return libs
 
+    def _scan_lib_dirs(self, root: Path) -> T.Tuple[T.List[Path], T.List[Path]]:
+        cache = self.env.coredata.file_stamp_cache
+        key = ('boost-lib-dirs', root.as_posix())
+        cached: T.Optional[T.Tuple[T.List[Path], T.List[Path]]] = cache.get(key)
+        if cached is not None:
+            return cached
+
+        dirs: T.List[Path] = []
+        subdirs: T.List[Path] = []
+        for i in root.iterdir():
+            if i.is_dir() and i.name.startswith('lib'):
+                dirs += [i]
+
+        # Some distros put libraries not directly inside /usr/lib but in /usr/lib/x86_64-linux-gnu
+        for i in dirs:
+            for j in i.iterdir():
+                if j.is_dir() and j.name.endswith('-linux-gnu'):
+                    subdirs += [j]
+
+        cache.put(key, [x.as_posix() for x in [root] + dirs], (dirs, subdirs))
+        return dirs, subdirs
+
     def detect_libraries(self, libdir: Path) -> T.List[BoostLibraryFile]:
+        # Parsing every file in a library directory is expensive, so the
+        # result is cached until the directory contents change.
+        cache = self.env.coredata.file_stamp_cache
+        key = ('boost-libs', libdir.as_posix())
+        cached: T.Optional[T.Tuple[T.List[BoostLibraryFile], T.List[str]]] = cache.get(key)
+        if cached is None:
+            cached = self._scan_libraries(libdir)
+            cache.put(key, [libdir.as_posix()], cached)
+
+        libs, unknown = cached
+        for name in unknown:
+            mlog.warning(f'Boost: ignoring unknown file {name} under lib directory')
+        return libs
+
+    def _scan_libraries(self, libdir: Path) -> T.Tuple[T.List[BoostLibraryFile], T.List[str]]:
         libs: T.Set[BoostLibraryFile] = set()
-        for i in libdir.iterdir():
-            if not i.is_file():
-                continue
-            if not any(i.name.startswith(x) for x in ['libboost_', 'boost_']):
+        unknown: T.List[str] = []
+        if not libdir.is_dir():
+            return [], []
+        for i in os.scandir(libdir):
+            if not i.name.startswith(('libboost_', 'boost_')):
                 continue
             # Windows binaries from SourceForge ship with PDB files alongside
             # DLLs (#8325).  Ignore them.
             if i.name.endswith('.pdb'):
                 continue
+            if not i.is_file():
+                continue
 
             try:
-                libs.add(BoostLibraryFile(i.resolve()))
+                libs.add(BoostLibraryFile(Path(i.path).resolve()))
             except UnknownFileException as e:
-                mlog.warning('Boost: ignoring unknown file {} under lib directory'.format(e.path.name))
+                unknown.append(e.path.name)
 
-        return [x for x in libs if x.is_boost()]  # Filter out no boost libraries
+        return [x for x in libs if x.is_boost()], unknown  # Filter out no boost libraries
 
     def detect_split_root(self, inc_dir: Path, lib_dir: Path) -> None:
         boost_inc_dir = None
@@ -7,6 +7,7 @@ from .base import ExternalDependency, DependencyException, DependencyTypeName
 from ..mesonlib import listify, Popen_safe, Popen_safe_logged, split_args, version_compare, version_compare_many
 from ..programs import find_external_program
 from .. import mlog
+import os
 import re
 import typing as T
 
@@ -16,6 +17,12 @@ if T.TYPE_CHECKING:
     from ..environment import Environment
     from ..interpreter.type_checking import PkgConfigDefineType
 
+    ConfigResult = T.Tuple[int, str, str]
+
+# Environment variables that commonly influence what config tools print, for
+# example because the tool is a wrapper around pkg-config.
+_CONFIG_TOOL_ENV = ('PATH', 'PKG_CONFIG_PATH', 'PKG_CONFIG_LIBDIR', 'PKG_CONFIG_SYSROOT_DIR')
+
 class ConfigToolDependency(ExternalDependency):
 
     """Class representing dependencies found using a config tool.
@@ -40,6 +47,7 @@ class ConfigToolDependency(ExternalDependency):
     def __init__(self, name: str, environment: 'Environment', kwargs: T.Dict[str, T.Any], language: T.Optional[str] = None, exclude_paths: T.Optional[T.List[str]] = None):
         super().__init__(DependencyTypeName('config-tool'), environment, kwargs, language=language)
         self.name = name
+        self._config_results: T.Dict[T.Tuple[T.Hashable, ...], ConfigResult] = {}
         # You may want to overwrite the class version in some cases
         self.tools = listify(kwargs.get('tools', self.tools))
         if not self.tool_name:
@@ -69,8 +77,23 @@ class ConfigToolDependency(ExternalDependency):
             return m.group(0).rstrip('.')
         return version
 
+    @staticmethod
+    def _stamped_files(tool: T.List[str]) -> T.List[str]:
+        '''Files whose modification invalidates cached output of the tool'''
+        return [c for c in tool if c and os.path.isabs(c) and os.path.isfile(c)]
+
+    def _cache_key(self, kind: str, tool: T.List[str], args: T.List[str]) -> T.Tuple[T.Hashable, ...]:
+        return (kind, tuple(tool), tuple(args), tuple(os.environ.get(v) for v in _CONFIG_TOOL_ENV))
+
     def _check_and_get_version(self, tool: T.List[str], returncode: int) -> T.Tuple[bool, T.Union[str, None]]:
         """Check whether a command is valid and get its version"""
+        # Checking the version of every candidate spawns each of them, so the
+        # result is kept for as long as the tool itself does not change.
+        cache = self.env.coredata.file_stamp_cache
+        key = self._cache_key('config-tool-version', tool, [self.version_arg, self.skip_version or '', str(returncode)])
+        cached: T.Optional[T.Tuple[bool, str]] = cache.get(key)
+        if cached is not None:
+            return cached
         p, out = Popen_safe(tool + [self.version_arg])[:2]
         valid = True
         if p.returncode != returncode:
@@ -82,6 +105,9 @@ class ConfigToolDependency(ExternalDependency):
             else:
                 valid = False
         version = self._sanitize_version(out.strip())
+        stamped = self._stamped_files(tool)
+        if stamped:
+            cache.put(key, stamped, (valid, version))
         return valid, version
 
     def find_config(self, versions: T.List[str], returncode: int = 0, exclude_paths: T.Optional[T.List[str]] = None) \
@@ -143,9 +169,51 @@ class ConfigToolDependency(ExternalDependency):
 
         return self.config is not None
 
+    def _run_config_tool(self, args: T.List[str]) -> ConfigResult:
+        """Run the config tool with the given arguments, or reuse a previous run.
+
+        The output is cached in the coredata, so that unchanged tools are not
+        spawned again when reconfiguring.
+        """
+        key = self._cache_key('config-tool', self.config, args)
+        result = self._config_results.get(key)
+        if result is None:
+            result = self.env.coredata.file_stamp_cache.get(key)
+        if result is not None:
+            mlog.debug(f'Using cached output of: {mesonlib.join_args(self.config + args)}')
+        else:
+            p, out, err = Popen_safe_logged(self.config + args)
+            result = (p.returncode, out, err)
+            self._store_config_result(key, result)
+        return result
+
+    def _store_config_result(self, key: T.Tuple[T.Hashable, ...], result: ConfigResult) -> None:
+        self._config_results[key] = result
+        stamped = self._stamped_files(self.config)
+        if stamped:
+            self.env.coredata.file_stamp_cache.put(key, stamped, result)
+
+    def prefetch_config_values(self, args: T.List[str]) -> None:
+        """Query several values of the config tool with a single invocation.
+
+        This only works for tools that print the value of every argument on
+        its own line, in the order the arguments are given. If the output does
+        not look like that, nothing is stored and every value will be queried
+        on its own instead.
+        """
+        keys = [self._cache_key('config-tool', self.config, [a]) for a in args]
+        if all(k in self._config_results for k in keys):
+            return
+        returncode, out, _ = self._run_config_tool(args)
+        lines = out.splitlines()
+        if returncode != 0 or len(lines) != len(args):
+            return
+        for key, line in zip(keys, lines):
+            self._store_config_result(key, (0, line, ''))
+
     def get_config_value(self, args: T.List[str], stage: str) -> T.List[str]:
-        p, out, err = Popen_safe_logged(self.config + args)
-        if p.returncode != 0:
+        returncode, out, err = self._run_config_tool(args)
+        if returncode != 0:
             if self.required:
                 raise DependencyException(f'Could not generate {stage} for {self.name}.\n{err}')
             return []
@@ -163,8 +231,8 @@ class ConfigToolDependency(ExternalDependency):
                      system: T.Optional[str] = None, default_value: T.Optional[str] = None,
                      pkgconfig_define: PkgConfigDefineType = None) -> str:
         if configtool:
-            p, out, _ = Popen_safe(self.config + self.get_variable_args(configtool))
-            if p.returncode == 0:
+            returncode, out, _ = self._run_config_tool(self.get_variable_args(configtool))
+            if returncode == 0:
                 variable = out.strip()
                 mlog.debug(f'Got config-tool variable {configtool} : {variable}')
                 return variable
@@ -214,6 +214,9 @@ class LLVMDependencyConfigTool(ConfigToolDependency):
         if not self.is_found:
             return
 
+        # llvm-config prints these values one per line in the order they were
+        # asked for, which saves spawning it for each of them.
+        self.prefetch_config_values(['--components', '--cppflags', '--libdir'])
         self.provided_modules = self.get_config_value(['--components'], 'modules')
         modules = stringlistify(extract_as_list(kwargs, 'modules'))
         self.check_components(modules)
@@ -74,6 +74,14 @@ class NumPyConfigToolDependency(ConfigToolDependency):
         self.compile_args = self.get_config_value(['--cflags'], 'compile_args')
 
 
+# Environment variables that affect the results of python_info.py
+_PYTHON_INTROSPECTION_ENV = [
+    'PYTHONHOME', 'PYTHONPATH', 'PYTHONPLATLIBDIR', 'PYTHONUSERBASE', 'PYTHONNOUSERSITE',
+    'VIRTUAL_ENV', 'DEB_PYTHON_INSTALL_LAYOUT', '_PYTHON_HOST_PLATFORM',
+    '_PYTHON_PROJECT_BASE', '_PYTHON_SYSCONFIGDATA_NAME',
+]
+
+
 class BasicPythonExternalProgram(ExternalProgram):
     def __init__(self, name: str, command: T.Optional[T.List[str]] = None,
                  ext_prog: T.Optional[ExternalProgram] = None):
@@ -113,19 +121,49 @@ class BasicPythonExternalProgram(ExternalProgram):
             return mesonlib.version_compare(version, '>= 3.0')
         return True
 
-    def sanity(self) -> bool:
+    def get_environment_key(self) -> T.Tuple[T.Tuple[str, T.Optional[str]], ...]:
+        '''The environment variables that change what the interpreter reports,
+        for keying cached results on.'''
+        return tuple((k, os.environ.get(k)) for k in _PYTHON_INTROSPECTION_ENV)
+
+    def get_stamped_files(self) -> T.List[str]:
+        # Virtual environments are configured by the pyvenv.cfg next to the
+        # interpreter
+        files = super().get_stamped_files()
+        return files + [os.path.join(os.path.dirname(os.path.dirname(f)), 'pyvenv.cfg') for f in files]
+
+    def sanity(self, env: T.Optional['Environment'] = None) -> bool:
         # Sanity check, we expect to have something that at least quacks in tune
 
         import importlib.resources
 
         with importlib.resources.path('mesonbuild.scripts', 'python_info.py') as f:
             cmd = self.get_command() + [str(f)]
-            env = os.environ.copy()
-            env['SETUPTOOLS_USE_DISTUTILS'] = 'stdlib'
-            p, stdout, stderr = mesonlib.Popen_safe(cmd, env=env)
+            info = self._introspect(cmd, env, [str(f)] + self.get_stamped_files())
+
+        if info is not None and self._check_version(info['version']):
+            self.info = T.cast('PythonIntrospectionDict', info)
+            return True
+        else:
+            return False
+
+    def _introspect(self, cmd: T.List[str], env: T.Optional['Environment'],
+                    stamped: T.List[str]) -> T.Optional[T.Dict[str, T.Any]]:
+        # Spawning the interpreter takes a noticeable amount of time, so the
+        # result is cached as long as the interpreter is unchanged.
+        key: T.Tuple[T.Hashable, ...] = ('python_info', tuple(cmd)) + self.get_environment_key()
+        if env is not None:
+            cached: T.Optional[T.Dict[str, T.Any]] = env.coredata.file_stamp_cache.get(key)
+            if cached is not None:
+                mlog.debug(f'Using cached Python introspection data for {self.get_path()}')
+                return cached
+
+        run_env = os.environ.copy()
+        run_env['SETUPTOOLS_USE_DISTUTILS'] = 'stdlib'
+        p, stdout, stderr = mesonlib.Popen_safe(cmd, env=run_env)
 
         try:
-            info = json.loads(stdout)
+            info: T.Optional[T.Dict[str, T.Any]] = json.loads(stdout)
         except json.JSONDecodeError:
             info = None
             mlog.debug('Could not introspect Python (%s): exit code %d' % (str(p.args), p.returncode))
@@ -134,11 +172,9 @@ class BasicPythonExternalProgram(ExternalProgram):
             mlog.debug('Program stderr:\n')
             mlog.debug(stderr)
 
-        if info is not None and self._check_version(info['version']):
-            self.info = T.cast('PythonIntrospectionDict', info)
-            return True
-        else:
-            return False
+        if info is not None and env is not None:
+            env.coredata.file_stamp_cache.put(key, stamped, info)
+        return info
 
 
 class _PythonDependencyBase(_Base):
@@ -400,7 +436,7 @@ def python_factory(env: 'Environment', for_machine: 'MachineChoice',
     # When not invoked through the python module, default installation.
     if installation is None:
         installation = BasicPythonExternalProgram('python3', mesonlib.python_command)
-        installation.sanity()
+        installation.sanity(env)
     pkg_version = installation.info['variables'].get('LDVERSION') or installation.info['version']
 
     if DependencyMethods.PKGCONFIG in methods:
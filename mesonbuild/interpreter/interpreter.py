@@ -3245,6 +3245,8 @@ class Interpreter(InterpreterBase, HoldableObject):
             self.add_stdlib_info(tobj)
 
         self.build.targets[idname] = tobj
+        # The backend memoizes what it works out about the targets
+        self.backend.clear_cache()
         # Only need to add executables to this set
         if isinstance(tobj, build.Executable):
             self.build.targetnames.update([namedir])
@@ -16,6 +16,8 @@ from pathlib import Path
 
 from . import mlog
 from . import mesonlib
+from .buildtimes import BuildTimes, print_report
+from .ninjadeps import NinjaLog
 from .options import OptionKey
 from .mesonlib import MesonException, RealPathAction, join_args, listify_array_value, setup_vsenv
 from mesonbuild.environment import detect_ninja
@@ -328,6 +330,19 @@ def add_arguments(parser: 'argparse.ArgumentParser') -> None:
         action='store_true',
         help='Show more verbose output.'
     )
+    parser.add_argument(
+        '--analyze',
+        action='store_true',
+        help='Report where the time of the build went: the critical path, the slowest targets and '
+             'commands, and the parallelism over time (applied only on `ninja` backend).'
+    )
+    parser.add_argument(
+        '--analyze-trace',
+        metavar='FILE',
+        default=None,
+        help='Write the commands of the build to FILE in Chrome trace format, '
+             'implies --analyze (applied only on `ninja` backend).'
+    )
     parser.add_argument(
         '--ninja-args',
         type=array_arg,
@@ -365,6 +380,9 @@ def run(options: 'argparse.Namespace') -> int:
     backend = cdata.optstore.get_value_for(OptionKey('backend'))
     assert isinstance(backend, str)
     mlog.log(mlog.green('INFO:'), 'autodetecting backend as', backend)
+    analyze = options.analyze or options.analyze_trace is not None
+    if analyze and backend != 'ninja':
+        raise MesonException('--analyze is only supported with the ninja backend.')
     if backend == 'ninja':
         cmd, env = get_parsed_args_ninja(options, bdir)
     elif backend.startswith('vs'):
@@ -376,6 +394,18 @@ def run(options: 'argparse.Namespace') -> int:
             f'Backend `{backend}` is not yet supported by `compile`. Use generated project files directly instead.')
 
     mlog.log(mlog.green('INFO:'), 'calculating backend command to run:', join_args(cmd))
+    ninja_log: T.Optional[NinjaLog] = None
+    if analyze and not options.clean:
+        # Only analyze what this build ran
+        ninja_log = NinjaLog(str(bdir / '.ninja_log'))
+        ninja_log.start_run()
     p, *_ = mesonlib.Popen_safe(cmd, stdout=sys.stdout.buffer, stderr=sys.stderr.buffer, env=env)
 
+    if ninja_log is not None:
+        times = BuildTimes(b, options.wd, ninja_log)
+        print_report(times)
+        if options.analyze_trace is not None:
+            times.write_chrome_trace(options.analyze_trace)
+            mlog.log(mlog.green('INFO:'), 'trace written to', options.analyze_trace)
+
     return p.returncode
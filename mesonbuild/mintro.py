@@ -19,7 +19,7 @@ from pathlib import Path, PurePath
 import sys
 import typing as T
 
-from . import build, environment, mesonlib, options, coredata as cdata
+from . import build, environment, mesonlib, ninjadeps, options, coredata as cdata
 from .ast import IntrospectionInterpreter, AstConditionLevel, AstIDGenerator, AstIndentationGenerator, AstJSONPrinter
 from .backend import backends
 from .dependencies import Dependency
@@ -93,6 +93,12 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
 
     parser.add_argument('--backend', choices=sorted(options.backendlist), dest='backend', default='ninja',
                         help='The backend to use for the --buildoptions introspection.')
+    parser.add_argument('--dependents-of', action='append', dest='dependents_of', default=[], metavar='FILE',
+                        help='List the targets and tests that depend on FILE, according to the '
+                             'dependencies recorded by ninja. Can be given multiple times.')
+    parser.add_argument('--files-read-by', action='append', dest='files_read_by', default=[], metavar='TARGET',
+                        help='List the files that ninja recorded as read while building TARGET, '
+                             'given by id or name. Can be given multiple times.')
     parser.add_argument('-a', '--all', action='store_true', dest='all', default=False,
                         help='Print all available information.')
     parser.add_argument('-i', '--indent', action='store_true', dest='indent', default=False,
@@ -492,6 +498,32 @@ def list_projinfo_from_source(intr: IntrospectionInterpreter) -> T.Dict[str, T.U
     intr.project_data['subproject_dir'] = intr.subproject_dir
     return intr.project_data
 
+def list_dependents_of(graph: ninjadeps.DependencyGraph, files: T.List[str],
+                       tests: T.List[T.Dict[str, T.Any]]) -> T.Dict[str, T.Dict[str, T.List[str]]]:
+    result: T.Dict[str, T.Dict[str, T.List[str]]] = {}
+    for f in files:
+        targets = graph.get_affected_targets([f])
+        result[f] = {
+            'targets': sorted(targets),
+            'tests': [t['name'] for t in tests if targets.intersection(t['depends'])],
+        }
+    return result
+
+def list_files_read_by(graph: ninjadeps.DependencyGraph, targets: T.List[str]) -> T.Dict[str, T.List[str]]:
+    result: T.Dict[str, T.List[str]] = {}
+    for name in targets:
+        if name in graph.targets:
+            ids = [name]
+        else:
+            ids = [tid for tid, t in graph.targets.items() if t.name == name]
+        if not ids:
+            raise mesonlib.MesonException(f'Unknown target {name!r}')
+        files: T.List[str] = []
+        for tid in ids:
+            files.extend(graph.get_files_read_by(tid))
+        result[name] = files
+    return result
+
 def print_results(options: argparse.Namespace, results: T.Sequence[T.Tuple[str, T.Union[dict, T.List[T.Any]]]], indent: T.Optional[int]) -> int:
     if not results and not options.force_dict:
         print('No command specified')
@@ -578,6 +610,18 @@ def run(options: argparse.Namespace) -> int:
             print('Introspection file {} does not exist.'.format(get_info_file(infodir, i)))
             return 1
 
+    if options.dependents_of or options.files_read_by:
+        try:
+            graph = ninjadeps.DependencyGraph(build.load(options.builddir), ninjadeps.load(options.builddir))
+            if options.dependents_of:
+                tests = load_info_file(infodir, 'tests') + load_info_file(infodir, 'benchmarks')
+                results += [('dependents_of', list_dependents_of(graph, options.dependents_of, tests))]
+            if options.files_read_by:
+                results += [('files_read_by', list_files_read_by(graph, options.files_read_by))]
+        except mesonlib.MesonException as e:
+            print(e)
+            return 1
+
     return print_results(options, results, indent)
 
 updated_introspection_files: T.List[str] = []
@@ -19,7 +19,7 @@ from ..mesonlib import MesonException, File, FileMode, version_compare, Popen_sa
 from ..interpreter import extract_required_kwarg
 from ..interpreter.type_checking import INSTALL_DIR_KW, INSTALL_KW, NoneType
 from ..interpreterbase import ContainerTypeInfo, FeatureDeprecated, KwargInfo, noPosargs, FeatureNew, typed_kwargs, typed_pos_args
-from ..programs import NonExistingExternalProgram
+from ..programs import ExternalProgram, NonExistingExternalProgram
 
 if T.TYPE_CHECKING:
     from . import ModuleState
@@ -27,7 +27,6 @@ if T.TYPE_CHECKING:
     from ..interpreter import Interpreter
     from ..interpreter import kwargs
     from ..mesonlib import FileOrString
-    from ..programs import ExternalProgram
     from typing_extensions import Literal
 
     QtDependencyType = T.Union[QtPkgConfigDependency, QmakeQtDependency]
@@ -251,12 +250,22 @@ class QtBaseModule(ExtensionModule):
 
             # Ensure that the version of qt and each tool are the same
             def get_version(p: T.Union[ExternalProgram, build.Executable]) -> str:
+                use_stdout = name == 'lrelease' or not qt_dep.version.startswith('4')
+                # The tools only change when Qt is updated, so avoid spawning
+                # them again on every reconfiguration.
+                cache = state.environment.coredata.file_stamp_cache
+                key = ('qt_tool_version', tuple(p.get_command()), tuple(arg), use_stdout)
+                stamped = p.get_stamped_files() if isinstance(p, ExternalProgram) else []
+                if stamped:
+                    cached: T.Optional[str] = cache.get(key)
+                    if cached is not None:
+                        return cached
                 _, out, err = Popen_safe(p.get_command() + arg)
-                if name == 'lrelease' or not qt_dep.version.startswith('4'):
-                    care = out
-                else:
-                    care = err
-                return care.rsplit(' ', maxsplit=1)[-1].replace(')', '').strip()
+                care = out if use_stdout else err
+                version = care.rsplit(' ', maxsplit=1)[-1].replace(')', '').strip()
+                if stamped:
+                    cache.put(key, stamped, version)
+                return version
 
             p = state.find_program(b, required=False,
                                    version_func=get_version,
@@ -32,6 +32,7 @@ if T.TYPE_CHECKING:
     from . import ModuleState
     from ..build import Build, Data
     from ..dependencies import Dependency
+    from ..environment import Environment
     from ..interpreter import Interpreter
     from ..interpreter.interpreter import BuildTargetSource
     from ..interpreter.kwargs import ExtractRequired, SharedModule as SharedModuleKw
@@ -70,8 +71,8 @@ class PythonExternalProgram(BasicPythonExternalProgram):
     # and return a temporary one rather than the cached object.
     run_bytecompile: T.ClassVar[T.Dict[str, bool]] = {}
 
-    def sanity(self, state: T.Optional['ModuleState'] = None) -> bool:
-        ret = super().sanity()
+    def sanity(self, env: T.Optional['Environment'] = None, state: T.Optional['ModuleState'] = None) -> bool:
+        ret = super().sanity(env)
         if ret:
             self.platlib = self._get_path(state, 'platlib')
             self.purelib = self._get_path(state, 'purelib')
@@ -104,6 +105,41 @@ class PythonExternalProgram(BasicPythonExternalProgram):
         return rel_path
 
 
+# Imports every module given on the command line and reports which of them
+# could be imported, together with the sys.path they were searched in. Each
+# import runs in a forked child, so that what one module does when imported
+# cannot change whether the others are found. Without fork, the import
+# machinery is reset between the modules instead.
+_CHECK_MODULES_SCRIPT = """\
+import importlib, json, os, sys
+path = list(sys.path)
+out = sys.stdout
+sys.stdout = sys.stderr
+import_module = importlib.import_module
+def check(mod):
+    try:
+        import_module(mod)
+        return True
+    except BaseException:
+        return False
+modules = {}
+for mod in sys.argv[1:]:
+    if hasattr(os, 'fork'):
+        pid = os.fork()
+        if pid == 0:
+            os.dup2(2, 1)
+            os._exit(0 if check(mod) else 1)
+        modules[mod] = os.waitpid(pid, 0)[1] == 0
+    else:
+        loaded = set(sys.modules)
+        modules[mod] = check(mod)
+        sys.path[:] = path
+        for name in set(sys.modules) - loaded:
+            del sys.modules[name]
+        importlib.invalidate_caches()
+out.write(json.dumps({'modules': modules, 'path': path}))
+"""
+
 _PURE_KW = KwargInfo('pure', (bool, NoneType))
 _SUBDIR_KW = KwargInfo('subdir', str, default='')
 _LIMITED_API_KW = KwargInfo('limited_api', str, default='', since='1.3.0')
@@ -459,7 +495,7 @@ class PythonModule(ExtensionModule):
                 python = PythonExternalProgram(name_or_path, ext_prog=tmp_python)
 
         if python.found():
-            if python.sanity(state):
+            if python.sanity(state.environment, state):
                 return python
             else:
                 sanitymsg = f'{python} is not a valid python or it is missing distutils'
@@ -470,6 +506,36 @@ class PythonModule(ExtensionModule):
 
         return NonExistingExternalProgram(python.name)
 
+    @staticmethod
+    def _check_modules(state: 'ModuleState', python: 'PythonExternalProgram', modules: T.List[str]) -> T.Dict[str, bool]:
+        # Try to import all modules in a single process. The result only
+        # changes when the interpreter or the contents of one of the
+        # directories on its sys.path change, so it is cached with those.
+        cache = state.environment.coredata.file_stamp_cache
+        key = ('python_modules', tuple(python.command), tuple(modules)) + python.get_environment_key()
+        cached: T.Optional[T.Dict[str, bool]] = cache.get(key)
+        if cached is not None:
+            return cached
+
+        p, stdout, _ = mesonlib.Popen_safe(python.command + ['-c', _CHECK_MODULES_SCRIPT] + modules)
+        try:
+            data = json.loads(stdout)
+            result: T.Dict[str, bool] = {m: data['modules'][m] for m in modules}
+            paths: T.List[str] = data['path']
+        except (json.JSONDecodeError, KeyError, TypeError):
+            # Something in the batch took the whole interpreter down, check
+            # the modules one by one
+            mlog.debug(f'Checking Python modules in a single process failed with exit code {p.returncode}')
+            result = {}
+            for mod in modules:
+                p, *_ = mesonlib.Popen_safe(python.command + ['-c', f'import {mod}'])
+                result[mod] = p.returncode == 0
+            return result
+
+        stamped = python.get_stamped_files() + [x for x in paths if os.path.isabs(x)]
+        cache.put(key, stamped, result)
+        return result
+
     @disablerIfNotFound
     @typed_pos_args('python.find_installation', optargs=[str])
     @typed_kwargs(
@@ -510,14 +576,12 @@ class PythonModule(ExtensionModule):
         found_modules: T.List[str] = []
         missing_modules: T.List[str] = []
         if python.found() and want_modules:
-            for mod in want_modules:
-                p, *_ = mesonlib.Popen_safe(
-                    python.command +
-                    ['-c', f'import {mod}'])
-                if p.returncode != 0:
-                    missing_modules.append(mod)
-                else:
+            assert isinstance(python, PythonExternalProgram), 'for mypy'
+            for mod, found in self._check_modules(state, python, want_modules).items():
+                if found:
                     found_modules.append(mod)
+                else:
+                    missing_modules.append(mod)
 
         msg: T.List['mlog.TV_Loggable'] = ['Program', python.name]
         if want_modules:
@@ -271,6 +271,8 @@ class MesonApp:
             self.check_unused_options(env.coredata,
                                       intr.user_defined_options.cmd_line_options,
                                       intr.subprojects)
+            # The targets and options are final from here on
+            intr.backend.clear_cache()
             if self.options.profile:
                 localvars = locals()
                 fname = f'profile-{intr.backend.name}-backend.log'
@@ -31,11 +31,12 @@ import xml.etree.ElementTree as et
 from . import build
 from . import environment
 from . import mlog
+from . import ninjadeps
 from .coredata import MesonVersionMismatchException, major_versions_differ
 from .coredata import version as coredata_version
 from .mesonlib import (MesonException, OrderedSet, RealPathAction,
                        get_wine_shortpath, join_args, split_args, setup_vsenv,
-                       determine_worker_count)
+                       determine_worker_count, quiet_git)
 from .options import OptionKey
 from .programs import ExternalProgram
 from .backend.backends import TestProtocol, TestSerialisation
@@ -147,6 +148,10 @@ def add_arguments(parser: argparse.ArgumentParser) -> None:
                         help='Only run tests belonging to the given suite.')
     parser.add_argument('--no-suite', default=[], dest='exclude_suites', action='append', metavar='SUITE',
                         help='Do not run tests belonging to the given suite.')
+    parser.add_argument('--affected-by', default=[], action='append', metavar='FILE|REV',
+                        help='Only run tests affected by a change to FILE, or to the files changed '
+                        'since the git revision REV, according to the dependencies recorded by ninja. '
+                        'Since 1.9.0.')
     parser.add_argument('--no-stdsplit', default=True, dest='split', action='store_false',
                         help='Do not split stderr and stdout in test logs.')
     parser.add_argument('--print-errorlogs', default=False, action='store_true',
@@ -1887,7 +1892,7 @@ class TestHarness:
             raise RuntimeError('Test harness object can only be used once.')
         self.is_run = True
         tests = self.get_tests()
-        rebuild_only_tests = tests if self.options.args else []
+        rebuild_only_tests = tests if self.options.args or self.options.affected_by else []
         if not tests:
             return 0
         if not self.options.no_rebuild and not rebuild_deps(self.ninja, self.options.wd, rebuild_only_tests, self.options.benchmark):
@@ -2030,6 +2035,52 @@ class TestHarness:
                     # succeed on an invalid pattern.
                     raise MesonException(f'{arg} test name does not match any test')
 
+    def get_changed_files(self) -> T.List[str]:
+        '''
+        Expand the arguments of --affected-by to absolute file names. Each one
+        is either a file, or a git revision standing for all files that differ
+        between it and the working tree of the source directory.
+        '''
+        files: T.List[str] = []
+        srcdir = self.build_data.environment.get_source_dir()
+        for arg in self.options.affected_by:
+            if os.path.lexists(arg):
+                files.append(os.path.abspath(arg))
+                continue
+            ok, toplevel = quiet_git(['rev-parse', '--show-toplevel'], srcdir)
+            if ok:
+                ok, out = quiet_git(['diff', '--name-only', '-z', arg, '--'], srcdir)
+            if not ok:
+                raise TestException(f'--affected-by {arg!r} is neither a file nor a git revision')
+            toplevel = toplevel.strip()
+            files.extend(os.path.normpath(os.path.join(toplevel, f)) for f in out.split('\0') if f)
+        return files
+
+    def tests_affected_by(self, tests: T.List[TestSerialisation]) -> T.List[TestSerialisation]:
+        '''
+        Select the tests using a target that has to be rebuilt after the
+        changes given with --affected-by, or using a changed file directly.
+        '''
+        files = self.get_changed_files()
+        wd = self.options.wd
+        with open(os.path.join(wd, 'meson-info', 'intro-buildsystem_files.json'), encoding='utf-8') as f:
+            build_files = json.load(f)
+        if not set(build_files).isdisjoint(files):
+            # The build definition changed, the recorded dependencies may no
+            # longer reflect it
+            return tests
+
+        deps = ninjadeps.load(wd)
+        if not deps.outputs():
+            mlog.warning('No dependencies have been recorded by ninja yet, running all tests')
+            return tests
+
+        graph = ninjadeps.DependencyGraph(self.build_data, deps)
+        affected = graph.get_affected_targets(files)
+        changed = set(files)
+        return [t for t in tests
+                if not affected.isdisjoint(t.depends) or not changed.isdisjoint(t.fname + t.cmd_args)]
+
     def get_tests(self, errorfile: T.Optional[T.IO] = None) -> T.List[TestSerialisation]:
         if not self.tests:
             print('No tests defined.', file=errorfile)
@@ -2038,6 +2089,8 @@ class TestHarness:
         tests = [t for t in self.tests if self.test_suitable(t)]
         if self.options.args:
             tests = list(self.tests_from_args(tests))
+        if self.options.affected_by:
+            tests = self.tests_affected_by(tests)
         if self.options.slice:
             our_slice, nslices = self.options.slice
             if nslices > len(tests):
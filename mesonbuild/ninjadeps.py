@@ -0,0 +1,468 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+"""Readers for the state ninja keeps in the build directory.
+
+`.ninja_deps` holds the header and source dependencies that ninja recorded
+from depfiles and /showIncludes output, `.ninja_log` holds the time every
+output took to build. Both files are only ever appended to, except when ninja
+recompacts them, so the readers remember how far they got and only parse what
+was appended since on the next update().
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import pickle
+import posixpath
+import re
+import struct
+import typing as T
+
+from . import build
+from .mesonlib import File, OrderedSet
+from .options import OptionKey
+
+DEPS_SIGNATURE = b'# ninjadeps\n'
+LOG_SIGNATURE = '# ninja log v'
+
+# Anything larger than this is a corrupt record, see deps_log.cc in ninja
+MAX_RECORD_SIZE = (1 << 19) - 1
+
+
+class _FileState:
+
+    """Tracks which part of an append-only file has been read already."""
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.identity: T.Optional[T.Tuple[int, int]] = None
+
+    def start(self, path: str) -> T.Optional[int]:
+        '''Return the offset to continue reading at, or None if the file is gone.
+
+        Resets to 0 if the file was replaced or truncated since the last read.
+        '''
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        identity = (st.st_dev, st.st_ino)
+        if identity != self.identity or st.st_size < self.offset:
+            self.identity = identity
+            self.offset = 0
+        return self.offset
+
+
+class NinjaDeps:
+
+    """The dependencies recorded in .ninja_deps.
+
+    Paths are as ninja stores them, relative to the build directory unless
+    they are absolute.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._state = _FileState()
+        self._version = 4
+        self.nodes: T.List[str] = []
+        self._ids: T.Dict[str, int] = {}
+        self._deps: T.Dict[int, T.Tuple[int, ...]] = {}
+        self._dependents: T.Dict[int, T.Set[int]] = {}
+
+    @classmethod
+    def from_builddir(cls, builddir: str) -> NinjaDeps:
+        deps = cls(os.path.join(builddir, '.ninja_deps'))
+        deps.update()
+        return deps
+
+    def _reset(self) -> None:
+        self.nodes.clear()
+        self._ids.clear()
+        self._deps.clear()
+        self._dependents.clear()
+
+    def update(self) -> None:
+        '''Read the records appended since the last update.'''
+        offset = self._state.start(self.path)
+        if offset is None:
+            self._reset()
+            return
+        if offset == 0:
+            self._reset()
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        pos = 0
+        if offset == 0:
+            header = data[:len(DEPS_SIGNATURE) + 4]
+            if len(header) < len(DEPS_SIGNATURE) + 4 or not header.startswith(DEPS_SIGNATURE):
+                return
+            self._version, = struct.unpack_from('<i', header, len(DEPS_SIGNATURE))
+            if self._version not in {3, 4}:
+                return
+            pos = len(header)
+        mtime_words = 2 if self._version == 4 else 1
+
+        while pos + 4 <= len(data):
+            size, = struct.unpack_from('<I', data, pos)
+            is_deps = bool(size >> 31)
+            size &= 0x7FFFFFFF
+            if size > MAX_RECORD_SIZE or size % 4 or pos + 4 + size > len(data):
+                # Corrupt or not completely written yet, ninja stops here too
+                break
+            record = data[pos + 4:pos + 4 + size]
+            if is_deps:
+                values = struct.unpack(f'<{size // 4}i', record)
+                out = values[0]
+                if out < 0 or out >= len(self.nodes):
+                    break
+                self._set_deps(out, values[1 + mtime_words:])
+            else:
+                checksum, = struct.unpack_from('<I', record, size - 4)
+                if (~checksum & 0xFFFFFFFF) != len(self.nodes):
+                    break
+                name = record[:size - 4].rstrip(b'\0').decode('utf-8', errors='surrogateescape')
+                self._ids[name] = len(self.nodes)
+                self.nodes.append(name)
+            pos += 4 + size
+        self._state.offset = offset + pos
+
+    def _set_deps(self, out: int, deps: T.Tuple[int, ...]) -> None:
+        for d in self._deps.get(out, ()):
+            self._dependents[d].discard(out)
+        self._deps[out] = deps
+        for d in deps:
+            self._dependents.setdefault(d, set()).add(out)
+
+    def outputs(self) -> T.List[str]:
+        '''All outputs with recorded dependencies.'''
+        return [self.nodes[i] for i in self._deps]
+
+    def get_deps(self, output: str) -> T.List[str]:
+        '''The files ninja recorded as read while building output.'''
+        i = self._ids.get(output)
+        if i is None:
+            return []
+        return [self.nodes[d] for d in self._deps.get(i, ())]
+
+    def get_dependents(self, path: str) -> T.List[str]:
+        '''The outputs that ninja recorded as reading path.'''
+        i = self._ids.get(path)
+        if i is None:
+            return []
+        return sorted(self.nodes[o] for o in self._dependents.get(i, ()))
+
+
+class NinjaLogEntry(T.NamedTuple):
+
+    start: int
+    end: int
+    mtime: int
+    output: str
+    command_hash: str
+
+
+class NinjaLog:
+
+    """The build log in .ninja_log.
+
+    Only the last entry for each output is kept, as ninja does. Start and end
+    times are in milliseconds since the start of the ninja run that built the
+    output.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._state = _FileState()
+        self.entries: T.Dict[str, NinjaLogEntry] = {}
+        # The entries before the run last_run() is about, see start_run()
+        self._previous: T.Dict[str, NinjaLogEntry] = {}
+
+    @classmethod
+    def from_builddir(cls, builddir: str) -> NinjaLog:
+        log = cls(os.path.join(builddir, '.ninja_log'))
+        log.update()
+        return log
+
+    def update(self) -> None:
+        '''Read the entries appended since the last update.'''
+        offset = self._state.start(self.path)
+        if offset is None or offset == 0:
+            self.entries.clear()
+        if offset is None:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # Only complete lines, the last one may still be being written
+        end = data.rfind(b'\n') + 1
+        lines = data[:end].decode('utf-8', errors='surrogateescape').split('\n')
+        if offset == 0:
+            if not lines[0].startswith(LOG_SIGNATURE) or int(lines[0][len(LOG_SIGNATURE):] or 0) < 5:
+                return
+            lines = lines[1:]
+        for line in lines:
+            fields = line.split('\t')
+            if len(fields) != 5:
+                continue
+            start, end_time, mtime, output, command_hash = fields
+            # Keep the entries in the order they were last written
+            self.entries.pop(output, None)
+            self.entries[output] = NinjaLogEntry(int(start), int(end_time), int(mtime), output, command_hash)
+        self._state.offset = offset + end
+
+    def start_run(self) -> None:
+        '''Mark the start of a ninja run.
+
+        Call this before running ninja, last_run() then only returns the
+        entries written by that run.
+        '''
+        self.update()
+        self._previous = dict(self.entries)
+
+    def last_run(self) -> T.List[NinjaLogEntry]:
+        '''The entries written by the last ninja run, in order of completion.
+
+        Those are the entries that changed since start_run(). Comparing them
+        rather than reading from the old end of the file also works when ninja
+        recompacted the log. A run writes nothing if there was nothing to do.
+
+        The times start at zero whenever ninja starts, and entries are written
+        as the commands finish. If ninja restarted itself after regenerating
+        build.ninja, the end times go backwards, and only the entries after
+        that are returned. Without start_run() this finds the start of the
+        last run in the whole log.
+        '''
+        entries = [e for e in self.entries.values() if self._previous.get(e.output) != e]
+        first = 0
+        for i in range(1, len(entries)):
+            if entries[i].end < entries[i - 1].end:
+                first = i
+        return entries[first:]
+
+
+class BuildEdge(T.NamedTuple):
+
+    rule: str
+    outputs: T.List[str]
+    inputs: T.List[str]
+    implicit: T.List[str]
+    order_only: T.List[str]
+
+
+BUILD_TOKEN_RE = re.compile(r'(?:\$.|[^ $:|\n])+|\|\||\||:')
+BUILD_UNESCAPE_RE = re.compile(r'\$(.)')
+
+def read_build_edges(filename: str) -> T.Dict[str, BuildEdge]:
+    '''Read the build statements of a build.ninja written by Meson.
+
+    This is not a general ninja parser, it relies on Meson writing each build
+    statement on a single line. Returns a mapping from each output to the
+    statement producing it.
+    '''
+    edges: T.Dict[str, BuildEdge] = {}
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            if not line.startswith('build '):
+                continue
+            outputs: T.List[str] = []
+            lists: T.List[T.List[str]] = [[], [], []]
+            rule = ''
+            current = outputs
+            for token in BUILD_TOKEN_RE.findall(line, 6):
+                if token == ':' and not rule:
+                    rule = ' '
+                    current = lists[0]
+                elif token == '|':
+                    current = lists[1] if rule else outputs
+                elif token == '||':
+                    current = lists[2]
+                elif rule == ' ':
+                    rule = token
+                else:
+                    current.append(BUILD_UNESCAPE_RE.sub(r'\1', token))
+            edge = BuildEdge(rule, outputs, *lists)
+            for o in outputs:
+                edges[o] = edge
+    return edges
+
+
+def load(build_dir: str) -> NinjaDeps:
+    '''Load .ninja_deps through the index cached in meson-private.
+
+    Only the records ninja appended since the index was last saved have to be
+    parsed, so repeated queries on large builds stay cheap.
+    '''
+    filename = os.path.join(build_dir, 'meson-private', 'ninja_deps.dat')
+    deps: T.Optional[NinjaDeps] = None
+    try:
+        with open(filename, 'rb') as f:
+            obj = pickle.load(f)
+        if isinstance(obj, NinjaDeps):
+            deps = obj
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    if deps is None:
+        deps = NinjaDeps(os.path.join(build_dir, '.ninja_deps'))
+    deps.path = os.path.join(build_dir, '.ninja_deps')
+    state = (deps._state.identity, deps._state.offset)
+    deps.update()
+    if state != (deps._state.identity, deps._state.offset):
+        try:
+            with open(filename + '~', 'wb') as f:
+                pickle.dump(deps, f)
+            os.replace(filename + '~', filename)
+        except OSError:
+            pass
+    return deps
+
+
+def ninja_path(path: str) -> str:
+    '''Normalize a path to the form ninja records it in, with '/' separators.'''
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+class DependencyGraph:
+
+    """Maps the dependencies ninja recorded to the targets of a build."""
+
+    def __init__(self, b: build.Build, deps: NinjaDeps) -> None:
+        self.deps = deps
+        self.build_dir = b.environment.get_build_dir()
+        self._build_dir_node = ninja_path(self.build_dir)
+        self.targets = b.get_targets()
+        flat = b.environment.coredata.optstore.get_value_for(OptionKey('layout')) == 'flat'
+
+        # Build directory relative outputs and private directories to target ids
+        self._outputs: T.Dict[str, str] = {}
+        self._private_dirs: T.Dict[str, str] = {}
+        # Target ids to the ids of the targets that use their outputs
+        self._users: T.Dict[str, T.Set[str]] = {}
+        # Files named as inputs in the build definition to the ids of the
+        # targets reading them, ninja only records the implicit ones
+        self._inputs: T.Dict[str, T.Set[str]] = {}
+        self._target_outputs: T.Optional[T.Dict[str, T.List[str]]] = None
+        src_dir = b.environment.get_source_dir()
+        for tid, t in self.targets.items():
+            for f in self._explicit_inputs(t):
+                self._inputs.setdefault(self._node(f.absolute_path(src_dir, self.build_dir)), set()).add(tid)
+            outdir = 'meson-out' if flat else t.get_subdir()
+            for o in t.get_outputs():
+                self._outputs[ninja_path(os.path.join(outdir, o))] = tid
+            used: T.Iterable[T.Any]
+            if isinstance(t, build.BuildTarget):
+                self._private_dirs[ninja_path(os.path.join(outdir, t.get_filename() + '.p'))] = tid
+                if isinstance(t, build.StaticLibrary) and t.uses_rust_abi():
+                    # Built separately with rust_pipelining
+                    rmeta = os.path.splitext(t.get_filename())[0] + '.rmeta'
+                    self._outputs[ninja_path(os.path.join(outdir, rmeta))] = tid
+                used = itertools.chain(t.get_dependencies(), t.get_generated_sources())
+            elif isinstance(t, build.CustomTarget):
+                used = t.get_target_dependencies()
+            else:
+                used = t.get_dependencies()
+            for d in used:
+                if isinstance(d, build.CustomTargetIndex):
+                    d = d.target
+                if isinstance(d, build.Target) and d.get_id() != tid:
+                    self._users.setdefault(d.get_id(), set()).add(tid)
+
+    @staticmethod
+    def _explicit_inputs(t: build.Target) -> T.Iterator[File]:
+        '''The files a target lists as its sources or as files it depends on.'''
+        sources: T.Iterable[T.Any]
+        if isinstance(t, build.BuildTarget):
+            sources = itertools.chain(t.get_sources(), t.get_generated_sources(), t.link_depends, t.depend_files)
+        elif isinstance(t, build.CustomTarget):
+            sources = itertools.chain(t.get_sources(), t.depend_files)
+        else:
+            return
+        for s in sources:
+            if isinstance(s, File):
+                yield s
+            elif isinstance(s, str):
+                # Relative to the source directory of the target, like in
+                # Backend.get_target_depend_files()
+                yield File(False, t.subdir, s)
+            elif isinstance(s, build.GeneratedList):
+                yield from s.depend_files
+                for i in s.get_inputs():
+                    if isinstance(i.inner, File):
+                        yield i.inner
+
+    def _node(self, path: str) -> str:
+        '''The form of path that ninja uses for it.'''
+        path = os.path.abspath(path)
+        try:
+            rel = os.path.relpath(path, self.build_dir)
+        except ValueError:
+            # On another drive on Windows
+            return ninja_path(path)
+        return ninja_path(path if os.path.isabs(rel) else rel)
+
+    def target_of(self, output: str) -> T.Optional[str]:
+        '''The id of the target that builds output, if any.'''
+        output = ninja_path(output)
+        if output in self._outputs:
+            return self._outputs[output]
+        parent = posixpath.dirname(output)
+        while parent and parent != output:
+            if parent in self._private_dirs:
+                return self._private_dirs[parent]
+            output, parent = parent, posixpath.dirname(parent)
+        return None
+
+    def get_targets_reading(self, path: str) -> T.Set[str]:
+        '''Ids of the targets reading path.
+
+        These are the targets naming it as an input in the build definition,
+        and the ones whose build steps ninja recorded as reading it.
+        '''
+        node = self._node(path)
+        candidates = {node, posixpath.join(self._build_dir_node, node)}
+        result = set(self._inputs.get(node, ()))
+        for n in candidates:
+            for o in self.deps.get_dependents(n):
+                tid = self.target_of(o)
+                if tid is not None:
+                    result.add(tid)
+        # The file may be an output of the build itself
+        tid = self._outputs.get(node)
+        if tid is not None:
+            result.add(tid)
+        return result
+
+    def get_affected_targets(self, paths: T.Iterable[str]) -> T.Set[str]:
+        '''Ids of the targets that have to be rebuilt when paths change.
+
+        This follows the build graph from the targets reading the files to the
+        targets linking to them or using them as sources, so it includes
+        executables whose own sources do not read the files.
+        '''
+        todo: T.List[str] = []
+        for p in paths:
+            todo.extend(self.get_targets_reading(p))
+        result: T.Set[str] = set()
+        while todo:
+            tid = todo.pop()
+            if tid in result:
+                continue
+            result.add(tid)
+            todo.extend(self._users.get(tid, ()))
+        return result
+
+    def get_files_read_by(self, tid: str) -> T.List[str]:
+        '''The files that ninja recorded as read while building a target.'''
+        if self._target_outputs is None:
+            self._target_outputs = {}
+            for o in self.deps.outputs():
+                t = self.target_of(o)
+                if t is not None:
+                    self._target_outputs.setdefault(t, []).append(o)
+        result: OrderedSet[str] = OrderedSet()
+        for o in self._target_outputs.get(tid, ()):
+            result.update(self.deps.get_deps(o))
+        return list(result)
@@ -97,6 +97,7 @@ _BUILTIN_NAMES = {
     'stdsplit',
     'strip',
     'unity',
+    'unity_batching',
     'unity_size',
     'warning_level',
     'werror',
@@ -726,6 +727,7 @@ BUILTIN_CORE_OPTIONS: T.Mapping[OptionKey, AnyOptionType] = {
         UserBooleanOption('stdsplit', 'Split stdout and stderr in test logs', True),
         UserBooleanOption('strip', 'Strip targets on install', False),
         UserComboOption('unity', 'Unity build', 'off', choices=['on', 'off', 'subprojects']),
+        UserComboOption('unity_batching', 'How sources are grouped into unity files', 'fixed', choices=['fixed', 'adaptive']),
         UserIntegerOption('unity_size', 'Unity block size', 4, min_value=2),
         UserComboOption('warning_level', 'Compiler warning level to use', '1', choices=['0', '1', '2', '3', 'everything'],
                         yielding=False),
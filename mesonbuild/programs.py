@@ -104,8 +104,24 @@ class ExternalProgram(mesonlib.HoldableObject):
         '''Human friendly description of the command'''
         return ' '.join(self.command)
 
+    def get_stamped_files(self) -> T.List[str]:
+        '''Files whose modification invalidates cached results of running this program'''
+        return [c for c in self.get_command() if c and os.path.isabs(c) and os.path.isfile(c)]
+
     def get_version(self, interpreter: T.Optional['Interpreter'] = None) -> str:
         if not self.cached_version:
+            # The version of a program only changes when the program does, so
+            # it is cached across reconfigurations when we have a coredata.
+            key = ('program_version', tuple(self.get_command()), self.version_arg)
+            cache = interpreter.environment.coredata.file_stamp_cache if interpreter else None
+            if cache is not None:
+                cached: T.Optional[str] = cache.get(key)
+                if cached is not None:
+                    # run_command_impl() would have added this as well
+                    interpreter.add_build_def_file(self.get_path())
+                    self.cached_version = cached
+                    return cached
+
             raw_cmd = self.get_command() + [self.version_arg]
             if interpreter:
                 res = interpreter.run_command_impl((self, [self.version_arg]),
@@ -129,6 +145,9 @@ class ExternalProgram(mesonlib.HoldableObject):
             if not match:
                 raise mesonlib.MesonException(f'Could not find a version number in output of {raw_cmd!r}')
             self.cached_version = match.group(1)
+            stamped = self.get_stamped_files()
+            if cache is not None and stamped:
+                cache.put(key, stamped, self.cached_version)
         return self.cached_version
 
     @classmethod
@@ -238,11 +257,34 @@ class ExternalProgram(mesonlib.HoldableObject):
             return not os.path.isdir(path)
         return False
 
+    @staticmethod
+    def _which(name: str, path: str) -> T.Optional[str]:
+        '''
+        The same as shutil.which() on non-Windows platforms, except that PATH
+        entries are ruled out with their cached directory listings instead of
+        probing each of them for every program that is looked up.
+        '''
+        if mesonlib.is_windows() or os.path.dirname(name):
+            return shutil.which(name, path=path)
+        if not path:
+            return None
+        seen: T.Set[str] = set()
+        for d in path.split(os.pathsep):
+            if d in seen:
+                continue
+            seen.add(d)
+            trial = os.path.join(d, name)
+            if not mesonlib.is_listed_in_dir(trial):
+                continue
+            if os.access(trial, os.F_OK | os.X_OK) and not os.path.isdir(trial):
+                return trial
+        return None
+
     def _search_dir(self, name: str, search_dir: T.Optional[str]) -> T.Optional[list]:
         if search_dir is None:
             return None
         trial = os.path.join(search_dir, name)
-        if os.path.exists(trial):
+        if (os.path.dirname(name) or mesonlib.is_listed_in_dir(trial)) and os.path.exists(trial):
             if self._is_executable(trial):
                 return [trial]
             # Now getting desperate. Maybe it is a script file that is
@@ -321,7 +363,7 @@ class ExternalProgram(mesonlib.HoldableObject):
         if exclude_paths:
             paths = OrderedSet(path.split(os.pathsep)).difference(exclude_paths)
             path = os.pathsep.join(paths)
-        command = shutil.which(name, path=path)
+        command = self._which(name, path)
         if mesonlib.is_windows():
             return self._search_windows_special_cases(name, command, exclude_paths)
         # On UNIX-like platforms, shutil.which() is enough to find
@@ -6,7 +6,9 @@ from __future__ import annotations
 
 import sys
 import os
+import mmap
 import stat
+import itertools
 import struct
 import shutil
 import subprocess
@@ -15,6 +17,23 @@ import typing as T
 from ..mesonlib import OrderedSet, generate_list, Popen_safe
 
 SHT_STRTAB = 3
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+SHT_GNU_VERDEF = 0x6ffffffd
+SHT_GNU_VERSYM = 0x6fffffff
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+SHN_UNDEF = 0
+SHN_ABS = 0xfff1
+SHN_COMMON = 0xfff2
+STB_GLOBAL = 1
+STB_WEAK = 2
+STB_GNU_UNIQUE = 10
+STT_OBJECT = 1
+STT_GNU_IFUNC = 10
+VER_FLG_BASE = 0x1
+VERSYM_HIDDEN = 0x8000
 DT_NEEDED = 1
 DT_RPATH = 15
 DT_RUNPATH = 29
@@ -71,6 +90,19 @@ class DynamicEntry(DataSizes):
             ofile.write(struct.pack(self.Sword, self.d_tag))
             ofile.write(struct.pack(self.Word, self.val))
 
+class DynamicSymbol(T.NamedTuple):
+    name: str
+    value: int
+    size: int
+    bind: int
+    type: int
+    shndx: int
+    # The version the symbol is defined with, None for unversioned symbols
+    # and those of the base version
+    version: T.Optional[str]
+    # Whether the version is not the default one, as in foo@VERS
+    hidden: bool
+
 class SectionHeader(DataSizes):
     def __init__(self, ifile: T.BinaryIO, ptrsize: int, is_le: bool) -> None:
         super().__init__(ptrsize, is_le)
@@ -109,25 +141,34 @@ class SectionHeader(DataSizes):
         else:
             self.sh_entsize = struct.unpack(self.Word, ifile.read(self.WordSize))[0]
 
+class ElfError(Exception):
+    '''The file cannot be read as an ELF file.'''
+
+class NotElfError(ElfError):
+    '''The file is not an ELF file at all.'''
+
 class Elf(DataSizes):
-    def __init__(self, bfile: str, verbose: bool = True) -> None:
+    def __init__(self, bfile: str, verbose: bool = True, readonly: bool = False) -> None:
         self.bfile = bfile
         self.verbose = verbose
         self.sections: T.List[SectionHeader] = []
         self.dynamic: T.List[DynamicEntry] = []
-        self.open_bf(bfile)
+        if readonly:
+            self.map_bf(bfile)
+        else:
+            self.open_bf(bfile)
         try:
             (self.ptrsize, self.is_le) = self.detect_elf_type()
             super().__init__(self.ptrsize, self.is_le)
             self.parse_header()
             self.parse_sections()
             self.parse_dynamic()
-        except (struct.error, RuntimeError):
+        except (struct.error, RuntimeError, ElfError):
             self.close_bf()
             raise
 
     def open_bf(self, bfile: str) -> None:
-        self.bf = None
+        self.bf: T.Optional[T.BinaryIO] = None
         self.bf_perms = None
         try:
             self.bf = open(bfile, 'r+b')
@@ -141,6 +182,13 @@ class Elf(DataSizes):
                 self.bf_perms = None
                 raise e
 
+    def map_bf(self, bfile: str) -> None:
+        # Reading only, so no need to make the file writable, and mapping it
+        # is cheaper than the many small reads of the parsing
+        self.bf_perms = None
+        with open(bfile, 'rb') as f:
+            self.bf = T.cast('T.BinaryIO', mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
     def close_bf(self) -> None:
         if self.bf is not None:
             if self.bf_perms is not None:
@@ -161,23 +209,19 @@ class Elf(DataSizes):
     def detect_elf_type(self) -> T.Tuple[int, bool]:
         data = self.bf.read(6)
         if data[1:4] != b'ELF':
-            # This script gets called to non-elf targets too
-            # so just ignore them.
-            if self.verbose:
-                print(f'File {self.bfile!r} is not an ELF file.')
-            sys.exit(0)
+            raise NotElfError(f'File {self.bfile!r} is not an ELF file.')
         if data[4] == 1:
             ptrsize = 32
         elif data[4] == 2:
             ptrsize = 64
         else:
-            sys.exit(f'File {self.bfile!r} has unknown ELF class.')
+            raise ElfError(f'File {self.bfile!r} has unknown ELF class.')
         if data[5] == 1:
             is_le = True
         elif data[5] == 2:
             is_le = False
         else:
-            sys.exit(f'File {self.bfile!r} has unknown ELF endianness.')
+            raise ElfError(f'File {self.bfile!r} has unknown ELF endianness.')
         return ptrsize, is_le
 
     def parse_header(self) -> None:
@@ -239,6 +283,87 @@ class Elf(DataSizes):
             self.bf.seek(section_names.sh_offset + i.sh_name)
             yield self.read_str().decode()
 
+    def read_section(self, sec: SectionHeader) -> bytes:
+        self.bf.seek(sec.sh_offset)
+        data = self.bf.read(sec.sh_size)
+        if len(data) != sec.sh_size:
+            raise RuntimeError('Tried to read past the end of the file')
+        return data
+
+    @staticmethod
+    def iter_unpack(fmt: str, data: bytes) -> T.Iterator[T.Tuple[T.Any, ...]]:
+        # Ignoring a partial entry at the end
+        size = struct.calcsize(fmt)
+        return struct.iter_unpack(fmt, data[:len(data) - len(data) % size])
+
+    def get_version_names(self) -> T.Dict[int, T.Optional[str]]:
+        '''Version indexes to the names of the versions defined by the file.
+
+        The base version is the file itself rather than a version of its
+        symbols, so it has no name.
+        '''
+        result: T.Dict[int, T.Optional[str]] = {}
+        for sec in self.sections:
+            if sec.sh_type == SHT_GNU_VERDEF:
+                break
+        else:
+            return result
+        data = self.read_section(sec)
+        strtab = self.read_section(self.sections[sec.sh_link])
+        offset = 0
+        for _ in range(sec.sh_info):
+            # Elf_Verdef and Elf_Verdaux, the same for both classes
+            flags, ndx, _cnt, _hash, aux, nxt = struct.unpack_from(self.Word[0] + 'HHHIII', data, offset + 2)
+            name_off = struct.unpack_from(self.Word, data, offset + aux)[0]
+            if flags & VER_FLG_BASE:
+                result[ndx] = None
+            else:
+                result[ndx] = strtab[name_off:strtab.index(b'\0', name_off)].decode(errors='replace')
+            if nxt == 0:
+                break
+            offset += nxt
+        return result
+
+    def get_dynamic_symbols(self) -> T.List[DynamicSymbol]:
+        '''The symbols of .dynsym, which are the ones visible to the dynamic
+        linker, in the order of the file.'''
+        symtab = None
+        versym = None
+        for sec in self.sections:
+            if sec.sh_type == SHT_DYNSYM:
+                symtab = sec
+            elif sec.sh_type == SHT_GNU_VERSYM:
+                versym = sec
+        if symtab is None:
+            return []
+        data = self.read_section(symtab)
+        strtab = self.read_section(self.sections[symtab.sh_link])
+        e = self.Word[0]
+        entries: T.Iterable[T.Tuple[int, int, int, int, int]]
+        if self.ptrsize == 64:
+            fmt = e + 'IBBHQQ'
+            entries = ((n, v, s, i, x) for n, i, _, x, v, s in self.iter_unpack(fmt, data))
+        else:
+            fmt = e + 'IIIBBH'
+            entries = ((n, v, s, i, x) for n, v, s, i, _, x in self.iter_unpack(fmt, data))
+        # Indexes 0 and 1 are for local and global unversioned symbols,
+        # higher ones either versions defined by the file or needed from its
+        # dependencies
+        versions: T.Iterable[int] = itertools.repeat(0)
+        version_names: T.Dict[int, T.Optional[str]] = {}
+        if versym is not None:
+            versions = itertools.chain((v for v, in self.iter_unpack(e + 'H', self.read_section(versym))),
+                                       versions)
+            version_names = self.get_version_names()
+
+        result: T.List[DynamicSymbol] = []
+        for (name_off, value, size, info, shndx), version in zip(entries, versions):
+            name = strtab[name_off:strtab.index(b'\0', name_off)].decode(errors='replace')
+            result.append(DynamicSymbol(name, value, size, info >> 4, info & 0xf, shndx,
+                                        version_names.get(version & ~VERSYM_HIDDEN),
+                                        bool(version & VERSYM_HIDDEN)))
+        return result
+
     def get_soname(self) -> T.Optional[str]:
         soname = None
         strtab = None
@@ -254,6 +379,8 @@ class Elf(DataSizes):
 
     def get_entry_offset(self, entrynum: int) -> T.Optional[int]:
         sec = self.find_section(b'.dynstr')
+        if sec is None:
+            return None
         for i in self.dynamic:
             if i.d_tag == entrynum:
                 res = sec.sh_offset + i.val
@@ -375,7 +502,17 @@ class Elf(DataSizes):
 
 def fix_elf(fname: str, rpath_dirs_to_remove: T.Set[bytes], new_rpath: T.Optional[bytes], verbose: bool = True) -> None:
     if new_rpath is not None:
-        with Elf(fname, verbose) as e:
+        try:
+            elf = Elf(fname, verbose)
+        except NotElfError as ex:
+            # This script gets called to non-elf targets too
+            # so just ignore them.
+            if verbose:
+                print(ex)
+            sys.exit(0)
+        except ElfError as ex:
+            sys.exit(str(ex))
+        with elf as e:
             # note: e.get_rpath() and e.get_runpath() may be useful
             e.fix_rpath(fname, rpath_dirs_to_remove, new_rpath)
 
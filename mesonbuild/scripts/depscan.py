@@ -4,14 +4,18 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 import collections
+import hashlib
 import json
 import os
-import pathlib
 import pickle
 import re
+import sys
 import typing as T
 
+from ..mesonlib import determine_worker_count
+
 if T.TYPE_CHECKING:
     from typing_extensions import Literal, TypedDict, NotRequired
     from ..backend.ninjabackend import TargetDependencyScannerInfo
@@ -54,6 +58,10 @@ if T.TYPE_CHECKING:
         revision: int
         rules: T.List[Rule]
 
+    # The modules a source file imports, and the modules it exports along with
+    # whether another source exporting the same module is an error.
+    ScanResult = T.Tuple[T.List[str], T.List[T.Tuple[str, bool]]]
+
 
 CPP_IMPORT_RE = re.compile(r'\w*import ([a-zA-Z0-9]+);')
 CPP_EXPORT_RE = re.compile(r'\w*export module ([a-zA-Z0-9]+);')
@@ -67,6 +75,70 @@ FORTRAN_MODULE_RE = re.compile(FORTRAN_MODULE_PAT, re.IGNORECASE)
 FORTRAN_SUBMOD_RE = re.compile(FORTRAN_SUBMOD_PAT, re.IGNORECASE)
 FORTRAN_USE_RE = re.compile(FORTRAN_USE_PAT, re.IGNORECASE)
 
+# Below this many sources that need to be scanned, starting worker processes
+# costs more than it saves.
+PARALLEL_SCAN_THRESHOLD = 200
+
+def scan_fortran_source(text: str) -> ScanResult:
+    imports: T.List[str] = []
+    exports: T.List[T.Tuple[str, bool]] = []
+    modules_in_this_file = set()
+    for line in text.split('\n'):
+        import_match = FORTRAN_USE_RE.match(line)
+        export_match = FORTRAN_MODULE_RE.match(line)
+        submodule_export_match = FORTRAN_SUBMOD_RE.match(line)
+        if import_match:
+            needed = import_match.group(1).lower()
+            # In Fortran you have an using declaration also for the module
+            # you define in the same file. Prevent circular dependencies.
+            if needed not in modules_in_this_file:
+                imports.append(needed)
+        if export_match:
+            exported_module = export_match.group(1).lower()
+            assert exported_module not in modules_in_this_file
+            modules_in_this_file.add(exported_module)
+            exports.append((exported_module, True))
+        if submodule_export_match:
+            # Store submodule "Foo" "Bar" as "foo:bar".
+            # A submodule declaration can be both an import and an export declaration:
+            #
+            # submodule (a1:a2) a3
+            #  - requires a1@a2.smod
+            #  - produces a1@a3.smod
+            parent_module_name_full = submodule_export_match.group(1).lower()
+            parent_module_name = parent_module_name_full.split(':')[0]
+            submodule_name = submodule_export_match.group(2).lower()
+            concat_name = f'{parent_module_name}:{submodule_name}'
+            exports.append((concat_name, False))
+            # Fortran requires that the immediate parent module must be built
+            # before the current one. Thus:
+            #
+            # submodule (parent) parent   <- requires parent.mod (really parent.smod, but they are created at the same time)
+            # submodule (a1:a2) a3        <- requires a1@a2.smod
+            #
+            # a3 does not depend on the a1 parent module directly, only transitively.
+            imports.append(parent_module_name_full)
+    return imports, exports
+
+def scan_cpp_source(text: str) -> ScanResult:
+    imports: T.List[str] = []
+    exports: T.List[T.Tuple[str, bool]] = []
+    for line in text.split('\n'):
+        import_match = CPP_IMPORT_RE.match(line)
+        export_match = CPP_EXPORT_RE.match(line)
+        if import_match:
+            imports.append(import_match.group(1))
+        if export_match:
+            exports.append((export_match.group(1), True))
+    return imports, exports
+
+def scan_source(contents: bytes, lang: Literal['cpp', 'fortran']) -> ScanResult:
+    # Decode like a text mode read would, with universal newlines
+    text = contents.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+    if lang == 'fortran':
+        return scan_fortran_source(text)
+    return scan_cpp_source(text)
+
 class DependencyScanner:
     def __init__(self, pickle_file: str, outfile: str):
         with open(pickle_file, 'rb') as pf:
@@ -78,72 +150,64 @@ class DependencyScanner:
         self.imports: collections.defaultdict[str, T.List[str]] = collections.defaultdict(list)
         self.sources_with_exports: T.List[str] = []
 
-    def scan_file(self, fname: str, lang: Literal['cpp', 'fortran']) -> None:
-        if lang == 'fortran':
-            self.scan_fortran_file(fname)
+    def add_scan_result(self, fname: str, result: ScanResult) -> None:
+        imports, exports = result
+        if imports:
+            self.imports[fname].extend(imports)
+        for exported_module, unique in exports:
+            if unique and exported_module in self.provided_by:
+                raise RuntimeError(f'Multiple files provide module {exported_module}.')
+            self.sources_with_exports.append(fname)
+            self.provided_by[exported_module] = fname
+            self.exports[fname] = exported_module
+
+    def scan_files(self) -> None:
+        """Scan the sources, reusing the results for unchanged files.
+
+        The results are cached per source, keyed by a hash of its contents,
+        so that editing one source of a large target does not require reading
+        all of the others with regular expressions again.
+        """
+        cache_file = self.outfile + '.cache'
+        try:
+            with open(cache_file, 'rb') as f:
+                cache: T.Dict[str, T.Tuple[str, str, ScanResult]] = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            cache = {}
+
+        contents: T.Dict[str, bytes] = {}
+        digests: T.Dict[str, str] = {}
+        results: T.Dict[str, ScanResult] = {}
+        for fname, lang in self.sources:
+            with open(fname, 'rb') as f:
+                data = f.read()
+            digests[fname] = hashlib.sha256(data).hexdigest()
+            cached = cache.get(fname)
+            if cached is not None and cached[0] == lang and cached[1] == digests[fname]:
+                results[fname] = cached[2]
+            else:
+                contents[fname] = data
+
+        cold = [(fname, lang) for fname, lang in self.sources if fname not in results]
+        num_workers = determine_worker_count()
+        # Worker processes cannot be started from a frozen executable
+        if len(cold) >= PARALLEL_SCAN_THRESHOLD and num_workers > 1 and not getattr(sys, 'frozen', False):
+            with ProcessPoolExecutor(num_workers) as executor:
+                scanned = executor.map(scan_source, [contents[f] for f, _ in cold], [l for _, l in cold],
+                                       chunksize=32)
+                results.update(zip([f for f, _ in cold], scanned))
         else:
-            self.scan_cpp_file(fname)
-
-    def scan_fortran_file(self, fname: str) -> None:
-        fpath = pathlib.Path(fname)
-        modules_in_this_file = set()
-        for line in fpath.read_text(encoding='utf-8', errors='ignore').split('\n'):
-            import_match = FORTRAN_USE_RE.match(line)
-            export_match = FORTRAN_MODULE_RE.match(line)
-            submodule_export_match = FORTRAN_SUBMOD_RE.match(line)
-            if import_match:
-                needed = import_match.group(1).lower()
-                # In Fortran you have an using declaration also for the module
-                # you define in the same file. Prevent circular dependencies.
-                if needed not in modules_in_this_file:
-                    self.imports[fname].append(needed)
-            if export_match:
-                exported_module = export_match.group(1).lower()
-                assert exported_module not in modules_in_this_file
-                modules_in_this_file.add(exported_module)
-                if exported_module in self.provided_by:
-                    raise RuntimeError(f'Multiple files provide module {exported_module}.')
-                self.sources_with_exports.append(fname)
-                self.provided_by[exported_module] = fname
-                self.exports[fname] = exported_module
-            if submodule_export_match:
-                # Store submodule "Foo" "Bar" as "foo:bar".
-                # A submodule declaration can be both an import and an export declaration:
-                #
-                # submodule (a1:a2) a3
-                #  - requires a1@a2.smod
-                #  - produces a1@a3.smod
-                parent_module_name_full = submodule_export_match.group(1).lower()
-                parent_module_name = parent_module_name_full.split(':')[0]
-                submodule_name = submodule_export_match.group(2).lower()
-                concat_name = f'{parent_module_name}:{submodule_name}'
-                self.sources_with_exports.append(fname)
-                self.provided_by[concat_name] = fname
-                self.exports[fname] = concat_name
-                # Fortran requires that the immediate parent module must be built
-                # before the current one. Thus:
-                #
-                # submodule (parent) parent   <- requires parent.mod (really parent.smod, but they are created at the same time)
-                # submodule (a1:a2) a3        <- requires a1@a2.smod
-                #
-                # a3 does not depend on the a1 parent module directly, only transitively.
-                self.imports[fname].append(parent_module_name_full)
-
-    def scan_cpp_file(self, fname: str) -> None:
-        fpath = pathlib.Path(fname)
-        for line in fpath.read_text(encoding='utf-8', errors='ignore').split('\n'):
-            import_match = CPP_IMPORT_RE.match(line)
-            export_match = CPP_EXPORT_RE.match(line)
-            if import_match:
-                needed = import_match.group(1)
-                self.imports[fname].append(needed)
-            if export_match:
-                exported_module = export_match.group(1)
-                if exported_module in self.provided_by:
-                    raise RuntimeError(f'Multiple files provide module {exported_module}.')
-                self.sources_with_exports.append(fname)
-                self.provided_by[exported_module] = fname
-                self.exports[fname] = exported_module
+            for fname, lang in cold:
+                results[fname] = scan_source(contents[fname], lang)
+
+        for fname, _ in self.sources:
+            self.add_scan_result(fname, results[fname])
+
+        if cold:
+            new_cache = {fname: (lang, digests[fname], results[fname]) for fname, lang in self.sources}
+            with open(cache_file + '~', 'wb') as cf:
+                pickle.dump(new_cache, cf)
+            os.replace(cache_file + '~', cache_file)
 
     def module_name_for(self, src: str, lang: Literal['cpp', 'fortran']) -> str:
         if lang == 'fortran':
@@ -159,8 +223,7 @@ class DependencyScanner:
         return '{}.ifc'.format(self.exports[src])
 
     def scan(self) -> int:
-        for s, lang in self.sources:
-            self.scan_file(s, lang)
+        self.scan_files()
         description: Description = {
             'version': 1,
             'revision': 0,
@@ -0,0 +1,176 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+"""Run a wrapped custom target or generator command without Meson.
+
+Commands that need their environment changed, a working directory or their
+output captured cannot always be written as a plain command line. The
+backend writes what they need to a data file and runs this script on it,
+see Backend.as_meson_exe_cmdline(). Importing all of Meson would take much
+longer than many of these commands, so this can be run as a script without
+the rest of Meson, and on POSIX it imports nothing that is not built into
+the interpreter. Anything needing Meson when it runs, like the paths for
+Wine, goes through meson_exe.py instead.
+"""
+
+from __future__ import annotations
+
+import marshal
+import os
+import sys
+
+# typing alone would double the time this takes to start
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import typing as T
+
+
+def apply_env(env: T.Dict[str, str], operations: T.List[T.Tuple[str, str, T.List[str], str]],
+              unset: T.List[str]) -> None:
+    '''Apply the operations of an EnvironmentVariables to env.'''
+    for method, name, values, separator in operations:
+        curr = env.get(name)
+        if method == 'append' and curr is not None:
+            values = [curr] + values
+        elif method == 'prepend' and curr is not None:
+            values = values + [curr]
+        env[name] = separator.join(values)
+    for name in unset:
+        env.pop(name, None)
+
+def write_if_changed(data: bytes, filename: str) -> None:
+    try:
+        with open(filename, 'rb') as cur:
+            if cur.read() == data:
+                return
+    except OSError:
+        pass
+    with open(filename, 'wb') as output:
+        output.write(data)
+
+def run_command(cmd_args: T.List[str], env: T.Dict[str, str], workdir: T.Optional[str] = None,
+                capture: T.Optional[str] = None, feed: T.Optional[str] = None,
+                verbose: bool = False, serialised: bool = False) -> int:
+    '''Run the command, printing its output only if it fails.'''
+    import subprocess
+
+    stdin = None
+    if feed:
+        stdin = open(feed, 'rb')
+
+    pipe = subprocess.PIPE
+    if verbose:
+        assert not capture, 'Cannot capture and print to console at the same time'
+        pipe = None
+
+    p = subprocess.Popen(cmd_args, env=env, cwd=workdir,
+                         close_fds=False, stdin=stdin, stdout=pipe, stderr=pipe)
+    stdout, stderr = p.communicate()
+
+    if stdin is not None:
+        stdin.close()
+
+    if p.returncode == 0xc0000135:
+        # STATUS_DLL_NOT_FOUND on Windows indicating a common problem that is otherwise hard to diagnose
+        strerror = 'Failed to run due to missing DLLs, with path: ' + env['PATH']
+        raise FileNotFoundError(p.returncode, strerror, cmd_args)
+
+    if p.returncode != 0:
+        if serialised:
+            print(f'while executing {cmd_args!r}')
+        if verbose:
+            return p.returncode
+        import locale
+        encoding = locale.getpreferredencoding()
+        if not capture:
+            print('--- stdout ---')
+            print(stdout.decode(encoding=encoding, errors='replace'))
+        print('--- stderr ---')
+        print(stderr.decode(encoding=encoding, errors='replace'))
+        return p.returncode
+
+    if capture:
+        write_if_changed(stdout, capture)
+
+    return 0
+
+def spawn_command(cmd_args: T.List[str], env: T.Dict[str, str], logfile: str,
+                  workdir: T.Optional[str] = None, capture: T.Optional[str] = None,
+                  feed: T.Optional[str] = None, verbose: bool = False) -> int:
+    '''Run the command like run_command(), without importing subprocess,
+    which takes longer than many commands. POSIX only.
+
+    Unless verbose, the output goes to files named after logfile while the
+    command runs, and is printed if it fails.
+    '''
+    # Where the output of this script goes, whatever the command's goes to
+    saved = [(fd, os.dup(fd)) for fd in (1, 2)]
+    if feed:
+        fd = os.open(feed, os.O_RDONLY)
+        os.dup2(fd, 0)
+        os.close(fd)
+    if capture:
+        tmpfile = capture + '.tmp'
+        fd = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        os.dup2(fd, 1)
+        os.close(fd)
+        capture = os.path.abspath(capture)
+        tmpfile = os.path.abspath(tmpfile)
+    logs: T.List[T.Tuple[str, str]] = []
+    if not verbose:
+        streams = [('stderr', 2)] if capture else [('stdout', 1), ('stderr', 2)]
+        for name, fd in streams:
+            log = os.path.abspath(f'{logfile}.{name}')
+            logs.append((name, log))
+            logfd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            os.dup2(logfd, fd)
+            os.close(logfd)
+    if workdir:
+        os.chdir(workdir)
+    returncode = os.spawnvpe(os.P_WAIT, cmd_args[0], cmd_args, env)
+    for fd, saved_fd in saved:
+        os.dup2(saved_fd, fd)
+        os.close(saved_fd)
+    output: T.List[T.Tuple[str, bytes]] = []
+    for name, log in logs:
+        with open(log, 'rb') as f:
+            output.append((name, f.read()))
+        os.unlink(log)
+    if returncode != 0:
+        print(f'while executing {cmd_args!r}')
+        for name, data in output:
+            print(f'--- {name} ---')
+            sys.stdout.flush()
+            sys.stdout.buffer.write(data + b'\n')
+        sys.stdout.flush()
+        if capture:
+            os.unlink(tmpfile)
+        return returncode
+    if capture:
+        try:
+            with open(tmpfile, 'rb') as new, open(capture, 'rb') as cur:
+                changed = new.read() != cur.read()
+        except FileNotFoundError:
+            changed = True
+        if changed:
+            os.replace(tmpfile, capture)
+        else:
+            os.unlink(tmpfile)
+    return 0
+
+def run(args: T.List[str]) -> int:
+    # <data file written by the backend>
+    with open(args[0], 'rb') as f:
+        data = marshal.load(f)
+    env = os.environ.copy()
+    apply_env(env, data['env'], data['unset'])
+    if data['extra_paths']:
+        env['PATH'] = os.pathsep.join(data['extra_paths'] + [env['PATH']])
+    if os.name == 'posix':
+        return spawn_command(data['cmd_args'], env, args[0], data['workdir'], data['capture'], data['feed'],
+                             data['verbose'])
+    return run_command(data['cmd_args'], env, data['workdir'], data['capture'], data['feed'],
+                       data['verbose'], serialised=True)
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
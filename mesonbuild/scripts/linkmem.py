@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+"""Record how much memory link commands use, to size the link pools of
+backend_link_pools=auto.
+
+This runs for every link, so it only uses modules that are quick to import
+and can be run as a script without the rest of Meson.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import typing as T
+
+# Where the peak memory of each link is recorded, relative to the build dir
+LINK_MEMORY_FILE = os.path.join('meson-private', 'link_memory.txt')
+
+
+def peak_child_memory() -> int:
+    '''The peak resident memory of any waited-for child process, in bytes.'''
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Kilobytes everywhere except on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def read_peak_memory(filename: str) -> T.Dict[str, int]:
+    '''Outputs to the peak memory in bytes of the last command that built them.'''
+    result: T.Dict[str, int] = {}
+    try:
+        with open(filename, encoding='utf-8', errors='surrogateescape') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) == 2 and fields[1].isdigit():
+                    result[fields[0]] = int(fields[1])
+    except FileNotFoundError:
+        pass
+    return result
+
+def write_peak_memory(filename: str, peaks: T.Dict[str, int]) -> None:
+    '''Rewrite the file with only the latest entry for each output.'''
+    with open(filename, 'w', encoding='utf-8', errors='surrogateescape') as f:
+        for output, peak in peaks.items():
+            f.write(f'{output}\t{peak}\n')
+
+def total_memory() -> T.Optional[int]:
+    '''The physical memory of this machine in bytes, if it can be found.'''
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong),
+                        ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong),
+                        ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong),
+                        ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):  # type: ignore[attr-defined]
+            return None
+        return int(status.ullTotalPhys)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def run(args: T.List[str]) -> int:
+    # <memory file> <output> <command...>
+    filename, output, *cmd = args
+    returncode = os.spawnvp(os.P_WAIT, cmd[0], cmd)
+    if returncode == 0:
+        try:
+            # A single short write in append mode, so that links running in
+            # parallel do not mix up their lines
+            with open(filename, 'a', encoding='utf-8', errors='surrogateescape') as f:
+                f.write(f'{output}\t{peak_child_memory()}\n')
+        except OSError:
+            pass
+    return returncode
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
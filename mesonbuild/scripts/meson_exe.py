@@ -7,10 +7,9 @@ import os
 import sys
 import argparse
 import pickle
-import subprocess
 import typing as T
-import locale
 
+from .exelauncher import run_command
 from ..utils.core import ExecutableSerialisation
 
 def buildparser() -> argparse.ArgumentParser:
@@ -44,52 +43,8 @@ def run_exe(exe: ExecutableSerialisation, extra_env: T.Optional[T.Dict[str, str]
                 exe.workdir
             )
 
-    stdin = None
-    if exe.feed:
-        stdin = open(exe.feed, 'rb')
-
-    pipe = subprocess.PIPE
-    if exe.verbose:
-        assert not exe.capture, 'Cannot capture and print to console at the same time'
-        pipe = None
-
-    p = subprocess.Popen(cmd_args, env=child_env, cwd=exe.workdir,
-                         close_fds=False, stdin=stdin, stdout=pipe, stderr=pipe)
-    stdout, stderr = p.communicate()
-
-    if stdin is not None:
-        stdin.close()
-
-    if p.returncode == 0xc0000135:
-        # STATUS_DLL_NOT_FOUND on Windows indicating a common problem that is otherwise hard to diagnose
-        strerror = 'Failed to run due to missing DLLs, with path: ' + child_env['PATH']
-        raise FileNotFoundError(p.returncode, strerror, cmd_args)
-
-    if p.returncode != 0:
-        if exe.pickled:
-            print(f'while executing {cmd_args!r}')
-        if exe.verbose:
-            return p.returncode
-        encoding = locale.getpreferredencoding()
-        if not exe.capture:
-            print('--- stdout ---')
-            print(stdout.decode(encoding=encoding, errors='replace'))
-        print('--- stderr ---')
-        print(stderr.decode(encoding=encoding, errors='replace'))
-        return p.returncode
-
-    if exe.capture:
-        skip_write = False
-        try:
-            with open(exe.capture, 'rb') as cur:
-                skip_write = cur.read() == stdout
-        except OSError:
-            pass
-        if not skip_write:
-            with open(exe.capture, 'wb') as output:
-                output.write(stdout)
-
-    return 0
+    return run_command(cmd_args, child_env, exe.workdir, exe.capture, exe.feed,
+                       exe.verbose, serialised=exe.pickled)
 
 def run(args: T.List[str]) -> int:
     parser = buildparser()
@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+"""Run rustc until it has written the metadata of a library.
+
+rustc writes the metadata of a crate before generating its code. With
+rust_pipelining, libraries depending on it are compiled against the
+metadata, so they can start without waiting for the code generation of
+their dependencies. The metadata has to come from a full compilation, a
+metadata only one leaves out the MIR needed to generate code for generic and
+inlined functions, so rustc is stopped once the metadata is there.
+
+The command must be the one of the full compilation apart from where the
+outputs go, anything else can change the crate hash. That rules out asking
+rustc for JSON notifications, instead this waits for the metadata file to
+appear, which rustc moves into place once it is complete. The output paths
+do not go into the crate hash, so the metadata is written to a private
+directory and moved to where it belongs from there.
+
+Warnings are left for the full compilation to print.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import typing as T
+
+
+def run(args: T.List[str]) -> int:
+    # <metadata file> <rustc command...>
+    rmeta, *cmd = args
+    # rustc writes the metadata to a temporary directory next to it before
+    # moving it into place. Have it write into a directory of our own, so
+    # that cleaning up after killing rustc cannot touch what other
+    # compilations have in the same output directory.
+    tmpdir = tempfile.mkdtemp(prefix=os.path.basename(rmeta) + '.', dir=os.path.dirname(rmeta) or '.')
+    tmp_rmeta = os.path.join(tmpdir, os.path.basename(rmeta))
+    cmd = ['metadata=' + tmp_rmeta if a == 'metadata=' + rmeta else a for a in cmd]
+    try:
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(cmd, stderr=stderr)
+            delay = 0.001
+            while proc.poll() is None and not os.path.exists(tmp_rmeta):
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+            if proc.returncode is None:
+                proc.kill()
+                proc.wait()
+            elif proc.returncode != 0:
+                stderr.seek(0)
+                sys.stderr.buffer.write(stderr.read())
+                return proc.returncode
+        os.replace(tmp_rmeta, rmeta)
+        return 0
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
@@ -11,10 +11,11 @@
 from __future__ import annotations
 
 import typing as T
-import os, sys
+import os, struct, sys
 from .. import mesonlib
 from .. import mlog
 from ..mesonlib import Popen_safe
+from . import depfixer
 import argparse
 
 parser = argparse.ArgumentParser()
@@ -113,6 +114,83 @@ def gnu_syms(libfilename: str, outfilename: str) -> None:
         result += [' '.join(entry)]
     write_if_changed('\n'.join(result) + '\n', outfilename)
 
+def elf_section_type(sec: depfixer.SectionHeader, name: str) -> str:
+    '''The letter `nm` shows for global symbols defined in a section.'''
+    small = name.startswith(('.sdata', '.sbss'))
+    if sec.sh_flags & depfixer.SHF_EXECINSTR:
+        return 'T'
+    if sec.sh_type == depfixer.SHT_NOBITS:
+        return 'S' if small else 'B'
+    if sec.sh_flags & depfixer.SHF_ALLOC:
+        if not sec.sh_flags & depfixer.SHF_WRITE:
+            return 'R'
+        return 'G' if small else 'D'
+    return 'N'
+
+def elf_symbol_type(sym: depfixer.DynamicSymbol, section_types: T.List[str]) -> str:
+    '''The letter `nm` shows for the type of a defined global symbol.'''
+    if sym.shndx == depfixer.SHN_COMMON:
+        return 'C'
+    if sym.type == depfixer.STT_GNU_IFUNC:
+        return 'i'
+    if sym.bind == depfixer.STB_WEAK:
+        return 'V' if sym.type == depfixer.STT_OBJECT else 'W'
+    if sym.bind == depfixer.STB_GNU_UNIQUE:
+        return 'u'
+    if sym.shndx == depfixer.SHN_ABS:
+        return 'A'
+    if sym.shndx >= len(section_types):
+        return '?'
+    return section_types[sym.shndx]
+
+def elf_syms(libfilename: str, outfilename: str) -> bool:
+    '''Write the same file as gnu_syms() by reading the ELF file directly.
+
+    This avoids running readelf and nm for every relinked library, and works
+    for cross builds, which do not have the tools of the host. Returns
+    False if the file could not be read as an ELF shared library.
+    '''
+    try:
+        with depfixer.Elf(libfilename, verbose=False, readonly=True) as elf:
+            offset = elf.get_entry_offset(depfixer.DT_SONAME) if elf.dynamic else None
+            soname = None
+            if offset is not None:
+                elf.bf.seek(offset)
+                soname = elf.read_str().decode(errors='replace')
+            symbols = elf.get_dynamic_symbols()
+            section_types = [elf_section_type(sec, name) for sec, name in zip(elf.sections, elf.get_section_names())]
+            ptrsize = elf.ptrsize
+    except (OSError, ValueError, IndexError, RuntimeError, struct.error, depfixer.ElfError):
+        return False
+    if not symbols:
+        return False
+
+    result = []
+    if soname is not None:
+        # As printed by `readelf -d`
+        if ptrsize == 64:
+            result.append(f' 0x{depfixer.DT_SONAME:016x} (SONAME)             Library soname: [{soname}]')
+        else:
+            result.append(f' 0x{depfixer.DT_SONAME:08x} (SONAME)                     Library soname: [{soname}]')
+    # Like `nm --dynamic --extern-only --defined-only`, sorted by name and
+    # then in the order of the file
+    binds = {depfixer.STB_GLOBAL, depfixer.STB_WEAK, depfixer.STB_GNU_UNIQUE}
+    symbols = [s for s in symbols if s.shndx != depfixer.SHN_UNDEF and s.bind in binds]
+    symbols.sort(key=lambda s: s.name)
+    for sym in symbols:
+        name = sym.name
+        # The symbols naming the versions themselves have no version
+        if sym.version is not None and sym.version != name:
+            name += ('@' if sym.hidden else '@@') + sym.version
+        symtype = elf_symbol_type(sym, section_types)
+        # See gnu_syms() for why sizes of data objects are included
+        if symtype in {'B', 'G', 'D'} and sym.size:
+            result.append(f'{name} {symtype} {sym.size:x}')
+        else:
+            result.append(f'{name} {symtype}')
+    write_if_changed('\n'.join(result) + '\n', outfilename)
+    return True
+
 def solaris_syms(libfilename: str, outfilename: str) -> None:
     # gnu_syms() works with GNU nm & readelf, not Solaris nm & elfdump
     origpath = os.environ['PATH']
@@ -265,6 +343,9 @@ def windows_syms(impfilename: str, outfilename: str) -> None:
     write_if_changed('\n'.join(result) + '\n', outfilename)
 
 def gen_symbols(libfilename: str, impfilename: str, outfilename: str, cross_host: str) -> None:
+    if elf_syms(libfilename, outfilename):
+        # ELF files of any platform, native or not
+        return
     if cross_host is not None:
         # In case of cross builds just always relink. In theory we could
         # determine the correct toolset, but we would need to use the correct
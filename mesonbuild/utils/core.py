@@ -140,6 +140,13 @@ class EnvironmentVariables(HoldableObject):
         curr = env.get(name, default_value)
         return separator.join(values if curr is None else values + [curr])
 
+    def get_operations(self) -> T.List[T.Tuple[str, str, T.List[str], str]]:
+        '''The operations as (method, name, values, separator), with 'set',
+        'append' or 'prepend' as the method, for applying them without this
+        class.'''
+        return [(method.__name__.lstrip('_'), name, values, separator)
+                for method, name, values, separator in self.envvars]
+
     def get_env(self, full_env: EnvironOrDict, default_fmt: T.Optional[str] = None) -> T.Dict[str, str]:
         env = full_env.copy()
         for method, name, values, separator in self.envvars:
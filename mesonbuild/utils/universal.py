@@ -123,6 +123,7 @@ __all__ = [
     'is_hurd',
     'is_irix',
     'is_linux',
+    'is_listed_in_dir',
     'is_netbsd',
     'is_openbsd',
     'is_osx',
@@ -134,6 +135,7 @@ __all__ = [
     'iter_regexin_iter',
     'join_args',
     'lazy_property',
+    'listdir_cached',
     'listify',
     'listify_array_value',
     'partition',
@@ -711,6 +713,50 @@ def darwin_get_object_archs(objpath: str) -> 'ImmutableListProtocol[str]':
 
     return meson_archs
 
+# Directory listings, keyed by directory and validated with its mtime.
+_dir_listing_cache: T.Dict[str, T.Tuple[int, T.FrozenSet[str]]] = {}
+
+def listdir_cached(directory: str) -> T.FrozenSet[str]:
+    """Return the names of all entries of a directory.
+
+    Listings are reused for as long as the mtime of the directory does not
+    change, so that repeatedly probing the same (large) directories only
+    costs a single stat. On platforms with usually case insensitive file
+    systems all names are case folded. Missing and unreadable directories
+    are treated as empty.
+    """
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return frozenset()
+    cached = _dir_listing_cache.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return frozenset()
+    if is_windows() or is_osx():
+        entries = frozenset(n.casefold() for n in names)
+    else:
+        entries = frozenset(names)
+    # Entries created right after the listing was taken could end up with the
+    # same directory mtime, so only keep listings that are not that fresh.
+    if time.time_ns() - mtime > 2_000_000_000:
+        _dir_listing_cache[directory] = (mtime, entries)
+    return entries
+
+def is_listed_in_dir(path: str) -> bool:
+    """Check whether path has an entry in the listing of its directory.
+
+    This is a fast negative check: a positive result on a case insensitive
+    file system might still need to be verified with os.path.
+    """
+    directory, name = os.path.split(path)
+    if is_windows() or is_osx():
+        name = name.casefold()
+    return name in listdir_cached(directory or '.')
+
 def windows_detect_native_arch() -> str:
     """
     The architecture of Windows itself: x86, amd64 or arm64
@@ -2217,6 +2263,7 @@ _BUILTIN_NAMES = {
     'stdsplit',
     'strip',
     'unity',
+    'unity_batching',
     'unity_size',
     'warning_level',
     'werror',
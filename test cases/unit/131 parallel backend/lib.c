@@ -0,0 +1,3 @@
+#include "header.h"
+
+int lib(void) { return NUM + HEADER; }
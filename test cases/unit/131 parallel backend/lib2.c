@@ -0,0 +1,3 @@
+#include "header.h"
+
+int lib2(void) { return NUM - HEADER; }
@@ -0,0 +1,3 @@
+int lib2(void);
+
+int main(void) { return lib2() > 100; }
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+
+# Wraps the contents of its input in a C program returning 0
+
+import sys
+
+with open(sys.argv[1], encoding='utf-8') as f:
+    contents = f.read().strip()
+with open(sys.argv[2], 'w', encoding='utf-8') as f:
+    f.write(f'/* {contents} */\nint main(void) {{ return 0; }}\n')
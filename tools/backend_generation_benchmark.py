@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+'''Measures how long generating the Ninja backend of a synthetic project
+takes with one process and with worker processes, and how long
+reconfiguring it takes when what was generated for the targets is reused.
+
+The project has a number of static libraries, each used by an executable,
+in a subdirectory each. All ways must produce the same build.ninja and
+compile_commands.json, which is checked as well.
+'''
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Use the Meson of this source tree
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def write_project(srcdir: str, count: int, sources: int) -> None:
+    with open(os.path.join(srcdir, 'meson.build'), 'w', encoding='utf-8') as f:
+        f.write("project('synthetic', 'c')\n")
+        f.write("common_inc = include_directories('.')\n")
+        f.write(f"foreach i : range({count})\n  subdir('sub@0@'.format(i))\nendforeach\n")
+    with open(os.path.join(srcdir, 'common.h'), 'w', encoding='utf-8') as f:
+        f.write('#define COMMON 1\n')
+    for i in range(count):
+        subdir = os.path.join(srcdir, f'sub{i}')
+        os.mkdir(subdir)
+        with open(os.path.join(subdir, 'meson.build'), 'w', encoding='utf-8') as f:
+            names = ', '.join(f"'lib{j}.c'" for j in range(sources))
+            f.write(f"lib = static_library('lib{i}', {names}, include_directories : common_inc,\n"
+                    f"  c_args : ['-DLIB={i}'])\n")
+            f.write(f"executable('exe{i}', 'main.c', link_with : lib)\n")
+        for j in range(sources):
+            with open(os.path.join(subdir, f'lib{j}.c'), 'w', encoding='utf-8') as f:
+                f.write(f'#include "common.h"\nint lib{i}_{j}(void) {{ return COMMON + {j}; }}\n')
+        with open(os.path.join(subdir, 'main.c'), 'w', encoding='utf-8') as f:
+            f.write(f'int lib{i}_0(void);\nint main(void) {{ return lib{i}_0() - 1; }}\n')
+
+def setup(srcdir: str, builddir: str, jobs: int, reconfigure: bool = False) -> float:
+    args = ['--reconfigure'] if reconfigure else []
+    if not reconfigure and os.path.exists(builddir):
+        shutil.rmtree(builddir)
+    env = os.environ.copy()
+    env['MESON_NUM_PROCESSES'] = str(jobs)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'meson.py'), 'setup'] + args + [srcdir, builddir],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def read_outputs(builddir: str) -> bytes:
+    data = b''
+    for name in ['build.ninja', 'compile_commands.json']:
+        with open(os.path.join(builddir, name), 'rb') as f:
+            data += f.read()
+    return data
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--targets', type=int, default=1000,
+                        help='Number of libraries, and of executables (default: %(default)s)')
+    parser.add_argument('-s', '--sources', type=int, default=5,
+                        help='Number of sources of each library (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: %(default)s)')
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        srcdir = os.path.join(d, 'src')
+        builddir = os.path.join(d, 'build')
+        os.mkdir(srcdir)
+        write_project(srcdir, options.targets, options.sources)
+        serial = setup(srcdir, builddir, 1)
+        expected = read_outputs(builddir)
+        parallel = setup(srcdir, builddir, options.jobs)
+        if read_outputs(builddir) != expected:
+            print('The outputs of the serial and parallel generation differ', file=sys.stderr)
+            return 1
+        # Once with nothing to reuse, as the parallel generation kept its
+        # fragments, and once reusing all of them
+        os.unlink(os.path.join(builddir, 'meson-private', 'ninja_fragments.dat'))
+        reconfigured = setup(srcdir, builddir, 1, reconfigure=True)
+        reused = setup(srcdir, builddir, 1, reconfigure=True)
+        if read_outputs(builddir) != expected:
+            print('The outputs of the generation and the reconfiguration differ', file=sys.stderr)
+            return 1
+    print(f'{"1 process":<24} {serial:8.2f} s')
+    print(f'{f"{options.jobs} processes":<24} {parallel:8.2f} s')
+    print(f'{"reconfigured":<24} {reconfigured:8.2f} s')
+    print(f'{"reconfigured, reused":<24} {reused:8.2f} s')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
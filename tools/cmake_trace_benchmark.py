@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+'''Measures how long parsing a CMake trace takes and how much memory it
+needs at its peak, see CMakeTraceParser.parse().
+
+The trace is either given, or recorded by looking up a CMake package with
+Meson, LLVM by default. A recorded trace can be repeated to get the size of
+the traces of larger packages. For comparison, the peak memory of only
+reading the whole trace and splitting it into lines is printed as well.
+'''
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing as T
+from pathlib import Path
+
+# Use the Meson of this source tree
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mesonbuild.cmake.traceparser import CMakeTraceParser
+from run_tests import get_fake_env
+
+def record_trace(package: str, workdir: str) -> Path:
+    srcdir = os.path.join(workdir, 'src')
+    builddir = os.path.join(workdir, 'build')
+    os.mkdir(srcdir)
+    with open(os.path.join(srcdir, 'meson.build'), 'w', encoding='utf-8') as f:
+        f.write("project('trace', 'c', 'cpp')\n")
+        f.write(f"dependency('{package}', method : 'cmake')\n")
+    subprocess.run([sys.executable, os.path.join(ROOT, 'meson.py'), 'setup', srcdir, builddir],
+                   check=True, stdout=subprocess.DEVNULL)
+    return Path(builddir, 'meson-private', f'cmake_{package}', 'cmake_trace.txt')
+
+def write_trace(source: Path, target: Path, repeat: int) -> None:
+    with source.open(encoding='utf-8', errors='ignore') as f:
+        # A json-v1 trace starts with its version, which must only be there once
+        first = f.readline()
+        rest = f.read()
+    with target.open('w', encoding='utf-8') as f:
+        f.write(first)
+        if not first.startswith('{'):
+            f.write(rest)
+            repeat -= 1
+        for _ in range(repeat):
+            f.write(rest)
+
+def parse(builddir: Path, trace_format: str) -> None:
+    parser = CMakeTraceParser('3.25', builddir, get_fake_env())
+    parser.trace_format = trace_format
+    parser.parse()
+
+def read_at_once(trace: Path) -> None:
+    with trace.open(encoding='utf-8', errors='ignore') as f:
+        f.read().splitlines()
+
+def peak_memory(func: T.Callable[[], None]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('trace', nargs='?', type=Path,
+                        help='A trace written by CMake with --trace-redirect')
+    parser.add_argument('-p', '--package', default='LLVM',
+                        help='The CMake package to record a trace of, if none is given (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+                        help='Number of times the trace is repeated (default: %(default)s)')
+    options = parser.parse_args()
+
+    if options.trace is None and shutil.which('cmake') is None:
+        raise SystemExit('This needs cmake to record a trace.')
+    with tempfile.TemporaryDirectory() as d:
+        recorded = options.trace or record_trace(options.package, d)
+        builddir = Path(d, 'parse')
+        builddir.mkdir()
+        trace = builddir / 'cmake_trace.txt'
+        write_trace(recorded, trace, options.repeat)
+        with trace.open(encoding='utf-8', errors='ignore') as f:
+            trace_format = 'json-v1' if f.readline().startswith('{') else 'human'
+
+        start = time.perf_counter()
+        parse(builddir, trace_format)
+        elapsed = time.perf_counter() - start
+        parsed = peak_memory(lambda: parse(builddir, trace_format))
+        loaded = peak_memory(lambda: read_at_once(trace))
+        size = trace.stat().st_size
+    print(f'{"trace":<24} {size / 2**20:8.1f} MiB ({trace_format})')
+    print(f'{"parse time":<24} {elapsed:8.2f} s')
+    print(f'{"parse peak memory":<24} {parsed / 2**20:8.1f} MiB')
+    print(f'{"read at once":<24} {loaded / 2**20:8.1f} MiB')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+'''Measures how long adding arguments to CompilerArgs takes as their number
+grows, see CompilerArgs.__iadd__().
+
+Groups of include directories, defines, libraries given by path and by
+name, and a unique flag are added one group at a time, as when collecting
+the arguments of deep dependency trees, and then converted to the
+arguments of the compiler. The time per argument should not grow with the
+number of arguments.
+'''
+
+import argparse
+import os
+import sys
+import time
+
+# Use the Meson of this source tree
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mesonbuild.compilers.c import GnuCCompiler
+from mesonbuild.envconfig import MachineInfo
+from mesonbuild.mesonlib import MachineChoice
+
+GROUP_SIZE = 6
+
+def add_groups(compiler: GnuCCompiler, groups: int) -> float:
+    args = compiler.compiler_args()
+    start = time.perf_counter()
+    for i in range(groups):
+        args.extend([f'-Iinclude{i}', f'-DDEFINE{i}=1', f'/usr/lib/libdep{i}.a', f'-ldep{i}', '-pipe', '-c'])
+    args.to_native()
+    return time.perf_counter() - start
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--groups', type=int, default=1000,
+                        help='Number of groups of arguments to start with (default: %(default)s)')
+    parser.add_argument('-s', '--steps', type=int, default=4,
+                        help='Number of times the number of groups is doubled (default: %(default)s)')
+    parser.add_argument('--cc', default='cc',
+                        help='The GCC compatible compiler to ask for its default include directories (default: %(default)s)')
+    options = parser.parse_args()
+
+    info = MachineInfo('linux', 'x86_64', 'x86_64', 'little', 'linux', None)
+    compiler = GnuCCompiler([], [options.cc], '12.0.0', MachineChoice.HOST, False, info)
+    # Converting asks the compiler once, which is not what is measured
+    compiler.get_default_include_dirs()
+    for step in range(options.steps + 1):
+        groups = options.groups * 2 ** step
+        elapsed = add_groups(compiler, groups)
+        print(f'{groups * GROUP_SIZE:>10} arguments {elapsed:8.3f} s {elapsed / (groups * GROUP_SIZE) * 1e6:8.2f} us/argument')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+'''Measures how long looking up a dependency with its config tool takes
+when configuring and when reconfiguring, and how often the tool is run,
+see ConfigToolDependency._run_config_tool().
+
+The tool is replaced by a script that counts its runs before running the
+real one. LLVM is looked up by default, as it asks the most of its tool.
+'''
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import typing as T
+
+# Use the Meson of this source tree
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup(srcdir: str, builddir: str, args: T.List[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'meson.py'), 'setup'] + args + [srcdir, builddir],
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def count_runs(logfile: str) -> int:
+    if not os.path.exists(logfile):
+        return 0
+    with open(logfile, encoding='utf-8') as f:
+        runs = len(f.readlines())
+    os.unlink(logfile)
+    return runs
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-d', '--dependency', default='llvm',
+                        help='The dependency to look up (default: %(default)s)')
+    parser.add_argument('-t', '--tool', default='llvm-config',
+                        help='Its config tool, as named in machine files (default: %(default)s)')
+    parser.add_argument('-m', '--modules', nargs='*', default=['core', 'support'],
+                        help='The modules to ask for (default: %(default)s)')
+    options = parser.parse_args()
+
+    tool = shutil.which(options.tool)
+    if tool is None:
+        raise SystemExit(f'This needs {options.tool}.')
+    with tempfile.TemporaryDirectory() as d:
+        srcdir = os.path.join(d, 'src')
+        builddir = os.path.join(d, 'build')
+        logfile = os.path.join(d, 'runs.txt')
+        os.mkdir(srcdir)
+        wrapper = os.path.join(d, options.tool)
+        with open(wrapper, 'w', encoding='utf-8') as f:
+            f.write(f'#!/bin/sh\necho "$@" >> "{logfile}"\nexec "{tool}" "$@"\n')
+        os.chmod(wrapper, 0o755)
+        # Results computed from files changed in the last seconds are not
+        # cached, as if the wrapper had been there for a while
+        past = time.time() - 60
+        os.utime(wrapper, (past, past))
+        with open(os.path.join(d, 'native.ini'), 'w', encoding='utf-8') as f:
+            f.write(f"[binaries]\n{options.tool} = '{wrapper}'\n")
+        with open(os.path.join(srcdir, 'meson.build'), 'w', encoding='utf-8') as f:
+            f.write("project('config tool', 'c', 'cpp')\n")
+            f.write(f"dependency('{options.dependency}', method : 'config-tool', modules : {options.modules!r})\n")
+
+        args = ['--native-file', os.path.join(d, 'native.ini')]
+        configured = setup(srcdir, builddir, args)
+        configured_runs = count_runs(logfile)
+        reconfigured = setup(srcdir, builddir, args + ['--reconfigure'])
+        reconfigured_runs = count_runs(logfile)
+    print(f'{"configured":<24} {configured:8.2f} s {configured_runs:4} runs')
+    print(f'{"reconfigured":<24} {reconfigured:8.2f} s {reconfigured_runs:4} runs')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
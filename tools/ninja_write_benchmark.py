@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+'''Measures how fast the Ninja backend writes out build statements, apart
+from computing them, see NinjaBuildElement.write().
+
+The statements are made up like those of C targets: the compile
+statements of each target share include directories and defines, and
+every target is linked. They are written once with the quoting cache
+empty, once with it filled, and once without it.
+'''
+
+import argparse
+import io
+import os
+import sys
+import time
+import typing as T
+from unittest import mock
+
+# Use the Meson of this source tree
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mesonbuild.backend import ninjabackend
+from mesonbuild.backend.ninjabackend import NinjaBuildElement, NinjaRule
+
+def make_rules() -> T.Dict[str, NinjaRule]:
+    compile_rule = NinjaRule('c_COMPILER', ['cc', '$ARGS', '-MD', '-MQ', '$out', '-MF', '$DEPFILE', '-o', '$out', '-c', '$in'],
+                             [], 'Compiling C object $out', rspable=True, deps='gcc', depfile='$DEPFILE_UNQUOTED')
+    link_rule = NinjaRule('c_LINKER', ['cc', '$ARGS', '-o', '$out', '$in', '$LINK_ARGS'], [],
+                          'Linking target $out', rspable=True)
+    return {r.name: r for r in [compile_rule, link_rule]}
+
+def make_elements(rules: T.Dict[str, NinjaRule], targets: int, sources: int) -> T.List[NinjaBuildElement]:
+    all_outputs: T.Set[str] = set()
+    common = ['-fdiagnostics-color=always', '-D_FILE_OFFSET_BITS=64', '-Wall', '-Winvalid-pch', '-O2', '-g']
+    elements = []
+    for t in range(targets):
+        private = f'sub{t}/libt{t}.a.p'
+        args = ['-I' + private, f'-Isub{t}', f'-I../sub{t}', '-Iinclude', '-I../include',
+                '-I/usr/include/glib-2.0', '-I/usr/lib/x86_64-linux-gnu/glib-2.0/include',
+                f'-DTARGET="target {t}"'] + common
+        objects = []
+        for s in range(sources):
+            obj = f'{private}/src_{s}.c.o'
+            elem = NinjaBuildElement(all_outputs, obj, 'c_COMPILER', f'../sub{t}/src_{s}.c')
+            elem.add_item('DEPFILE', obj + '.d')
+            elem.add_item('ARGS', args)
+            elem.add_orderdep(f'sub{t}/generated.h')
+            elements.append(elem)
+            objects.append(obj)
+        elem = NinjaBuildElement(all_outputs, f'sub{t}/prog{t}', 'c_LINKER', objects)
+        elem.add_item('LINK_ARGS', ['-Wl,--as-needed', '-Wl,--no-undefined', '-Wl,--start-group',
+                                    '/usr/lib/x86_64-linux-gnu/libglib-2.0.so', '-lm', '-Wl,--end-group'])
+        elements.append(elem)
+    for elem in elements:
+        elem.rule = rules[elem.rulename]
+        elem.count_rule_references()
+    return elements
+
+def write(elements: T.List[NinjaBuildElement]) -> T.Tuple[float, int]:
+    outfile = io.StringIO()
+    start = time.perf_counter()
+    for elem in elements:
+        elem.write(outfile)
+    return time.perf_counter() - start, len(outfile.getvalue())
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--targets', type=int, default=1000,
+                        help='Number of targets (default: %(default)s)')
+    parser.add_argument('-s', '--sources', type=int, default=10,
+                        help='Number of sources of each target (default: %(default)s)')
+    options = parser.parse_args()
+
+    rules = make_rules()
+    cached_quote = ninjabackend.ninja_quote_arg
+    results = []
+    cached_quote.cache_clear()
+    results.append(('cache empty',) + write(make_elements(rules, options.targets, options.sources)))
+    results.append(('cache filled',) + write(make_elements(rules, options.targets, options.sources)))
+    with mock.patch.object(ninjabackend, 'ninja_quote_arg', cached_quote.__wrapped__):
+        results.append(('no cache',) + write(make_elements(rules, options.targets, options.sources)))
+
+    statements = options.targets * (options.sources + 1)
+    for name, elapsed, size in results:
+        print(f'{name:<24} {elapsed:8.2f} s {statements / elapsed:10.0f} statements/s {size / 2**20 / elapsed:8.1f} MiB/s')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2026 The Meson development team
+
+'''Measures how long each way of running wrapped custom target and generator
+commands takes per command, see Backend.as_meson_exe_cmdline().
+
+Every variant runs `true` with its output captured and an environment
+variable set, so the times are the overhead of the wrapping alone.
+'''
+
+import argparse
+import marshal
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Use the Meson of this source tree
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mesonbuild.backend.backends import Backend
+from mesonbuild.scripts import exelauncher
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--runs', type=int, default=50,
+                        help='Number of times each command is run (default: %(default)s)')
+    options = parser.parse_args()
+
+    true = shutil.which('true')
+    if true is None:
+        raise SystemExit('This needs a `true` command.')
+    with tempfile.TemporaryDirectory() as d:
+        out = os.path.join(d, 'out.txt')
+        data = os.path.join(d, 'exe.marshal')
+        with open(data, 'wb') as f:
+            marshal.dump({
+                'cmd_args': [true],
+                'env': [('append', 'BENCHMARK_VAR', ['x'], ':')],
+                'unset': [],
+                'extra_paths': [],
+                'workdir': None,
+                'capture': out,
+                'feed': None,
+                'verbose': False,
+            }, f)
+
+        commands = {
+            'not wrapped': [true],
+            'env prefix': ['env', 'BENCHMARK_VAR=x', true],
+        }
+        redirect = Backend(None, None).get_redirect_cmdline(out, None)
+        if redirect is not None:
+            commands['shell redirection'] = ['env', 'BENCHMARK_VAR=x'] + redirect + [true]
+        commands['exelauncher.py'] = [sys.executable, '-S', exelauncher.__file__, data]
+        commands['meson --internal exe'] = [sys.executable, os.path.join(ROOT, 'meson.py'), '--internal', 'exe',
+                                            '--capture', out, '--', 'env', 'BENCHMARK_VAR=x', true]
+
+        for name, cmd in commands.items():
+            start = time.perf_counter()
+            for _ in range(options.runs):
+                subprocess.run(cmd, check=True)
+            elapsed = (time.perf_counter() - start) / options.runs
+            print(f'{name:<24} {elapsed * 1000:8.1f} ms')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,6 +11,7 @@ import os
 import shutil
 import platform
 import pickle
+import itertools
 import zipfile, tarfile
 import sys
 from unittest import mock, SkipTest, skipIf, skipUnless, expectedFailure
@@ -25,6 +26,7 @@ import mesonbuild.dependencies.base
 import mesonbuild.dependencies.factory
 import mesonbuild.envconfig
 import mesonbuild.environment
+import mesonbuild.build
 import mesonbuild.coredata
 import mesonbuild.machinefile
 import mesonbuild.modules.gnome
@@ -52,6 +54,7 @@ from mesonbuild.linkers import linkers
 from mesonbuild.dependencies.pkgconfig import PkgConfigDependency
 from mesonbuild.build import Target, ConfigurationData, Executable, SharedLibrary, StaticLibrary
 from mesonbuild import mtest
+from mesonbuild.buildtimes import BuildTimes
 import mesonbuild.modules.pkgconfig
 from mesonbuild.scripts import destdir_join
 
@@ -1367,14 +1370,82 @@ class AllPlatformTests(BasePlatformTests):
             self.new_builddir()
 
     def test_custom_target_exe_data_deterministic(self):
-        testdir = os.path.join(self.common_test_dir, '109 custom target capture')
+        testdir = os.path.join(self.unit_test_dir, '130 wrapped commands')
         self.init(testdir)
-        meson_exe_dat1 = glob(os.path.join(self.privatedir, 'meson_exe*.dat'))
+        meson_exe_dat1 = glob(os.path.join(self.privatedir, 'meson_exe*'))
+        self.assertNotEqual(meson_exe_dat1, [])
         self.wipe()
         self.init(testdir)
-        meson_exe_dat2 = glob(os.path.join(self.privatedir, 'meson_exe*.dat'))
+        meson_exe_dat2 = glob(os.path.join(self.privatedir, 'meson_exe*'))
         self.assertListEqual(meson_exe_dat1, meson_exe_dat2)
 
+    def test_reused_target_fragments(self):
+        '''
+        Test that the Ninja backend reuses what it generated for the targets
+        that did not change, with the same result as generating them again.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not reuse target fragments')
+        testdir = self.copy_srcdir(os.path.join(self.unit_test_dir, '131 parallel backend'))
+
+        def read_outputs() -> T.List[bytes]:
+            outputs = []
+            for name in ['build.ninja', 'compile_commands.json']:
+                with open(os.path.join(self.builddir, name), 'rb') as f:
+                    outputs.append(f.read())
+            return outputs
+
+        self.init(testdir)
+        expected = read_outputs()
+        self.assertNotIn('Reusing', self.get_meson_log_raw())
+        self.init(testdir, extra_args=['--reconfigure'])
+        # All but the target whose shared arguments were renamed to not
+        # clash with those of another one
+        self.assertIn('Reusing 84 of 85 target fragments', self.get_meson_log_raw())
+        self.assertEqual(read_outputs(), expected)
+
+        # Only the changed target is generated again
+        with open(os.path.join(testdir, 'meson.build'), encoding='utf-8') as f:
+            build_file = f.read()
+        with open(os.path.join(testdir, 'meson.build'), 'w', encoding='utf-8') as f:
+            f.write(build_file.replace("'-DNUM=102'", "'-DNUM=103'"))
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('Reusing 83 of 85 target fragments', self.get_meson_log_raw())
+        changed = read_outputs()
+        self.assertIn(b'-DNUM=103', changed[0])
+        self.init(testdir, extra_args=['--wipe'])
+        self.assertEqual(changed, read_outputs())
+        self.build()
+
+    def test_wrapped_commands(self):
+        testdir = self.copy_srcdir(os.path.join(self.unit_test_dir, '130 wrapped commands'))
+        self.init(testdir)
+        # None of them need to start Meson
+        self.assertEqual(glob(os.path.join(self.privatedir, 'meson_exe*.dat')), [])
+        self.assertNotEqual(glob(os.path.join(self.privatedir, 'meson_exe*.marshal')), [])
+        out = self.build()
+        self.assertNotIn('noise', out)
+        with open(os.path.join(self.builddir, 'copy.txt'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'HELLO\n')
+        with open(os.path.join(self.builddir, 'env.txt'), encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'a,b')
+        self.assertBuildIsNoop()
+
+        # Captured output that did not change is not rewritten, so what
+        # depends on it is not rebuilt
+        copy_mtime = os.stat(os.path.join(self.builddir, 'copy.txt')).st_mtime_ns
+        os.utime(os.path.join(testdir, 'input.txt'))
+        self.build()
+        self.assertEqual(os.stat(os.path.join(self.builddir, 'copy.txt')).st_mtime_ns, copy_mtime)
+        if self.backend is Backend.ninja:
+            self.assertBuildIsNoop()
+
+        for output in ['fail.txt', 'fail_env.txt']:
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                self.build(output)
+            self.assertIn('--- stderr ---', cm.exception.output)
+            self.assertIn('fail noise', cm.exception.output)
+
     def test_noop_changes_cause_no_rebuilds(self):
         '''
         Test that no-op changes to the build files such as mtime do not cause
@@ -3359,6 +3430,45 @@ class AllPlatformTests(BasePlatformTests):
             for out in i['filename']:
                 assert os.path.relpath(out, self.builddir).startswith('meson-out')
 
+    def test_introspect_ninja_deps(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not record dependencies')
+        testdir = os.path.join(self.unit_test_dir, '56 introspection')
+        self.init(testdir)
+        header = os.path.join(testdir, 'staticlib', 'static.h')
+        args = ['--dependents-of', header, '--files-read-by', 'test2']
+        res = self.introspect(args)
+        self.assertEqual(res['dependents_of'][header], {'targets': [], 'tests': []})
+        self.assertEqual(res['files_read_by'], {'test2': []})
+
+        self.build()
+        res = self.introspect(args)
+        dependents = res['dependents_of'][header]
+        targets = {t['id']: t['name'] for t in self.introspect('--targets')}
+        self.assertEqual(sorted(targets[i] for i in dependents['targets']),
+                         ['custom target test 3', 'staticTestLib', 'test2', 'test3'])
+        self.assertEqual(sorted(dependents['tests']), ['benchmark 1', 'test case 2'])
+        files = [os.path.normpath(os.path.join(self.builddir, f)) for f in res['files_read_by']['test2']]
+        self.assertIn(os.path.join(testdir, 't2.cpp'), files)
+        self.assertIn(header, files)
+        self.assertNotIn(os.path.join(testdir, 'sharedlib', 'shared.hpp'), files)
+
+    def test_introspect_dependents_of_inputs(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not record dependencies')
+        testdir = os.path.join(self.unit_test_dir, '132 affected by inputs')
+        self.init(testdir)
+        targets = {t['id']: (t['type'], t['name']) for t in self.introspect('--targets')}
+        # The inputs named in the build definition are known before building
+        for f, expected, tests in [
+                ('data.txt', [('custom', 'data'), ('executable', 'data')], ['data']),
+                ('depend.txt', [('custom', 'data'), ('executable', 'data')], ['data']),
+                ('generated.txt', [('executable', 'generated')], ['generated'])]:
+            f = os.path.join(testdir, f)
+            dependents = self.introspect(['--dependents-of', f])[f]
+            self.assertEqual(sorted(targets[i] for i in dependents['targets']), expected)
+            self.assertEqual(dependents['tests'], tests)
+
     def test_introspect_json_dump(self):
         testdir = os.path.join(self.unit_test_dir, '56 introspection')
         self.init(testdir)
@@ -4076,6 +4186,90 @@ class AllPlatformTests(BasePlatformTests):
         self.assertRegex(contents, r'build main(\.exe)?.*: c_LINKER')
         self.assertRegex(contents, r'build (lib|cyg)?mylib.*: c_LINKER')
 
+    def test_ninja_shared_compile_args(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest('This test reads the ninja file')
+
+        testdir = os.path.join(self.common_test_dir, '5 linkstatic')
+        self.init(testdir)
+
+        build_ninja = os.path.join(self.builddir, 'build.ninja')
+        with open(build_ninja, encoding='utf-8') as f:
+            contents = f.read()
+
+        # The four sources of the library share one variable, the single
+        # source of the executable does not need one.
+        m = re.search(r'^(\S+_c_ARGS) = ', contents, re.MULTILINE)
+        self.assertIsNotNone(m, msg=contents)
+        self.assertEqual(contents.count(f' ARGS = ${{{m.group(1)}}}'), 4)
+        self.assertEqual(len(re.findall(r'^\S+_c_ARGS = ', contents, re.MULTILINE)), 1)
+
+        # The compile commands still contain all of the arguments
+        for i in self.get_compdb():
+            self.assertNotIn('_ARGS', i['command'])
+            self.assertIn(os.path.basename(i['file']), i['command'])
+
+    def test_compdb_matches_ninja(self):
+        '''
+        The compilation database is written by Meson itself, check that it is
+        the same as what ninja would generate from build.ninja.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest('This test compares against ninja')
+
+        testdir = os.path.join(self.common_test_dir, '13 pch')
+        self.init(testdir)
+        compdb = os.path.join(self.builddir, 'compile_commands.json')
+        with open(compdb, encoding='utf-8') as f:
+            contents = f.read()
+        self.assertNotEqual(json.loads(contents), [])
+
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            rules = re.findall(r'^rule (\w+_(?:COMPILER|PCH)\w*)$', f.read(), re.MULTILINE)
+        ninja = mesonbuild.environment.detect_ninja()
+        expected = subprocess.check_output(ninja + ['-t', 'compdb', '-x'] + rules, cwd=self.builddir, text=True)
+        self.assertEqual(contents, expected)
+        self.assertFalse(os.path.exists(compdb + '~'))
+
+        # The file is left alone if nothing changed
+        mtime = os.stat(compdb).st_mtime_ns
+        self.build('reconfigure')
+        self.assertEqual(os.stat(compdb).st_mtime_ns, mtime)
+
+    def test_compile_analyze(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not support --analyze')
+        testdir = os.path.join(self.unit_test_dir, '56 introspection')
+        self.init(testdir)
+        trace = os.path.join(self.builddir, 'trace.json')
+        out = self._run(self.meson_command + ['compile', '-C', self.builddir, '--analyze-trace', trace])
+        self.assertIn('Critical path:', out)
+        self.assertIn('Slowest targets:', out)
+
+        with open(trace, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        by_name = {e['name']: e for e in events}
+        self.assertEqual(by_name['staticlib/libstaticTestLib.a']['args'],
+                         {'target': 'staticTestLib', 'rule': 'STATIC_LINKER'})
+        compiled = [e['args'] for e in events if e['args'].get('source', '').endswith('t3.cpp')]
+        self.assertEqual(len(compiled), 1)
+        self.assertEqual(compiled[0]['target'], 'test3')
+        # Commands running at the same time are on different threads
+        for a, b in itertools.combinations(events, 2):
+            if a['tid'] == b['tid']:
+                self.assertTrue(a['ts'] + a['dur'] <= b['ts'] or b['ts'] + b['dur'] <= a['ts'])
+
+        # Every command on the critical path depends on the previous one
+        times = BuildTimes(mesonbuild.build.load(self.builddir), self.builddir)
+        path = times.critical_path()
+        self.assertTrue(path)
+        for prev, job in zip(path, path[1:]):
+            self.assertIn(prev.name, [d.name for d in times.get_dependencies(job)])
+
+        # A build with nothing to do has nothing to analyze
+        out = self._run(self.meson_command + ['compile', '-C', self.builddir, '--analyze'])
+        self.assertIn('No commands were run by this build.', out)
+
     def test_commands_documented(self):
         '''
         Test that all listed meson commands are documented in Commands.md.
@@ -5115,6 +5309,29 @@ class AllPlatformTests(BasePlatformTests):
         self.assertEqual(cm.exception.returncode, 1)
         self.assertIn('exit status 39', cm.exception.stdout)
 
+    @skip_if_not_language('rust')
+    def test_rust_pipelining(self) -> None:
+        if self.backend is not Backend.ninja:
+            raise unittest.SkipTest('Rust is only supported with ninja currently')
+        testdir = os.path.join(self.rust_test_dir, '21 transitive dependencies')
+        self.init(testdir, extra_args=['-Drust_pipelining=true'])
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        liba = os.path.join('liba', 'libliba')
+        libb = os.path.join('libb', 'liblibb')
+        # Libraries are compiled against the metadata of their dependencies,
+        # executables still wait for the libraries themselves
+        self.assertRegex(contents, rf'build {re.escape(libb)}\.rlib: rust_COMPILER [^\n]*\| {re.escape(liba)}\.rmeta\n')
+        self.assertRegex(contents, rf'build {re.escape(libb)}\.rmeta: rust_METADATA [^\n]*\| {re.escape(liba)}\.rmeta\n')
+        self.assertRegex(contents, rf'build main[^:]*: rust_COMPILER [^\n]*\| {re.escape(liba)}\.rlib {re.escape(libb)}\.rlib\n')
+        self.build()
+        # Nothing is left of the temporary directories rustc writes to
+        for d in ['liba', 'libb']:
+            d = os.path.join(self.builddir, d)
+            self.assertEqual([f for f in os.listdir(d) if 'rmeta' in f and os.path.isdir(os.path.join(d, f))], [])
+        self.assertBuildIsNoop()
+        self.run_tests()
+
     @skip_if_not_language('rust')
     def test_bindgen_drops_invalid(self) -> None:
         if self.backend is not Backend.ninja:
@@ -5293,6 +5510,48 @@ class AllPlatformTests(BasePlatformTests):
                 self._run(self.mtest_command + ['--slice=' + arg])
             self.assertIn(expectation, cm.exception.output)
 
+    def test_affected_by(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not record dependencies')
+        testdir = os.path.join(self.unit_test_dir, '56 introspection')
+        self.init(testdir)
+
+        def affected_tests(*files: str) -> T.List[str]:
+            args = []
+            for f in files:
+                args += ['--affected-by', os.path.join(testdir, f)]
+            output = self._run(self.mtest_command + ['--list', '--no-rebuild'] + args)
+            return sorted(output.splitlines())
+
+        # Nothing has been built yet, so nothing is known about dependencies
+        self.assertEqual(affected_tests('t1.cpp'),
+                         ['WARNING: No dependencies have been recorded by ninja yet, running all tests',
+                          'test case 1', 'test case 2'])
+
+        self.build()
+        self.assertEqual(affected_tests('t1.cpp'), ['test case 1'])
+        self.assertEqual(affected_tests('staticlib/static.h'), ['test case 2'])
+        self.assertEqual(affected_tests('sharedlib/shared.hpp'), ['test case 1', 'test case 2'])
+        self.assertEqual(affected_tests('t1.cpp', 'meson.build'), ['test case 1', 'test case 2'])
+
+    def test_affected_by_inputs(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not record dependencies')
+        testdir = os.path.join(self.unit_test_dir, '132 affected by inputs')
+        self.init(testdir)
+        self.build()
+
+        def affected_tests(f: str) -> T.List[str]:
+            args = ['--list', '--no-rebuild', '--affected-by', os.path.join(testdir, f)]
+            return sorted(self._run(self.mtest_command + args).splitlines())
+
+        # Ninja records nothing about the files named as inputs in the build
+        # definition, neither for custom targets nor for generators
+        self.assertEqual(affected_tests('data.txt'), ['data'])
+        self.assertEqual(affected_tests('depend.txt'), ['data'])
+        self.assertEqual(affected_tests('generated.txt'), ['generated'])
+        self.assertEqual(affected_tests('plain.c'), ['plain'])
+
     def test_rsp_support(self):
         env = get_fake_env()
         cc = detect_c_compiler(env, MachineChoice.HOST)
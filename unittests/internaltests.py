@@ -6,17 +6,21 @@ from pathlib import Path
 from unittest import mock
 import argparse
 import contextlib
+import gc
 import io
 import json
 import operator
 import os
 import pickle
 import stat
+import struct
 import subprocess
 import tempfile
 import textwrap
+import time
 import typing as T
 import unittest
+import weakref
 
 import mesonbuild.mlog
 import mesonbuild.depfile
@@ -25,8 +29,11 @@ import mesonbuild.dependencies.factory
 import mesonbuild.envconfig
 import mesonbuild.environment
 import mesonbuild.modules.gnome
+import mesonbuild.ninjadeps
+import mesonbuild.scripts.depscan
 import mesonbuild.scripts.env2mfile
 from mesonbuild import coredata
+from mesonbuild.backend import backends, ninjabackend
 from mesonbuild.compilers.c import ClangCCompiler, GnuCCompiler
 from mesonbuild.compilers.cpp import VisualStudioCPPCompiler
 from mesonbuild.compilers.d import DmdDCompiler
@@ -265,6 +272,36 @@ class InternalTests(unittest.TestCase):
         l.append('-Wl,-ldl')
         self.assertEqual(l.to_native(copy=True), ['-Lfoo', '-Lfoodir', '-Wl,--start-group', '-lfoo', '-Lbardir', '-lbar', '-lbar', '/libbaz.a', '-Wl,--export-dynamic', '-Wl,-ldl', '-Wl,--end-group'])
 
+    def test_compiler_args_unique_tracking(self):
+        cc = ClangCCompiler([], [], 'fake', MachineChoice.HOST, False, mock.Mock())
+        a = cc.compiler_args(['-c', '/lib/libfoo.a'])
+        # Unique args are skipped whether they are already flushed or still pending
+        a += ['-pipe', '-c', '/lib/libfoo.a', '-pipe']
+        self.assertEqual(a, ['-c', '/lib/libfoo.a', '-pipe'])
+        a += ['/lib/libbar.so']
+        a += ['/lib/libbar.so', '-pipe']
+        self.assertEqual(a, ['-c', '/lib/libfoo.a', '-pipe', '/lib/libbar.so'])
+        # Once removed, a unique arg can be added again
+        a.remove('-pipe')
+        del a[0]
+        a += ['-pipe', '-c']
+        self.assertEqual(a, ['/lib/libfoo.a', '/lib/libbar.so', '-pipe', '-c'])
+        a[0:2] = ['-lm']
+        a += ['/lib/libfoo.a', '-lm']
+        self.assertEqual(a, ['-lm', '-pipe', '-c', '/lib/libfoo.a'])
+        # Direct appends and inserts are seen by later additions
+        a.append_direct('-pthread')
+        a.insert(0, '/lib/libbaz.a')
+        a += ['-pthread', '/lib/libbaz.a']
+        self.assertEqual(a, ['/lib/libbaz.a', '-lm', '-pipe', '-c', '/lib/libfoo.a', '-pthread'])
+        # Copies track their own arguments
+        b = a.copy()
+        b.remove('-pthread')
+        b += ['-pthread']
+        a += ['-pthread']
+        self.assertEqual(b, ['/lib/libbaz.a', '-lm', '-pipe', '-c', '/lib/libfoo.a', '-pthread'])
+        self.assertEqual(a, ['/lib/libbaz.a', '-lm', '-pipe', '-c', '/lib/libfoo.a', '-pthread'])
+
     def test_compiler_args_remove_system(self):
         ## Test --start/end-group
         linker = linkers.GnuBFDDynamicLinker([], MachineChoice.HOST, '-Wl,', [])
@@ -605,6 +642,40 @@ class InternalTests(unittest.TestCase):
             env.machines.host.system = 'windows'
             self._test_all_naming(cc, env, patterns, 'windows-mingw')
 
+    def test_find_library_link_test_shortcut(self):
+        '''
+        Unit test for the cases where -l is known to link without a link test
+        '''
+        env = get_fake_env()
+        cc = detect_c_compiler(env, MachineChoice.HOST)
+        env.machines.host.system = 'linux'
+        env.machines.host.cpu_family = 'x86_64'
+        env.machines.host.endian = 'little'
+
+        def elf(path: Path, data: int, machine: int) -> None:
+            order = 'little' if data == 1 else 'big'
+            path.write_bytes(b'\x7fELF' + bytes([2, data, 1]) + bytes(9) +
+                             (3).to_bytes(2, order) + machine.to_bytes(2, order))
+
+        with tempfile.TemporaryDirectory() as d, \
+                mock.patch.object(cc, 'get_library_dirs', return_value=[d]), \
+                mock.patch.object(cc, '_get_elf_class', return_value=2):
+            elf(Path(d, 'libgood.so'), 1, 62)
+            elf(Path(d, 'libarm.so'), 1, 183)
+            elf(Path(d, 'libbig.so'), 2, 62)
+            Path(d, 'libscript.so').write_text('INPUT(libgood.so)\n', encoding='utf-8')
+            self.assertTrue(cc._links_from_library_dirs('good', env, []))
+            # Other machines, byte orders and linker scripts need a link test
+            self.assertFalse(cc._links_from_library_dirs('arm', env, []))
+            self.assertFalse(cc._links_from_library_dirs('big', env, []))
+            self.assertFalse(cc._links_from_library_dirs('script', env, []))
+            self.assertFalse(cc._links_from_library_dirs('missing', env, []))
+            # So do arguments changing what the linker picks
+            for arg in ['-static', '-Wl,-Bstatic', '-Wl,--as-needed', '-L/opt/lib', '--sysroot=/opt', '-m32']:
+                self.assertFalse(cc._links_from_library_dirs('good', env, [arg]), arg)
+            env.machines.host.cpu_family = 'aarch64'
+            self.assertFalse(cc._links_from_library_dirs('good', env, []))
+
     @skipIfNoPkgconfig
     def test_pkgconfig_parse_libs(self):
         '''
@@ -2132,3 +2203,305 @@ class InternalTests(unittest.TestCase):
                 self.assertEqual(actual.compile_args, expected.compile_args)
                 self.assertEqual(actual.link_args, expected.link_args)
                 self.assertEqual(actual.cmake, expected.cmake)
+
+    def test_cmake_trace_parser_streaming(self) -> None:
+        from mesonbuild.cmake.traceparser import CMakeTraceParser
+        env = get_fake_env()
+        with tempfile.TemporaryDirectory() as d:
+            trace_file = Path(d, 'cmake_trace.txt')
+            trace_file.write_text(textwrap.dedent('''\
+                {"version":{"major":1,"minor":2}}
+                {"args":["foo"],"cmd":"cmake_minimum_required","file":"/a/CMakeLists.txt","frame":1,"line":1}
+                {"args":["FOO","bar;baz"],"cmd":"set","file":"/a/CMakeLists.txt","frame":1,"line":2}
+                {"args":["ignored"],"cmd":"include","file":"/a/CMakeLists.txt","frame":1,"line":3}
+                {"args":["BAR","\\"cmd\\":\\"include\\""],"cmd":"SET","file":"/a/CMakeLists.txt","frame":1,"line":4}
+                '''), encoding='utf-8')
+            parser = CMakeTraceParser('3.25', Path(d), env)
+            parser.parse()
+            self.assertEqual(parser.get_cmake_var('FOO'), ['bar', 'baz'])
+            self.assertEqual(parser.get_cmake_var('BAR'), ['"cmd":"include"'])
+
+            trace_file.write_text('', encoding='utf-8')
+            with self.assertRaises(MesonException):
+                parser.parse()
+
+        parser = CMakeTraceParser('3.25', Path(d), env)
+        parser.trace_format = 'human'
+        lines = list(parser._lex_trace_human(textwrap.dedent('''\
+            /a/CMakeLists.txt(1):  include(foo )
+            /a/CMakeLists.txt(2):  set(FOO a
+              b )
+            Some unrelated output
+            /a/CMakeLists.txt(4):  include(multi
+              line )
+            /a/CMakeLists.txt(6):  message(STATUS hello )
+            ''').splitlines(keepends=True)))
+        self.assertEqual([(l.line, l.func, l.args) for l in lines],
+                         [(2, 'set', ['FOO', 'a', '', 'b']), (6, 'message', ['STATUS', 'hello'])])
+
+    def test_file_stamp_cache(self) -> None:
+        cache = coredata.FileStampCache()
+        with tempfile.TemporaryDirectory() as d:
+            f = os.path.join(d, 'file')
+            missing = os.path.join(d, 'missing')
+
+            def write(path: str, contents: str) -> None:
+                with open(path, 'w', encoding='utf-8') as fh:
+                    fh.write(contents)
+                # Pretend all changes happened a while ago, results computed
+                # from fresh files are never cached.
+                past = time.time() - 60
+                os.utime(path, (past, past))
+                os.utime(d, (past, past))
+
+            write(f, 'a')
+            cache.put(('test', d), [d, f, missing], ['value'])
+            self.assertEqual(cache.get(('test', d)), ['value'])
+            self.assertIsNone(cache.get(('other', d)))
+
+            # Appearing files invalidate the entry
+            write(missing, 'a')
+            self.assertIsNone(cache.get(('test', d)))
+
+            # So do modified files
+            cache.put(('test', d), [f], ['value'])
+            write(f, 'abc')
+            self.assertIsNone(cache.get(('test', d)))
+
+            cache.put(('test', d), [f], ['value'])
+            cache = pickle.loads(pickle.dumps(cache))
+            self.assertEqual(cache.get(('test', d)), ['value'])
+            cache.clear()
+            self.assertIsNone(cache.get(('test', d)))
+
+            # Fresh files are not stamped
+            with open(f, 'w', encoding='utf-8') as fh:
+                fh.write('fresh')
+            cache.put(('test', d), [f], ['value'])
+            self.assertIsNone(cache.get(('test', d)))
+
+    def test_ninja_quote_arg(self) -> None:
+        for qf in (ninjabackend.quote_func, ninjabackend.gcc_rsp_quote, ninjabackend.cmd_quote):
+            for arg in ['-O2', '-I/path with space', '-DFOO=$BAR', 'c:\\dir\\', '-DX="a b"']:
+                # Twice, to get both the computed and the cached value
+                for _ in range(2):
+                    self.assertEqual(ninjabackend.ninja_quote_arg(arg, qf),
+                                     ninjabackend.ninja_quote(qf(arg)))
+        with self.assertRaises(MesonException):
+            ninjabackend.ninja_quote_arg('two\nlines', ninjabackend.quote_func)
+
+    def test_ninja_canonicalize_path(self) -> None:
+        canonicalize = ninjabackend.ninja_canonicalize_path
+        self.assertEqual(canonicalize('./a//b/../c/'), 'a/c')
+        self.assertEqual(canonicalize('../../x/./y'), '../../x/y')
+        self.assertEqual(canonicalize('/usr/../lib'), '/lib')
+        self.assertEqual(canonicalize('a/..'), '.')
+        if is_windows():
+            # Backslashes are separators and kept for $in and $out
+            self.assertEqual(canonicalize('sub\\..\\a\\b/c.c'), 'a\\b/c.c')
+            self.assertEqual(ninjabackend.ninja_node_path('a\\b/c.c'), 'a/b/c.c')
+        else:
+            self.assertEqual(canonicalize('sub\\..\\a/../b'), 'b')
+
+    def test_depscan_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            sources = {
+                'a.f90': 'module a\nend module a\n',
+                'b.f90': 'module b\nuse a\nend module b\n',
+                'c.f90': 'program c\nuse b\nend program c\n',
+            }
+            for name, contents in sources.items():
+                with open(os.path.join(d, name), 'w', encoding='utf-8') as f:
+                    f.write(contents)
+            srcs = [os.path.join(d, name) for name in sources]
+            info = ninjabackend.TargetDependencyScannerInfo(
+                d, {s: s + '.o' for s in srcs}, [(s, 'fortran') for s in srcs])
+            pickle_file = os.path.join(d, 'depscan.pickle')
+            with open(pickle_file, 'wb') as f:
+                pickle.dump(info, f)
+            outfile = os.path.join(d, 'depscan.json')
+
+            def scan() -> T.List[T.List[str]]:
+                self.assertEqual(mesonbuild.scripts.depscan.run([outfile, pickle_file]), 0)
+                with open(outfile, encoding='utf-8') as f:
+                    rules = json.load(f)['rules']
+                return [[r['logical-name'] for r in rule['requires']] for rule in rules]
+
+            self.assertEqual(scan(), [[], ['a'], ['b']])
+            self.assertTrue(os.path.exists(outfile + '.cache'))
+            with mock.patch('mesonbuild.scripts.depscan.scan_source') as scan_source:
+                self.assertEqual(scan(), [[], ['a'], ['b']])
+                scan_source.assert_not_called()
+
+            # Only the modified source is scanned again
+            with open(srcs[2], 'w', encoding='utf-8') as f:
+                f.write('program c\nuse a\nend program c\n')
+            with mock.patch('mesonbuild.scripts.depscan.scan_source',
+                            wraps=mesonbuild.scripts.depscan.scan_source) as scan_source:
+                self.assertEqual(scan(), [[], ['a'], ['a']])
+                self.assertEqual(scan_source.call_count, 1)
+
+    def test_ninja_deps_reader(self) -> None:
+        def path_record(name: str, node_id: int) -> bytes:
+            data = name.encode()
+            data += b'\0' * (-len(data) % 4)
+            data += struct.pack('<I', ~node_id & 0xFFFFFFFF)
+            return struct.pack('<I', len(data)) + data
+
+        def deps_record(out: int, deps: T.List[int]) -> bytes:
+            data = struct.pack(f'<iq{len(deps)}i', out, 0, *deps)
+            return struct.pack('<I', len(data) | 0x80000000) + data
+
+        with tempfile.TemporaryDirectory() as d:
+            fname = os.path.join(d, '.ninja_deps')
+            with open(fname, 'wb') as f:
+                f.write(mesonbuild.ninjadeps.DEPS_SIGNATURE + struct.pack('<i', 4))
+                f.write(path_record('foo.p/foo.c.o', 0))
+                f.write(path_record('../foo.c', 1))
+                f.write(path_record('../foo.h', 2))
+                f.write(deps_record(0, [1, 2]))
+            deps = mesonbuild.ninjadeps.NinjaDeps(fname)
+            deps.update()
+            self.assertEqual(deps.get_deps('foo.p/foo.c.o'), ['../foo.c', '../foo.h'])
+            self.assertEqual(deps.get_dependents('../foo.h'), ['foo.p/foo.c.o'])
+
+            # Appended records replace earlier ones, partial records are
+            # picked up once they are complete
+            record = path_record('bar.p/bar.c.o', 3) + deps_record(3, [2])
+            with open(fname, 'ab') as f:
+                f.write(deps_record(0, [1]))
+                f.write(record[:6])
+            deps.update()
+            self.assertEqual(deps.get_dependents('../foo.h'), [])
+            self.assertEqual(deps.get_deps('bar.p/bar.c.o'), [])
+            with open(fname, 'ab') as f:
+                f.write(record[6:])
+            deps.update()
+            self.assertEqual(deps.get_dependents('../foo.h'), ['bar.p/bar.c.o'])
+            self.assertEqual(sorted(deps.outputs()), ['bar.p/bar.c.o', 'foo.p/foo.c.o'])
+
+            # A recompacted file is read from the start
+            with open(fname + '~', 'wb') as f:
+                f.write(mesonbuild.ninjadeps.DEPS_SIGNATURE + struct.pack('<i', 4))
+                f.write(path_record('foo.p/foo.c.o', 0))
+            os.replace(fname + '~', fname)
+            deps.update()
+            self.assertEqual(deps.nodes, ['foo.p/foo.c.o'])
+            self.assertEqual(deps.outputs(), [])
+
+            fname = os.path.join(d, '.ninja_log')
+            with open(fname, 'w', encoding='utf-8') as f:
+                f.write('# ninja log v7\n1\t20\t0\tfoo.o\tabc\n')
+            log = mesonbuild.ninjadeps.NinjaLog(fname)
+            log.update()
+            with open(fname, 'a', encoding='utf-8') as f:
+                f.write('5\t10\t0\tfoo.o\tdef\n7\t9\t0\tbar')
+            log.update()
+            self.assertEqual(log.entries, {'foo.o': mesonbuild.ninjadeps.NinjaLogEntry(5, 10, 0, 'foo.o', 'def')})
+
+        # ninja records paths with '/' on all platforms
+        self.assertEqual(mesonbuild.ninjadeps.ninja_path(os.path.join('sub', '..', 'foo.p', 'foo.c.o')),
+                         'foo.p/foo.c.o')
+
+    def test_ninja_build_edges(self) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            fname = os.path.join(d, 'build.ninja')
+            with open(fname, 'w', encoding='utf-8') as f:
+                f.write(textwrap.dedent('''\
+                    rule c_COMPILER
+                     command = cc -c $in -o $out
+
+                    build a$ b.p/c$:d.c.o: c_COMPILER ../c$:d.c | gen.h || order
+                     ARGS = -DX=$$Y
+
+                    build out1 | out2: CUSTOM_COMMAND in$$1 in2
+
+                    build all: phony a$ b.p/c$:d.c.o out1
+                    '''))
+            edges = mesonbuild.ninjadeps.read_build_edges(fname)
+            self.assertEqual(edges['a b.p/c:d.c.o'],
+                             ('c_COMPILER', ['a b.p/c:d.c.o'], ['../c:d.c'], ['gen.h'], ['order']))
+            self.assertEqual(edges['out2'], ('CUSTOM_COMMAND', ['out1', 'out2'], ['in$1', 'in2'], [], []))
+            self.assertIs(edges['out1'], edges['out2'])
+            self.assertEqual(edges['all'].inputs, ['a b.p/c:d.c.o', 'out1'])
+
+            fname = os.path.join(d, '.ninja_log')
+            with open(fname, 'w', encoding='utf-8') as f:
+                f.write('# ninja log v7\n'
+                        '0\t10\t0\ta.o\t1\n0\t20\t0\tb.o\t2\n20\t30\t0\tc\t3\n'
+                        '0\t5\t0\tb.o\t4\n5\t8\t0\tc\t5\n')
+            log = mesonbuild.ninjadeps.NinjaLog(fname)
+            log.update()
+            self.assertEqual([e.output for e in log.last_run()], ['b.o', 'c'])
+
+            # With the start of the run marked, a run with nothing to do has
+            # no entries, even if its end times keep growing
+            log.start_run()
+            log.update()
+            self.assertEqual(log.last_run(), [])
+            with open(fname, 'a', encoding='utf-8') as f:
+                f.write('0\t50\t0\ta.o\t6\n')
+            log.update()
+            self.assertEqual([e.output for e in log.last_run()], ['a.o'])
+
+            # ninja recompacted the log in any order when it started
+            log.start_run()
+            with open(fname + '~', 'w', encoding='utf-8') as f:
+                f.write('# ninja log v7\n'
+                        '5\t8\t0\tc\t5\n0\t12\t0\tb.o\t7\n0\t50\t0\ta.o\t6\n'
+                        '12\t20\t0\tc\t8\n')
+            os.replace(fname + '~', fname)
+            log.update()
+            self.assertEqual([(e.output, e.end) for e in log.last_run()], [('b.o', 12), ('c', 20)])
+
+    def test_backend_cached(self):
+        class CountingBackend(backends.Backend):
+            def __init__(self) -> None:
+                super().__init__(None, None)
+                self.calls = 0
+
+            @backends.backend_cached
+            def double(self, value: int) -> int:
+                self.calls += 1
+                return value * 2
+
+        a = CountingBackend()
+        b = CountingBackend()
+        self.assertEqual([a.double(1), a.double(1), a.double(2)], [2, 2, 4])
+        self.assertEqual(a.calls, 2)
+        # Every backend has its own cache
+        self.assertEqual(b.double(1), 2)
+        self.assertEqual(b.calls, 1)
+        a.clear_cache()
+        self.assertEqual(a.double(1), 2)
+        self.assertEqual(a.calls, 3)
+        # which does not keep the backend alive
+        ref = weakref.ref(a)
+        del a
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_balance_unity_batches(self):
+        balance = backends.balance_unity_batches
+        # One expensive source gets a batch of its own
+        self.assertEqual(balance([1, 10, 1, 1, 1, 1], 2), [[1], [0, 2, 3, 4, 5]])
+        # Every batch gets at least one source
+        self.assertEqual(balance([0, 0, 0, 0], 4), [[0], [1], [2], [3]])
+        # The previous grouping is kept if it is about as good, with new
+        # sources going to the cheapest batch
+        self.assertEqual(balance([5, 5, 4, 6, 1], 2, [0, 1, 1, 0, -1]), [[0, 3], [1, 2, 4]])
+        # but not if it is a lot worse
+        self.assertEqual(balance([10, 10, 1, 1], 2, [0, 0, 1, 1]), [[0, 2], [1, 3]])
+        # or a batch would be left empty
+        self.assertEqual(balance([1, 1, 1], 2, [0, 0, 0]), [[0, 2], [1]])
+
+    def test_link_pool_depths(self):
+        depths = ninjabackend.link_pool_depths
+        gib = 1024 ** 3
+        # 48 GiB for links, half of it for 2 GiB heavy links
+        self.assertEqual(depths(64 * gib, 64, gib // 4, 2 * gib), (64, 12))
+        self.assertEqual(depths(64 * gib, 64, gib, 2 * gib), (24, 12))
+        # Always at least one link of each kind, and not more than CPUs
+        self.assertEqual(depths(gib, 4, gib, 8 * gib), (1, 1))
+        self.assertEqual(depths(64 * gib, 4, gib // 4, 2 * gib), (4, 4))
+        self.assertEqual(depths(None, 8, gib // 4, 2 * gib), (8, 2))
@@ -9,7 +9,7 @@ import textwrap
 import os
 import shutil
 import hashlib
-from unittest import mock, skipUnless, SkipTest
+from unittest import mock, skipIf, skipUnless, SkipTest
 from glob import glob
 from pathlib import Path
 import typing as T
@@ -38,6 +38,8 @@ from mesonbuild.compilers.objcpp import AppleClangObjCPPCompiler
 from mesonbuild.dependencies.pkgconfig import PkgConfigDependency, PkgConfigCLI, PkgConfigInterface
 from mesonbuild.programs import NonExistingExternalProgram
 import mesonbuild.modules.pkgconfig
+import mesonbuild.scripts.linkmem
+import mesonbuild.scripts.symbolextractor
 
 PKG_CONFIG = os.environ.get('PKG_CONFIG', 'pkg-config')
 
@@ -1974,3 +1976,93 @@ class LinuxlikeTests(BasePlatformTests):
                     self.assertRegex(out, 'value *: *' + expected)
                 finally:
                     self.wipe()
+
+    @skipIf(is_osx(), 'the backend does not fork worker processes on macOS')
+    def test_parallel_backend_generation(self):
+        '''
+        Test that the targets the Ninja backend generates in worker processes
+        result in the same build.ninja and compilation database.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not use worker processes')
+        testdir = os.path.join(self.unit_test_dir, '131 parallel backend')
+
+        def read_outputs() -> T.List[bytes]:
+            outputs = []
+            for name in ['build.ninja', 'compile_commands.json']:
+                with open(os.path.join(self.builddir, name), 'rb') as f:
+                    outputs.append(f.read())
+            return outputs
+
+        self.init(testdir, override_envvars={'MESON_NUM_PROCESSES': '1'})
+        self.assertNotIn('worker processes', self.get_meson_log_raw())
+        expected = read_outputs()
+        self.init(testdir, extra_args=['--wipe'], override_envvars={'MESON_NUM_PROCESSES': '4'})
+        self.assertIn('targets in 4 worker processes', self.get_meson_log_raw())
+        self.assertEqual(read_outputs(), expected)
+        self.build()
+
+    def test_reused_target_fragments_link_dependencies(self):
+        '''
+        Test that the Ninja backend does not reuse what it generated for a
+        target after a library it links to appeared.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not reuse target fragments')
+        testdir = os.path.join(self.unit_test_dir, '131 parallel backend')
+        libfile = os.path.join(os.path.realpath(self.builddir), 'ext', 'libprobed.a')
+        self.init(testdir)
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            self.assertNotIn(libfile, f.read())
+        os.mkdir(os.path.dirname(libfile))
+        Path(libfile).touch()
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('Reusing 83 of 85 target fragments', self.get_meson_log_raw())
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            self.assertIn(libfile, f.read())
+
+    def test_link_pools_auto(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend has no link pools')
+        testdir = os.path.join(self.common_test_dir, '1 trivial')
+        self.init(testdir, extra_args=['-Dbackend_link_pools=auto'])
+        self.build()
+        memfile = os.path.join(self.builddir, 'meson-private', 'link_memory.txt')
+        peaks = mesonbuild.scripts.linkmem.read_peak_memory(memfile)
+        self.assertGreater(peaks['trivialprog'], 0)
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        self.assertIn('pool heavy_link_pool\n', contents)
+        self.assertNotIn(' pool = heavy_link_pool\n', contents)
+
+        # Links that were seen using a lot of memory go to the heavy pool
+        peaks['trivialprog'] = 4 * 1024 ** 3
+        mesonbuild.scripts.linkmem.write_peak_memory(memfile, peaks)
+        self.setconf('-Dbackend_max_links=4')
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        self.assertRegex(contents, r'build trivialprog: c_LINKER [^\n]*\n(?: [^\n]*\n)* pool = heavy_link_pool\n')
+
+    def test_symbolextractor_elf(self):
+        testdir = os.path.join(self.linuxlike_test_dir, '3 linker script')
+        self.init(testdir)
+        self.build()
+        libfile = os.path.join(self.builddir, 'libbob.so')
+        symfile = os.path.join(self.builddir, 'libbob.so.p', 'libbob.so.symbols')
+        with open(symfile, encoding='utf-8') as f:
+            symbols = f.read()
+        self.assertIn('Library soname: [libbob.so]\n', symbols)
+        self.assertIn('\nbobMcBob@@V1_0_0 T\n', symbols)
+        self.assertNotIn('main', symbols)
+        # Other files are left to the tools
+        self.assertFalse(mesonbuild.scripts.symbolextractor.elf_syms(symfile, os.path.join(self.builddir, 'text.symbols')))
+
+        # The same as from readelf and nm, so that switching between them
+        # does not relink
+        if not shutil.which('readelf') or not shutil.which('nm'):
+            raise SkipTest('readelf or nm not found')
+        mesonbuild.scripts.symbolextractor.TOOL_WARNING_FILE = os.path.join(self.privatedir, 'tool_warning')
+        toolfile = os.path.join(self.builddir, 'tools.symbols')
+        mesonbuild.scripts.symbolextractor.gnu_syms(libfile, toolfile)
+        with open(toolfile, encoding='utf-8') as f:
+            self.assertEqual(f.read(), symbols)